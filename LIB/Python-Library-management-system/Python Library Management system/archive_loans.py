@@ -0,0 +1,60 @@
+"""
+Archive old loan history: detach yearly `loans` partitions whose loans are
+all returned, export each to a gzip-compressed CSV and drop it.
+
+Archived loans stay reachable through
+LoanRepository.list_loans_for_member(member_id, include_archived=True).
+Each file is sorted by member and block-indexed in the database, so one
+member's history reads only its own block. Hosts that mount the archive
+directory at another path set LIB_ARCHIVE_DIR to it.
+
+Run from the project folder:
+
+    python3 archive_loans.py                      # archive years older than 3 years
+    python3 archive_loans.py --keep-years 5 --dir /srv/library/archive
+    python3 archive_loans.py --dry-run            # list partitions only
+
+Exit code is 1 if an eligible partition could not be archived.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from repositories.loan_repository import LoanRepository
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Archive old loan partitions")
+    parser.add_argument("--keep-years", type=int, default=3, help="full calendar years to keep online")
+    parser.add_argument("--dir", default="archive", help="directory for exported partitions")
+    parser.add_argument("--dry-run", action="store_true", help="list partitions without archiving")
+    args = parser.parse_args(argv)
+
+    repo = LoanRepository()
+    repo.create_table()
+    cutoff = datetime(datetime.now(timezone.utc).year - args.keep_years, 1, 1, tzinfo=timezone.utc)
+    failed = 0
+    for name, start, end, rows, active in repo.list_partitions():
+        if end > cutoff:
+            print(f"  {name}: {rows:,} loans, kept online")
+            continue
+        if active:
+            print(f"✗ {name}: {active:,} loan(s) still out, not archived")
+            failed += 1
+            continue
+        if args.dry_run:
+            print(f"  {name}: {rows:,} loans, would be archived")
+            continue
+        try:
+            archived = repo.archive_partition(name, args.dir)
+        except Exception as e:
+            print(f"✗ {name}: {e}")
+            failed += 1
+            continue
+        print(f"✓ {name}: {archived:,} loans archived to {args.dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
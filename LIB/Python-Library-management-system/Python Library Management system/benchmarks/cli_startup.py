@@ -0,0 +1,110 @@
+"""
+Startup budget for the headless `library` CLI.
+
+Measures, over --runs fresh interpreter processes:
+  - startup: `library.py --help`, i.e. interpreter start plus argument parsing,
+  - for each subcommand: importing the CLI plus every module the subcommand
+    loads lazily, which is what a scripted call pays before its first query.
+
+Fails (exit code 1) if a median exceeds its budget, if any subcommand pulls
+in Qt, or, with --baseline, if a median regressed by more than --threshold.
+No database is needed.
+
+Run from the project folder:
+
+    python3 -m benchmarks.cli_startup
+    python3 -m benchmarks.cli_startup --runs 20 --budget-ms 100 --baseline benchmarks/results/cli-startup-....json
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import compare, import_times, load_results, summarize, write_results
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules each subcommand imports on top of library.py.
+COMMAND_MODULES = {
+    "search": ["services.book_service"],
+    "authors": ["services.book_service"],
+    "browse": ["services.book_service"],
+    "borrow": ["repositories.book_repository", "repositories.loan_repository", "services.loan_service"],
+    "return": ["repositories.book_repository", "repositories.loan_repository", "services.loan_service"],
+    "import": ["csv", "services.book_service"],
+    "export": ["export_loan_history", "services.book_service"],
+    "stats": ["services.stats_service"],
+    "db-check": ["infrastructure.db"],
+}
+FORBIDDEN_PREFIXES = ("PyQt5",)
+
+
+def _wall_times(argv, runs: int):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable] + argv, cwd=PROJECT_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _import_argv(modules):
+    return ["-c", "import library, " + ", ".join(modules)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CLI startup time budget")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="median budget for `library.py --help`")
+    parser.add_argument("--command-budget-ms", type=float, default=400.0, help="median budget per subcommand")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/cli-startup-<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed p50 slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    failures = []
+    results = {"startup": {}}
+    stats = summarize(_wall_times(["library.py", "--help"], args.runs), 1.0)
+    results["startup"]["help"] = stats
+    print(f"  {'startup (--help)':30s} p50 {stats['p50_ms']:>8.1f}  max {stats['max_ms']:>8.1f} ms")
+    if stats["p50_ms"] > args.budget_ms:
+        failures.append(f"startup p50 {stats['p50_ms']:.1f} ms > budget {args.budget_ms:.0f} ms")
+
+    for command, modules in COMMAND_MODULES.items():
+        try:
+            stats = summarize(_wall_times(_import_argv(modules), args.runs), 1.0)
+        except subprocess.CalledProcessError:
+            failures.append(f"{command}: importing {', '.join(modules)} failed (missing dependency?)")
+            continue
+        results["startup"][command] = stats
+        loaded = import_times(_import_argv(modules), cwd=PROJECT_DIR)
+        slowest = sorted(loaded.items(), key=lambda item: item[1]["self_ms"], reverse=True)[:3]
+        slowest_text = ", ".join("%s %.1f" % (name, timing["self_ms"]) for name, timing in slowest)
+        print(
+            f"  {command:30s} p50 {stats['p50_ms']:>8.1f}  max {stats['max_ms']:>8.1f} ms  "
+            f"slowest: {slowest_text}"
+        )
+        forbidden = sorted(name for name in loaded if name.startswith(FORBIDDEN_PREFIXES))
+        if forbidden:
+            failures.append(f"{command}: imports {', '.join(forbidden)}")
+        if stats["p50_ms"] > args.command_budget_ms:
+            failures.append(f"{command}: p50 {stats['p50_ms']:.1f} ms > budget {args.command_budget_ms:.0f} ms")
+
+    path = write_results("cli-startup", results, args.output)
+    print(f"Results written to {path}")
+    if args.baseline:
+        failures += compare(load_results(args.baseline), results, metric="p50_ms", threshold=args.threshold)
+
+    if failures:
+        for line in failures:
+            print(f"  ✗ {line}")
+        return 1
+    print("✓ Startup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
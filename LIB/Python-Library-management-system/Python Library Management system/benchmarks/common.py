@@ -0,0 +1,201 @@
+"""
+Shared helpers for the benchmark and load-test scripts: a throwaway local
+PostgreSQL server, latency statistics, import timings and JSON result files.
+"""
+
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pg_binary(name: str) -> str:
+    """Locate a PostgreSQL server binary on PATH or in PG_BIN."""
+    pg_bin = os.getenv("PG_BIN")
+    if pg_bin:
+        candidate = os.path.join(pg_bin, name)
+        if os.path.exists(candidate):
+            return candidate
+    found = shutil.which(name)
+    if not found:
+        raise RuntimeError(f"{name} not found; install PostgreSQL or set PG_BIN to its bin directory")
+    return found
+
+
+class LocalPostgres:
+    """
+    Start a private PostgreSQL cluster in a temp directory for the duration
+    of a `with` block and point the LIB_DB_* environment variables at it.
+
+    The cluster uses trust authentication on 127.0.0.1 and a random port,
+    and is deleted on exit, so benchmarks never touch a real database.
+    """
+
+    def __init__(self, dbname: str = "library_bench"):
+        self.dbname = dbname
+        self.port = _free_port()
+        self._data_dir = None
+        self._saved_env = {}
+
+    def __enter__(self) -> "LocalPostgres":
+        self._data_dir = tempfile.mkdtemp(prefix="libbench_pg_")
+        subprocess.run(
+            [_pg_binary("initdb"), "-D", self._data_dir, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        subprocess.run(
+            [
+                _pg_binary("pg_ctl"), "-D", self._data_dir, "-w", "-l", os.path.join(self._data_dir, "server.log"),
+                "-o", f"-p {self.port} -k {self._data_dir} -c listen_addresses=127.0.0.1 -c fsync=off",
+                "start",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+        import psycopg2
+
+        conn = psycopg2.connect(dbname="postgres", user="postgres", host="127.0.0.1", port=self.port)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE DATABASE {self.dbname}")
+        conn.close()
+
+        env = {
+            "LIB_DB_NAME": self.dbname,
+            "LIB_DB_USER": "postgres",
+            # Trust auth ignores it, but infrastructure.db requires one to be set.
+            "LIB_DB_PASSWORD": "bench",
+            "LIB_DB_HOST": "127.0.0.1",
+            "LIB_DB_PORT": str(self.port),
+        }
+        for key, value in env.items():
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        if self._data_dir:
+            subprocess.run(
+                [_pg_binary("pg_ctl"), "-D", self._data_dir, "-w", "-m", "fast", "stop"],
+                stdout=subprocess.DEVNULL,
+            )
+            shutil.rmtree(self._data_dir, ignore_errors=True)
+
+
+def import_times(argv: List[str], cwd: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run `python -X importtime <argv>` and return {module: {"self_ms", "cumulative_ms"}}
+    for every module the process imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime"] + argv,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = {
+            "self_ms": int(self_us) / 1000.0,
+            "cumulative_ms": int(cumulative_us) / 1000.0,
+        }
+    return modules
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one operation."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "ops_per_sec": round(len(values) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn and return (elapsed_seconds, result)."""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def write_results(kind: str, results: Dict, path: Optional[str] = None) -> str:
+    """Write a results document (with run metadata) and return its path."""
+    document = {
+        "kind": kind,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "results": results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{kind}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Dict, current: Dict, metric: str = "p95_ms", threshold: float = 0.20) -> List[str]:
+    """
+    Compare two nested {group: {operation: stats}} result dicts and return a
+    line per operation whose `metric` got worse by more than `threshold`.
+    """
+    regressions = []
+    for group, operations in current.items():
+        for name, stats in operations.items():
+            old = baseline.get(group, {}).get(name)
+            if not old or not old.get(metric):
+                continue
+            change = (stats[metric] - old[metric]) / old[metric]
+            if change > threshold:
+                regressions.append(
+                    f"{group}/{name}: {metric} {old[metric]:.3f} -> {stats[metric]:.3f} ({change:+.0%})"
+                )
+    return regressions
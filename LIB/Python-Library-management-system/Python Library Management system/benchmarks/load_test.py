@@ -0,0 +1,302 @@
+"""
+Simulate circulation desk traffic: N desk terminals and M self-service kiosks
+running concurrently against BookService and LoanService.
+
+Each terminal is a thread that loops over a weighted mix of operations
+(search, view, borrow, return) until --duration expires. Afterwards the
+harness reports throughput and tail latency per operation and checks the
+circulation invariants:
+
+  - no member has more than LoanService.MAX_ACTIVE_LOANS_PER_MEMBER active loans
+  - no book has more active loans than copies (quantity)
+  - the maintained available/active loan counters match the loans table
+
+Run from the project folder against a throwaway server loaded with a
+synthetic dataset:
+
+    python3 -m benchmarks.load_test --local-postgres --books 100000 --members 20000 --loans 500000
+
+or, deliberately, against the LIB_DB_* database. The borrow traffic writes
+real loans there, so this needs --allow-live-db; every loan the run still
+holds is returned before the invariants are checked:
+
+    python3 -m benchmarks.load_test --allow-live-db --terminals 8 --kiosks 4 --duration 60
+
+The exit code is 1 if any invariant is violated.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.common import LocalPostgres, summarize, write_results
+from generate_dataset import generate
+from infrastructure.db import connection_scope
+from repositories.book_repository import BookRepository
+from repositories.loan_repository import LoanRepository
+from services.book_service import BookService
+from services.loan_service import LoanService
+
+DESK_MIX = "search=35,view=25,borrow=20,return=20"
+KIOSK_MIX = "search=70,view=30"
+
+SEARCH_TERMS = ["Shadow", "river", "Garden", "Night", "Fantasy", "Smith", "978000001", "Letters"]
+
+
+def parse_mix(text: str):
+    """Parse 'search=40,borrow=10' into [(operation, weight), ...]."""
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("search", "view", "borrow", "return"):
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class _Recorder:
+    """Thread-safe per-operation latency, rejection and error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.rejected = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def record(self, op: str, elapsed: float) -> None:
+        with self._lock:
+            self.latencies[op].append(elapsed)
+
+    def reject(self, op: str) -> None:
+        with self._lock:
+            self.rejected[op] += 1
+
+    def error(self, op: str) -> None:
+        with self._lock:
+            self.errors[op] += 1
+
+
+class Terminal(threading.Thread):
+    def __init__(self, name, mix, book_service, loan_service, book_ids, member_ids, recorder, deadline, seed, leftover):
+        super().__init__(name=name, daemon=True)
+        self._ops = [op for op, _ in mix]
+        self._weights = [weight for _, weight in mix]
+        self._books = book_service
+        self._loans = loan_service
+        self._book_ids = book_ids
+        self._member_ids = member_ids
+        self._recorder = recorder
+        self._deadline = deadline
+        self._rng = random.Random(seed)
+        # Loans this terminal created and has not yet returned; handed over
+        # to `leftover` when the terminal stops.
+        self._outstanding = []
+        self._leftover = leftover
+
+    def _search(self):
+        self._books.search_books(self._rng.choice(SEARCH_TERMS))
+
+    def _view(self):
+        self._books.get_book(self._rng.choice(self._book_ids))
+
+    def _borrow(self):
+        member_id = self._rng.choice(self._member_ids)
+        book_id = self._rng.choice(self._book_ids)
+        self._loans.borrow_book(member_id, book_id)
+        self._outstanding.append((member_id, book_id))
+
+    def _return(self):
+        if not self._outstanding:
+            raise ValueError("nothing to return")
+        member_id, book_id = self._outstanding.pop(self._rng.randrange(len(self._outstanding)))
+        self._loans.return_book_for_member_and_book(member_id, book_id)
+
+    def run(self):
+        handlers = {"search": self._search, "view": self._view, "borrow": self._borrow, "return": self._return}
+        try:
+            while time.monotonic() < self._deadline:
+                op = self._rng.choices(self._ops, weights=self._weights)[0]
+                started = time.perf_counter()
+                try:
+                    handlers[op]()
+                except ValueError:
+                    # Business-rule rejection (loan limit, no active loan): expected traffic.
+                    self._recorder.reject(op)
+                    continue
+                except Exception:
+                    self._recorder.error(op)
+                    continue
+                self._recorder.record(op, time.perf_counter() - started)
+        finally:
+            self._leftover.extend(self._outstanding)
+
+
+def _sample_ids(table: str, limit: int, seed: int):
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT setseed(%s)", (((seed % 1000) / 1000.0),))
+            cur.execute(f"SELECT id FROM {table} ORDER BY random() LIMIT %s", (limit,))
+            return [row[0] for row in cur.fetchall()]
+
+
+def check_invariants():
+    """Return a list of human-readable invariant violations."""
+    violations = []
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT member_id, COUNT(*) FROM loans
+                WHERE return_date IS NULL
+                GROUP BY member_id
+                HAVING COUNT(*) > %s
+                """,
+                (LoanService.MAX_ACTIVE_LOANS_PER_MEMBER,),
+            )
+            for member_id, active in cur.fetchall():
+                violations.append(
+                    f"member {member_id} has {active} active loans "
+                    f"(max {LoanService.MAX_ACTIVE_LOANS_PER_MEMBER})"
+                )
+            cur.execute(
+                """
+                SELECT b.id, b.quantity, COUNT(l.id)
+                FROM books b
+                JOIN loans l ON l.book_id = b.id AND l.return_date IS NULL
+                GROUP BY b.id, b.quantity
+                HAVING b.quantity - COUNT(l.id) < 0
+                """
+            )
+            for book_id, quantity, out in cur.fetchall():
+                violations.append(f"book {book_id} has {out} copies out but quantity {quantity}")
+
+    drift = LoanRepository().reconcile_counters(fix=False)
+    for book_id, stored, expected in drift["books"]:
+        violations.append(f"book {book_id} available_count is {stored}, actual {expected}")
+    for member_id, stored, expected in drift["members"]:
+        violations.append(f"member {member_id} active_loan_count is {stored}, actual {expected}")
+    return violations
+
+
+def return_outstanding(leftover) -> int:
+    """Return every loan in `leftover` (member_id, book_id pairs); return how many were closed."""
+    loan_service = LoanService(BookRepository(), LoanRepository(), bootstrap=False)
+    returned = 0
+    while leftover:
+        member_id, book_id = leftover.pop()
+        try:
+            loan_service.return_book_for_member_and_book(member_id, book_id)
+        except ValueError:
+            # Already closed elsewhere (e.g. at the desk while the run was going).
+            continue
+        returned += 1
+    return returned
+
+
+def run_load(terminals: int, kiosks: int, duration: float, desk_mix, kiosk_mix, seed: int, leftover):
+    """Run the terminals; loans they leave open are appended to `leftover`."""
+    book_service = BookService()
+    loan_service = LoanService(BookRepository(), LoanRepository())
+    book_ids = _sample_ids("books", 10_000, seed)
+    member_ids = _sample_ids("members", 5_000, seed)
+    if not book_ids or not member_ids:
+        raise RuntimeError("The database needs books and members; load a dataset first.")
+
+    recorder = _Recorder()
+    deadline = time.monotonic() + duration
+    threads = [
+        Terminal(f"desk-{i}", desk_mix, book_service, loan_service, book_ids, member_ids, recorder, deadline, seed + i, leftover)
+        for i in range(terminals)
+    ] + [
+        Terminal(f"kiosk-{i}", kiosk_mix, book_service, loan_service, book_ids, member_ids, recorder, deadline, seed + 1000 + i, leftover)
+        for i in range(kiosks)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    results = {}
+    for op in sorted(set(recorder.latencies) | set(recorder.rejected) | set(recorder.errors)):
+        stats = summarize(recorder.latencies[op], wall, recorder.errors[op])
+        stats["rejected"] = recorder.rejected[op]
+        results[op] = stats
+    total = sum(len(values) for values in recorder.latencies.values())
+    results["total"] = {"count": total, "ops_per_sec": round(total / wall, 2) if wall else 0.0}
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Circulation desk load test")
+    parser.add_argument("--terminals", type=int, default=4, help="desk terminals (mixed traffic)")
+    parser.add_argument("--kiosks", type=int, default=2, help="self-service kiosks (read-only traffic)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--desk-mix", default=DESK_MIX)
+    parser.add_argument("--kiosk-mix", default=KIOSK_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--local-postgres", action="store_true", help="start a throwaway server and load a dataset")
+    parser.add_argument(
+        "--allow-live-db",
+        action="store_true",
+        help="run against the LIB_DB_* database (borrows real copies; they are returned afterwards)",
+    )
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--members", type=int, default=2_000)
+    parser.add_argument("--loans", type=int, default=50_000)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    if not args.local_postgres and not args.allow_live_db:
+        parser.error("pass --local-postgres, or --allow-live-db to run against the LIB_DB_* database")
+
+    desk_mix, kiosk_mix = parse_mix(args.desk_mix), parse_mix(args.kiosk_mix)
+
+    def _run():
+        if args.local_postgres:
+            generate(books=args.books, members=args.members, loans=args.loans, seed=args.seed, truncate=True)
+        print(f"Running {args.terminals} desk terminals + {args.kiosks} kiosks for {args.duration:.0f}s...")
+        leftover = []
+        try:
+            results = run_load(args.terminals, args.kiosks, args.duration, desk_mix, kiosk_mix, args.seed, leftover)
+        finally:
+            if not args.local_postgres:
+                print(f"Returning {len(leftover)} outstanding loan(s)...")
+                print(f"  {return_outstanding(leftover)} returned")
+        return results, check_invariants()
+
+    if args.local_postgres:
+        with LocalPostgres():
+            results, violations = _run()
+    else:
+        results, violations = _run()
+
+    for op, stats in results.items():
+        if op == "total":
+            continue
+        print(
+            f"  {op:8s} {stats['count']:>8d} ok  {stats['rejected']:>6d} rejected  {stats['errors']:>4d} errors  "
+            f"p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+        )
+    print(f"  total    {results['total']['ops_per_sec']:.1f} ops/s")
+
+    results["invariant_violations"] = violations
+    path = write_results("load", results, args.output)
+    print(f"Results written to {path}")
+
+    if violations:
+        print(f"✗ {len(violations)} invariant violation(s):")
+        for line in violations[:20]:
+            print(f"  {line}")
+        return 1
+    print("✓ Invariants hold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Benchmark the repository and service hot paths at several dataset sizes.
+
+Starts a private PostgreSQL server (see common.LocalPostgres), loads a seeded
+synthetic dataset for each size, times every hot path and writes the results
+as JSON. With --baseline the run is compared to an earlier result file and
+the exit code is 1 if any p95 latency regressed beyond --threshold.
+
+Run from the project folder:
+
+    python3 -m benchmarks.repository_bench
+    python3 -m benchmarks.repository_bench --sizes small --baseline benchmarks/results/repository-....json
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.common import LocalPostgres, compare, load_results, summarize, timed, write_results
+from generate_dataset import generate
+from infrastructure.db import connection_scope, set_prepared_statements
+from repositories.book_repository import BookRepository
+from repositories.loan_repository import LoanRepository
+from repositories.member_repository import MemberRepository
+from services.auth_service import AuthService
+from services.loan_service import LoanService
+
+SIZES = {
+    "tiny": {"books": 1_000, "members": 200, "loans": 5_000},
+    "small": {"books": 10_000, "members": 2_000, "loans": 100_000},
+    "medium": {"books": 100_000, "members": 20_000, "loans": 1_000_000},
+}
+
+SEARCH_TERMS = ["Shadow", "river", "Garden of", "Mokoena", "Fantasy", "978000000", "zzz-no-match"]
+
+
+def _idle_members(limit: int):
+    """Members with no active loans, so borrow_book is never rejected."""
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id FROM members
+                WHERE active_loan_count = 0
+                ORDER BY id
+                LIMIT %s
+                """,
+                (limit,),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+
+def _run(fn, iterations: int):
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        try:
+            elapsed, _ = timed(fn, i)
+        except ValueError:
+            errors += 1
+            continue
+        latencies.append(elapsed)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def bench_size(sizes, iterations: int, seed: int):
+    """Load the dataset for one size and time every hot path against it."""
+    generate(seed=seed, truncate=True, **sizes)
+
+    rng = random.Random(seed)
+    book_repo = BookRepository()
+    member_repo = MemberRepository()
+    loan_service = LoanService(book_repo, LoanRepository())
+    auth_service = AuthService(member_repo)
+    book_ids = [rng.randint(1, sizes["books"]) for _ in range(iterations)]
+    # list_books materializes the whole catalogue; keep its iteration count low.
+    list_iterations = max(3, iterations // 50)
+
+    results = {
+        "BookRepository.list_books": _run(lambda i: book_repo.list_books(), list_iterations),
+        "BookRepository.search_books": _run(
+            lambda i: book_repo.search_books(SEARCH_TERMS[i % len(SEARCH_TERMS)]), max(5, iterations // 10)
+        ),
+        "BookRepository.get_book": _run(lambda i: book_repo.get_book(book_ids[i]), iterations),
+        "MemberRepository.list_members": _run(
+            lambda i: member_repo.list_members(after_id=rng.randint(0, sizes["members"]), limit=50), iterations
+        ),
+        "AuthService.login": _run(
+            lambda i: auth_service.login("librarian", "admin123" if i % 4 else "wrong-password"), iterations
+        ),
+    }
+
+    # Sorted catalogue pages continuing after a random book, as the table
+    # fetches them when scrolled in title, author or year order.
+    cursors = [book_repo.get_book(book_id) for book_id in book_ids[: max(5, iterations // 10)]]
+    for sort in ("title", "author", "year"):
+        for direction in ("asc", "desc"):
+            results[f"BookRepository.list_books_page[{sort} {direction}]"] = _run(
+                lambda i, sort=sort, direction=direction: book_repo.list_books_page(
+                    after_id=cursors[i][0], limit=500, sort=sort, direction=direction,
+                    after_value=BookRepository.sort_value(cursors[i], sort),
+                ),
+                len(cursors),
+            )
+
+    members = _idle_members(iterations)
+    pairs = [(members[i % len(members)], book_ids[i]) for i in range(min(iterations, len(members)))]
+    results["LoanService.borrow_book"] = _run(lambda i: loan_service.borrow_book(*pairs[i]), len(pairs))
+    results["LoanService.return_book_for_member_and_book"] = _run(
+        lambda i: loan_service.return_book_for_member_and_book(*pairs[i]), len(pairs)
+    )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Repository/service benchmark suite")
+    parser.add_argument("--sizes", default="tiny,small", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/repository-<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument(
+        "--no-prepared", action="store_true",
+        help="execute hot statements unprepared, to measure the gain from prepared statements",
+    )
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed p95 slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+    if args.no_prepared:
+        set_prepared_statements(False)
+
+    results = {}
+    with LocalPostgres():
+        for size in args.sizes.split(","):
+            size = size.strip()
+            print(f"== {size}: {SIZES[size]}")
+            results[size] = bench_size(SIZES[size], args.iterations, args.seed)
+            for name, stats in results[size].items():
+                print(
+                    f"  {name:45s} {stats['ops_per_sec']:>10.1f} ops/s  "
+                    f"p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+                )
+
+    path = write_results("repository", results, args.output)
+    print(f"Results written to {path}")
+
+    if args.baseline:
+        regressions = compare(load_results(args.baseline), results, threshold=args.threshold)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  ✗ {line}")
+            return 1
+        print("✓ No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
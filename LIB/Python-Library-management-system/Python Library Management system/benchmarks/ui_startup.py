@@ -0,0 +1,115 @@
+"""
+Cold-start budget for the desktop window (`main window.py`).
+
+Measures, over --runs fresh interpreter processes:
+  - module_load: interpreter start plus executing `main window.py` up to,
+    but not including, its `__main__` block (imports and class definitions),
+  - window_shown (with --window): until LibraryApp has been shown and one
+    round of events processed, using Qt's offscreen platform. The database
+    bootstrap runs in the background, so no server is needed.
+
+`-X importtime` output of the module load is checked as well: the service
+layer, repositories and psycopg2 must not be imported before the window is
+up. Exit code is 1 if a check fails, a median exceeds its budget, or, with
+--baseline, a median regressed by more than --threshold.
+
+Run from the project folder:
+
+    python3 -m benchmarks.ui_startup
+    python3 -m benchmarks.ui_startup --window --baseline benchmarks/results/ui-startup-....json
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import compare, import_times, load_results, summarize, write_results
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD_MODULE = "import runpy; runpy.run_path('main window.py', run_name='library_main_window')"
+SHOW_WINDOW = (
+    "import os, sys, runpy\n"
+    "module = runpy.run_path('main window.py', run_name='library_main_window')\n"
+    "app = module['QApplication'](sys.argv)\n"
+    "window = module['LibraryApp']()\n"
+    "window.show()\n"
+    "app.processEvents()\n"
+    "sys.stdout.flush()\n"
+    # Skip teardown: the background loader may still be connecting.
+    "os._exit(0)\n"
+)
+DEFERRED_PREFIXES = ("psycopg2", "services.", "repositories.", "infrastructure.db")
+
+
+def _wall_times(code: str, runs: int, env=None):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Desktop window cold-start budget")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="median budget for loading the module")
+    parser.add_argument("--window", action="store_true", help="also time until the window is shown (offscreen)")
+    parser.add_argument("--window-budget-ms", type=float, default=1500.0, help="median budget for showing the window")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/ui-startup-<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed p50 slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    failures = []
+    results = {"startup": {}}
+    try:
+        stats = summarize(_wall_times(LOAD_MODULE, args.runs), 1.0)
+    except subprocess.CalledProcessError:
+        print("✗ Loading main window.py failed (is PyQt5 installed?)")
+        return 1
+    results["startup"]["module_load"] = stats
+    print(f"  {'module_load':20s} p50 {stats['p50_ms']:>8.1f}  max {stats['max_ms']:>8.1f} ms")
+    if stats["p50_ms"] > args.budget_ms:
+        failures.append(f"module_load p50 {stats['p50_ms']:.1f} ms > budget {args.budget_ms:.0f} ms")
+
+    loaded = import_times(["-c", LOAD_MODULE], cwd=PROJECT_DIR)
+    for name, timing in sorted(loaded.items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)[:5]:
+        print(f"    {name:40s} {timing['cumulative_ms']:>8.1f} ms")
+    eager = sorted(name for name in loaded if name.startswith(DEFERRED_PREFIXES))
+    if eager:
+        failures.append(f"imported before the window is shown: {', '.join(eager)}")
+
+    if args.window:
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+        try:
+            stats = summarize(_wall_times(SHOW_WINDOW, args.runs, env=env), 1.0)
+        except subprocess.CalledProcessError:
+            failures.append("showing the window failed")
+        else:
+            results["startup"]["window_shown"] = stats
+            print(f"  {'window_shown':20s} p50 {stats['p50_ms']:>8.1f}  max {stats['max_ms']:>8.1f} ms")
+            if stats["p50_ms"] > args.window_budget_ms:
+                failures.append(
+                    f"window_shown p50 {stats['p50_ms']:.1f} ms > budget {args.window_budget_ms:.0f} ms"
+                )
+
+    path = write_results("ui-startup", results, args.output)
+    print(f"Results written to {path}")
+    if args.baseline:
+        failures += compare(load_results(args.baseline), results, metric="p50_ms", threshold=args.threshold)
+
+    if failures:
+        for line in failures:
+            print(f"  ✗ {line}")
+        return 1
+    print("✓ Cold start within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
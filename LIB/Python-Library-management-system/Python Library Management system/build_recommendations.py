@@ -0,0 +1,248 @@
+"""
+Build "patrons who borrowed this also borrowed..." recommendations.
+
+The job streams each member's distinct borrowed books out of `loans`, counts
+how often every pair of books shares a borrower (a sparse member x book
+co-occurrence, computed with vectorized NumPy per block of members) and
+stores the TOP_K neighbours of each book in book_recommendations.
+
+Memory stays bounded at any history size:
+
+  - (member, book) pairs are spooled once to a local int32 file and read
+    back through a memory map,
+  - each member contributes at most --max-history recent books, so one
+    member adds at most max-history^2 pairs,
+  - books are split into buckets by id and every pass only accumulates the
+    co-occurrence rows of one bucket; the bucket count is derived from
+    --max-entries.
+
+Scores are cosine similarities, shared borrowers / sqrt(n_a * n_b), so
+bestsellers do not crowd out every list. Pairs shared by fewer than
+--min-support members are ignored.
+
+Run from the project folder (reads go to a replica when configured):
+
+    python3 build_recommendations.py
+    python3 build_recommendations.py --top-k 10 --max-entries 50000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from repositories.recommendation_repository import RecommendationRepository
+
+TOP_K = 20
+MAX_HISTORY = 200
+MIN_SUPPORT = 2
+# Co-occurrence entries (book pairs) accumulated in memory per pass.
+MAX_ENTRIES = 20_000_000
+# Pair expansions per vectorized block.
+BLOCK_PAIRS = 4_000_000
+# (member, book) items read from the spool at a time.
+READ_ITEMS = 1_000_000
+WRITE_ROWS = 100_000
+
+
+def _np():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("build_recommendations needs numpy: pip install numpy")
+    return numpy
+
+
+def spool_histories(repo, path: str, max_history: int):
+    """
+    Write member-ordered (member_id, book_id) int32 pairs to `path`.
+    Returns (items, max book id, upper bound on pair expansions).
+    """
+    np = _np()
+    items = 0
+    max_book = 0
+    expansions = 0
+    carry_member, carry_size = None, 0
+    with open(path, "wb") as f:
+        for rows in repo.iter_member_histories(max_history):
+            pairs = np.asarray(rows, dtype=np.int32)
+            pairs.tofile(f)
+            items += len(pairs)
+            max_book = max(max_book, int(pairs[:, 1].max()))
+            members = pairs[:, 0]
+            starts = np.flatnonzero(np.r_[True, members[1:] != members[:-1]])
+            sizes = np.diff(np.r_[starts, len(members)]).astype(np.int64)
+            # A member can straddle two fetches; join its halves before squaring.
+            if carry_member is not None and members[0] == carry_member:
+                sizes[0] += carry_size
+            elif carry_member is not None:
+                expansions += carry_size * carry_size
+            expansions += int((sizes[:-1] ** 2).sum())
+            carry_member, carry_size = int(members[-1]), int(sizes[-1])
+    if carry_member is not None:
+        expansions += carry_size * carry_size
+    return items, max_book, expansions
+
+
+def _member_chunks(spool):
+    """Yield (members, books) slices of the spool that end on member boundaries."""
+    np = _np()
+    start = 0
+    total = len(spool)
+    while start < total:
+        end = min(start + READ_ITEMS, total)
+        if end < total:
+            # Back up to the first row of the last member in this window.
+            last = spool[end - 1, 0]
+            boundary = start + int(np.searchsorted(spool[start:end, 0], last, side="left"))
+            end = boundary if boundary > start else end
+        yield np.asarray(spool[start:end, 0]), np.asarray(spool[start:end, 1])
+        start = end
+
+
+def _block_cooccurrence(members, books, span: int, bucket: int, buckets: int):
+    """
+    Unique (book_a * span + book_b) keys and counts for the members in this
+    block, restricted to rows book_a in `bucket`.
+    """
+    np = _np()
+    keys_out, counts_out = [], []
+    starts = np.flatnonzero(np.r_[True, members[1:] != members[:-1]])
+    sizes = np.diff(np.r_[starts, len(members)])
+    # Split into sub-blocks whose full expansion stays under BLOCK_PAIRS.
+    cost = np.cumsum(sizes.astype(np.int64) ** 2)
+    first = 0
+    while first < len(starts):
+        base = cost[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(cost, base + BLOCK_PAIRS, side="right")))
+        lo = starts[first]
+        hi = starts[last] if last < len(starts) else len(members)
+        group_start = np.repeat(starts[first:last] - lo, sizes[first:last])
+        group_size = np.repeat(sizes[first:last], sizes[first:last])
+        block_books = books[lo:hi]
+        mask = block_books % buckets == bucket
+        left_books = block_books[mask]
+        repeat = group_size[mask]
+        total = int(repeat.sum())
+        if total:
+            left = np.repeat(left_books, repeat).astype(np.int64)
+            offsets = np.repeat(np.cumsum(repeat) - repeat, repeat)
+            right_index = np.repeat(group_start[mask], repeat) + (np.arange(total) - offsets)
+            right = block_books[right_index].astype(np.int64)
+            keep = left != right
+            keys, counts = np.unique(left[keep] * span + right[keep], return_counts=True)
+            keys_out.append(keys)
+            counts_out.append(counts)
+        first = last
+    return keys_out, counts_out
+
+
+def _merge(keys_list, counts_list):
+    np = _np()
+    keys = np.concatenate(keys_list)
+    counts = np.concatenate(counts_list)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+def _top_k(keys, counts, borrowers, span: int, top_k: int, min_support: int):
+    """Rank each book's neighbours by cosine score; returns (book, rank, related, score) arrays."""
+    np = _np()
+    keep = counts >= min_support
+    keys, counts = keys[keep], counts[keep]
+    left = keys // span
+    right = keys % span
+    score = counts / np.sqrt(borrowers[left].astype(np.float64) * borrowers[right])
+    order = np.lexsort((right, -score, left))
+    left, right, score = left[order], right[order], score[order]
+    starts = np.flatnonzero(np.r_[True, left[1:] != left[:-1]]) if len(left) else np.array([], dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(left)])
+    rank = np.arange(len(left)) - np.repeat(starts, sizes)
+    keep = rank < top_k
+    return left[keep], rank[keep] + 1, right[keep], score[keep]
+
+
+def build(top_k: int = TOP_K, max_history: int = MAX_HISTORY, min_support: int = MIN_SUPPORT,
+          max_entries: int = MAX_ENTRIES, repo=None, log=print) -> int:
+    """Recompute all recommendations. Returns the number of rows stored."""
+    np = _np()
+    repo = repo or RecommendationRepository()
+    repo.create_table()
+    workdir = tempfile.mkdtemp(prefix="library-recs-")
+    try:
+        started = time.perf_counter()
+        spool_path = os.path.join(workdir, "histories.i32")
+        items, max_book, expansions = spool_histories(repo, spool_path, max_history)
+        log(f"✓ {items:,} member/book pairs spooled ({time.perf_counter() - started:.1f}s)")
+        if not items:
+            return repo.replace_all([])
+
+        span = max_book + 1
+        spool = np.memmap(spool_path, dtype=np.int32, mode="r").reshape(-1, 2)
+        borrowers = np.zeros(span, dtype=np.int64)
+        for _, books in _member_chunks(spool):
+            borrowers += np.bincount(books, minlength=span)
+
+        buckets = max(1, -(-expansions // max_entries))
+        result_paths = []
+        for bucket in range(buckets):
+            started = time.perf_counter()
+            keys_list, counts_list = [], []
+            pending = 0
+            for members, books in _member_chunks(spool):
+                keys, counts = _block_cooccurrence(members, books, span, bucket, buckets)
+                keys_list += keys
+                counts_list += counts
+                pending += sum(len(k) for k in keys)
+                if pending > max_entries and len(keys_list) > 1:
+                    merged = _merge(keys_list, counts_list)
+                    keys_list, counts_list = [merged[0]], [merged[1]]
+                    pending = len(merged[0])
+            if not keys_list:
+                continue
+            keys, counts = _merge(keys_list, counts_list)
+            result = _top_k(keys, counts, borrowers, span, top_k, min_support)
+            path = os.path.join(workdir, f"top-{bucket}.npz")
+            np.savez(path, book=result[0], rank=result[1], related=result[2], score=result[3])
+            result_paths.append(path)
+            log(f"✓ pass {bucket + 1}/{buckets}: {len(keys):,} book pairs ({time.perf_counter() - started:.1f}s)")
+
+        def _chunks():
+            for path in result_paths:
+                data = np.load(path)
+                for start in range(0, len(data["book"]), WRITE_ROWS):
+                    end = start + WRITE_ROWS
+                    yield list(zip(
+                        data["book"][start:end].tolist(),
+                        data["rank"][start:end].tolist(),
+                        data["related"][start:end].tolist(),
+                        data["score"][start:end].tolist(),
+                    ))
+
+        started = time.perf_counter()
+        stored = repo.replace_all(_chunks())
+        log(f"✓ {stored:,} recommendations stored ({time.perf_counter() - started:.1f}s)")
+        return stored
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build 'borrowed together' recommendations")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="neighbours stored per book")
+    parser.add_argument("--max-history", type=int, default=MAX_HISTORY, help="recent books used per member")
+    parser.add_argument("--min-support", type=int, default=MIN_SUPPORT, help="minimum shared borrowers")
+    parser.add_argument("--max-entries", type=int, default=MAX_ENTRIES, help="book pairs held in memory per pass")
+    args = parser.parse_args(argv)
+    try:
+        build(args.top_k, args.max_history, args.min_support, args.max_entries)
+    except ImportError as e:
+        print(f"✗ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
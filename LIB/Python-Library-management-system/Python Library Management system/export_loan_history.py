@@ -0,0 +1,249 @@
+"""
+Export loan history (loans joined with books and members) into compressed
+columnar files for analytics, so reporting never queries the OLTP tables.
+
+Files are partitioned by the month of loan_date:
+
+    <dir>/loan_month=2024-05/loans.parquet   (pyarrow installed, zstd)
+    <dir>/loan_month=2024-05/loans.npz       (NumPy fallback, one array per column)
+
+Each run is incremental: only months containing loans created or returned
+since the previous run are re-exported, and each of those month files is
+rewritten whole, so every file is a complete, de-duplicated snapshot of its
+month. Rows are streamed from the server with COPY TO and read through the
+replica when LIB_DB_REPLICA_HOSTS is configured.
+
+Run from the project folder:
+
+    python3 export_loan_history.py                      # incremental, ./analytics
+    python3 export_loan_history.py --dir /srv/analytics --full
+    python3 export_loan_history.py --format npz         # force the NumPy writer
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from infrastructure.db import connection_scope
+
+# (column, type) in export order; types: int, timestamp, text.
+COLUMNS = [
+    ("loan_id", "int"),
+    ("book_id", "int"),
+    ("member_id", "int"),
+    ("loan_date", "timestamp"),
+    ("due_date", "timestamp"),
+    ("return_date", "timestamp"),
+    ("title", "text"),
+    ("author", "text"),
+    ("isbn", "text"),
+    ("genre", "text"),
+    ("year", "text"),
+    ("member_role", "text"),
+]
+
+# Timestamps leave the server as fixed-width ISO 8601 UTC strings.
+_TIMESTAMP = "to_char({0} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"Z\"')"
+
+EXPORT_SQL = f"""
+SELECT l.id, l.book_id, l.member_id,
+       {_TIMESTAMP.format("l.loan_date")},
+       {_TIMESTAMP.format("l.due_date")},
+       {_TIMESTAMP.format("l.return_date")},
+       b.title, a.name, b.isbn, g.name, b.year::text, r.name
+FROM loans l
+JOIN books b ON b.id = l.book_id
+JOIN authors a ON a.id = b.author_id
+JOIN genres g ON g.id = b.genre_id
+JOIN users u ON u.id = l.member_id
+JOIN roles r ON r.id = u.role_id
+WHERE l.loan_date >= {{start}} AND l.loan_date < {{end}}
+ORDER BY l.id
+"""
+
+# Loans created, or returned, since the watermark. A return is only looked
+# for among loans from the last RETURN_LOOKBACK so both halves prune to
+# recent partitions; use --full to pick up anything older.
+CHANGED_MONTHS_SQL = """
+SELECT to_char(loan_date AT TIME ZONE 'UTC', 'YYYY-MM') FROM loans WHERE loan_date >= %(since)s
+UNION
+SELECT to_char(loan_date AT TIME ZONE 'UTC', 'YYYY-MM') FROM loans
+WHERE loan_date >= %(since)s - %(lookback)s AND return_date >= %(since)s
+"""
+ALL_MONTHS_SQL = "SELECT DISTINCT to_char(loan_date AT TIME ZONE 'UTC', 'YYYY-MM') FROM loans"
+
+RETURN_LOOKBACK = timedelta(days=365)
+# Writes still in flight (or not yet replayed on a replica) when a run starts
+# are caught by the next run because the watermark trails the start time.
+SAFETY_MARGIN = timedelta(minutes=10)
+
+STATE_FILE = "_export_state.json"
+
+
+def _load_state(directory: str) -> dict:
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(directory: str, state: dict) -> None:
+    path = os.path.join(directory, STATE_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _month_bounds(month: str):
+    year, mon = (int(part) for part in month.split("-"))
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + (mon == 12), mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _write_parquet(spool, path: str) -> int:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "timestamp": pa.timestamp("us", tz="UTC"), "text": pa.string()}
+    reader = pacsv.open_csv(
+        spool,
+        read_options=pacsv.ReadOptions(column_names=[name for name, _ in COLUMNS]),
+        convert_options=pacsv.ConvertOptions(column_types={name: types[kind] for name, kind in COLUMNS}),
+    )
+    rows = 0
+    with pq.ParquetWriter(path, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch]))
+            rows += batch.num_rows
+    return rows
+
+
+def _write_npz(spool, path: str) -> int:
+    import numpy as np
+
+    values = [[] for _ in COLUMNS]
+    text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    for record in csv.reader(text):
+        for column, value in zip(values, record):
+            column.append(value)
+    arrays = {}
+    for (name, kind), column in zip(COLUMNS, values):
+        if kind == "int":
+            arrays[name] = np.array(column, dtype=np.int64)
+        elif kind == "timestamp":
+            # NaT for NULL; datetime64 is naive, the values are UTC.
+            arrays[name] = np.array([value[:-1] if value else "NaT" for value in column], dtype="datetime64[us]")
+        else:
+            arrays[name] = np.array(column, dtype=str)
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    return len(values[0])
+
+
+WRITERS = {"parquet": (".parquet", _write_parquet), "npz": (".npz", _write_npz)}
+
+
+def resolve_format(name: str) -> str:
+    """
+    'auto' picks Parquet when pyarrow is importable, else NumPy. Raises
+    ImportError if the chosen writer's library is not installed.
+    """
+    candidates = ["parquet", "npz"] if name == "auto" else [name]
+    for fmt in candidates:
+        try:
+            if fmt == "parquet":
+                import pyarrow.parquet  # noqa: F401
+            else:
+                import numpy  # noqa: F401
+            return fmt
+        except ImportError:
+            continue
+    raise ImportError("Columnar export needs pyarrow (Parquet) or numpy (.npz): pip install pyarrow")
+
+
+def export_month(month: str, directory: str, fmt: str) -> int:
+    """Rewrite one month's file atomically. Returns rows written."""
+    suffix, writer = WRITERS[fmt]
+    start, end = _month_bounds(month)
+    month_dir = os.path.join(directory, f"loan_month={month}")
+    os.makedirs(month_dir, exist_ok=True)
+    path = os.path.join(month_dir, "loans" + suffix)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with tempfile.TemporaryFile() as spool:
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                sql = EXPORT_SQL.format(start=cur.mogrify("%s", (start,)).decode(), end=cur.mogrify("%s", (end,)).decode())
+                cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", spool)
+        spool.seek(0)
+        try:
+            rows = writer(spool, tmp_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+    return rows
+
+
+def export(directory: str, fmt: str = "auto", full: bool = False) -> dict:
+    """
+    Export every month changed since the last run (all months with
+    full=True) and advance the watermark. Returns {month: rows}.
+    """
+    fmt = resolve_format(fmt)
+    os.makedirs(directory, exist_ok=True)
+    state = _load_state(directory)
+    started = datetime.now(timezone.utc)
+    since = None if full or "watermark" not in state else datetime.fromisoformat(state["watermark"])
+
+    with connection_scope(readonly=True) as conn:
+        with conn.cursor() as cur:
+            if since is None:
+                cur.execute(ALL_MONTHS_SQL)
+            else:
+                cur.execute(CHANGED_MONTHS_SQL, {"since": since, "lookback": RETURN_LOOKBACK})
+            months = sorted(month for (month,) in cur.fetchall())
+
+    exported = {}
+    for month in months:
+        exported[month] = export_month(month, directory, fmt)
+        state.setdefault("months", {})[month] = exported[month]
+    state["format"] = fmt
+    state["watermark"] = (started - SAFETY_MARGIN).isoformat()
+    _save_state(directory, state)
+    return exported
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export loan history to columnar files")
+    parser.add_argument("--dir", default="analytics", help="output directory")
+    parser.add_argument("--format", choices=["auto", "parquet", "npz"], default="auto")
+    parser.add_argument("--full", action="store_true", help="re-export every month")
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = resolve_format(args.format)
+    except ImportError as e:
+        print(f"✗ {e}")
+        return 1
+    exported = export(args.dir, fmt, full=args.full)
+    if not exported:
+        print("✓ Nothing changed since the last export.")
+        return 0
+    for month, rows in exported.items():
+        print(f"✓ {month}: {rows:,} loans")
+    print(f"✓ {len(exported)} month file(s) written to {args.dir} ({fmt})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
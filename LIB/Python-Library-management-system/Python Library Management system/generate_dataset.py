@@ -0,0 +1,333 @@
+"""
+Generate a reproducible, production-sized synthetic dataset and bulk load it
+into PostgreSQL with COPY.
+
+The same --seed always produces the same rows, so performance problems seen
+on one machine can be reproduced on another. Examples:
+
+    python3 generate_dataset.py --books 1000000 --members 200000 --loans 20000000
+    python3 generate_dataset.py --scale small --truncate
+
+Connection settings come from the usual LIB_DB_* environment variables.
+"""
+
+import argparse
+import bisect
+import hashlib
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from infrastructure.db import connection_scope
+from repositories.author_repository import AuthorRepository
+from repositories.book_repository import BookRepository
+from repositories.genre_repository import GenreRepository
+from repositories.hold_repository import HoldRepository
+from repositories.loan_repository import LoanRepository
+from repositories.notice_repository import NoticeRepository
+from repositories.stats_repository import StatsRepository
+from services.auth_service import AuthService
+from services.loan_service import LoanService
+
+SCALES = {
+    "small": {"books": 10_000, "members": 2_000, "loans": 100_000},
+    "medium": {"books": 100_000, "members": 20_000, "loans": 2_000_000},
+    "large": {"books": 1_000_000, "members": 200_000, "loans": 20_000_000},
+}
+
+CHUNK_ROWS = 50_000
+
+# Genre weights roughly follow a public library's circulation mix.
+GENRES = [
+    ("Fiction", 18), ("Mystery", 10), ("Thriller", 8), ("Romance", 9),
+    ("Fantasy", 8), ("Science Fiction", 6), ("Children", 10), ("Young Adult", 6),
+    ("History", 5), ("Biography", 5), ("Science", 4), ("Self-Help", 4),
+    ("Psychology", 2), ("Computer Science", 2), ("Programming", 1), ("Poetry", 2),
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "David", "Elizabeth", "William", "Barbara", "Thabo", "Lerato", "Palesa", "Tumelo",
+    "Kwame", "Amina", "Chen", "Mei", "Arjun", "Priya", "Hiroshi", "Yuki", "Carlos",
+    "Sofia", "Ahmed", "Fatima", "Ivan", "Olga", "Lucas", "Emma", "Noah", "Olivia",
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Mokoena", "Nkosi", "Dlamini", "Mensah", "Okafor", "Wang", "Li", "Patel",
+    "Sharma", "Tanaka", "Suzuki", "Rodriguez", "Martinez", "Hernandez", "Lopez",
+    "Ivanov", "Petrov", "Muller", "Schmidt", "Rossi", "Dubois", "Silva", "Khan",
+]
+
+TITLE_WORDS = [
+    "Shadow", "River", "Silent", "Garden", "Night", "Empire", "Secret", "Light",
+    "Storm", "Winter", "Stone", "Fire", "Last", "Lost", "City", "Heart", "Ocean",
+    "Dream", "Crown", "Road", "House", "Star", "Glass", "Iron", "Song", "Memory",
+    "Journey", "Island", "Kingdom", "Mountain", "Forest", "Letters", "Code",
+    "Algorithms", "History", "Science", "Mind", "Habits", "Time", "Wolves",
+]
+
+TITLE_PATTERNS = [
+    "The {a} {b}",
+    "{a} of the {b}",
+    "The {a} and the {b}",
+    "{a} {b}",
+    "A {a} in the {b}",
+    "The Last {a}",
+    "{a}: A {b} Story",
+]
+
+DEFAULT_PASSWORD = "member123"
+
+
+class _WeightedPicker:
+    """Draw items by weight in O(log n) using a cumulative table."""
+
+    def __init__(self, items, weights):
+        self._items = list(items)
+        self._cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            self._cumulative.append(total)
+        self._total = total
+
+    def pick(self, rng: random.Random):
+        index = bisect.bisect_right(self._cumulative, rng.random() * self._total)
+        return self._items[min(index, len(self._items) - 1)]
+
+
+def _zipf_weights(n: int, s: float = 1.1):
+    """Popularity weights where rank 1 is borrowed far more than rank n."""
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def _copy_rows(cur, table: str, columns, rows) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(r"\N" if value is None else str(value) for value in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def _chunks(total: int):
+    start = 0
+    while start < total:
+        yield start, min(CHUNK_ROWS, total - start)
+        start += CHUNK_ROWS
+
+
+def _next_id(cur, table: str) -> int:
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cur.fetchone()[0]
+
+
+def _reset_sequence(cur, table: str) -> None:
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+    )
+
+
+def ensure_schema() -> None:
+    """Create all tables (and default roles) the generator writes to."""
+    AuthService()
+    BookRepository().create_table()
+    LoanRepository().create_table()
+    HoldRepository().create_table()
+    NoticeRepository().create_table()
+    StatsRepository().create_table()
+
+
+def truncate_all() -> None:
+    """Remove loans, books, authors, genres and every member except the built-in demo users."""
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "TRUNCATE notice_outbox, notice_checkpoints, holds, loans, books, book_facets, authors, genres "
+                "RESTART IDENTITY"
+            )
+            cur.execute(
+                "DELETE FROM members WHERE id IN "
+                "(SELECT id FROM users WHERE username NOT IN ('librarian', 'member'))"
+            )
+            cur.execute("DELETE FROM users WHERE username NOT IN ('librarian', 'member')")
+
+
+def generate_books(count: int, rng: random.Random):
+    """Load `count` books. Returns {book_id: quantity} for the new books."""
+    genre_ids = GenreRepository().get_or_create_ids(g for g, _ in GENRES)
+    genre_picker = _WeightedPicker([genre_ids[g] for g, _ in GENRES], [w for _, w in GENRES])
+    # A few prolific authors, a long tail of one-book authors.
+    author_count = max(1, count // 4)
+    authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(author_count)]
+    # Repeated names resolve to the same author row.
+    author_ids = AuthorRepository().get_or_create_ids(authors)
+    author_picker = _WeightedPicker([author_ids[name] for name in authors], _zipf_weights(author_count, 0.8))
+
+    quantities = {}
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            first_id = _next_id(cur, "books")
+            for offset, size in _chunks(count):
+                rows = []
+                for i in range(offset, offset + size):
+                    book_id = first_id + i
+                    title = rng.choice(TITLE_PATTERNS).format(
+                        a=rng.choice(TITLE_WORDS), b=rng.choice(TITLE_WORDS)
+                    )
+                    # Skew publication years towards recent decades.
+                    year = 2025 - int(rng.expovariate(1 / 25.0)) % 300
+                    isbn = f"978{book_id:010d}"
+                    quantity = 1 + int(rng.expovariate(1.0))
+                    quantities[book_id] = quantity
+                    rows.append((book_id, title, author_picker.pick(rng), isbn, genre_picker.pick(rng), year, quantity))
+                _copy_rows(cur, "books", ("id", "title", "author_id", "isbn", "genre_id", "year", "quantity"), rows)
+            _reset_sequence(cur, "books")
+    return quantities
+
+
+def generate_members(count: int, rng: random.Random):
+    """Load `count` MEMBER users. Returns the list of new member ids."""
+    password_hash = hashlib.sha256(DEFAULT_PASSWORD.encode("utf-8")).hexdigest()
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM roles WHERE name = 'MEMBER'")
+            role_id = cur.fetchone()[0]
+            first_id = _next_id(cur, "users")
+            for offset, size in _chunks(count):
+                users, members = [], []
+                for i in range(offset, offset + size):
+                    member_id = first_id + i
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    users.append((member_id, f"{first.lower()}.{last.lower()}{member_id}", password_hash, role_id))
+                    members.append((member_id, f"{first} {last}"))
+                _copy_rows(cur, "users", ("id", "username", "password_hash", "role_id"), users)
+                _copy_rows(cur, "members", ("id", "full_name"), members)
+            _reset_sequence(cur, "users")
+    return list(range(first_id, first_id + count))
+
+
+def generate_loans(count: int, book_quantities, member_ids, rng: random.Random, years: int = 5) -> None:
+    """
+    Load `count` loans spread over the last `years` years.
+
+    Book popularity is Zipf-distributed and member activity is skewed, so a
+    minority of titles and patrons account for most circulation. Old loans are
+    returned (some late); recent ones may still be out or overdue. No member
+    ends up with more than LoanService.MAX_ACTIVE_LOANS_PER_MEMBER active
+    loans, and no book with more active loans than its quantity
+    (`book_quantities` maps book id to quantity); a loan that would break
+    either limit is returned now instead.
+    """
+    if not book_quantities or not member_ids:
+        return
+    shuffled_books = list(book_quantities)
+    rng.shuffle(shuffled_books)
+    book_picker = _WeightedPicker(shuffled_books, _zipf_weights(len(shuffled_books)))
+    member_picker = _WeightedPicker(member_ids, [rng.paretovariate(1.5) for _ in member_ids])
+
+    now = datetime.now(timezone.utc)
+    span_seconds = years * 365 * 86400
+    active = {}
+    out = {}
+    max_active = LoanService.MAX_ACTIVE_LOANS_PER_MEMBER
+    loan_days = LoanService.LOAN_DAYS
+
+    # Route the history into yearly partitions rather than loans_default.
+    LoanRepository().ensure_partitions((now - timedelta(seconds=span_seconds)).year, now.year + 1)
+
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            # Row-by-row counter maintenance would dominate a COPY of millions
+            # of loans; counters and rollups are recomputed set-based after the load.
+            cur.execute("ALTER TABLE loans DISABLE TRIGGER loans_maintain_counters")
+            cur.execute("ALTER TABLE loans DISABLE TRIGGER loans_record_event")
+            first_id = _next_id(cur, "loans")
+            for offset, size in _chunks(count):
+                rows = []
+                for i in range(offset, offset + size):
+                    member_id = member_picker.pick(rng)
+                    loan_date = now - timedelta(seconds=rng.random() * span_seconds)
+                    due_date = loan_date + timedelta(days=loan_days)
+                    # Most books come back around the due date; ~8% are late.
+                    if rng.random() < 0.92:
+                        kept = rng.uniform(1, loan_days)
+                    else:
+                        kept = loan_days + rng.expovariate(1 / 10.0)
+                    return_date = loan_date + timedelta(days=kept)
+                    book_id = book_picker.pick(rng)
+                    if return_date > now:
+                        if active.get(member_id, 0) < max_active and out.get(book_id, 0) < book_quantities[book_id]:
+                            active[member_id] = active.get(member_id, 0) + 1
+                            out[book_id] = out.get(book_id, 0) + 1
+                            return_date = None
+                        else:
+                            return_date = now
+                    rows.append((first_id + i, book_id, member_id, loan_date, due_date, return_date))
+                _copy_rows(cur, "loans", ("id", "book_id", "member_id", "loan_date", "due_date", "return_date"), rows)
+            _reset_sequence(cur, "loans")
+            cur.execute("ALTER TABLE loans ENABLE TRIGGER loans_maintain_counters")
+            cur.execute("ALTER TABLE loans ENABLE TRIGGER loans_record_event")
+
+
+def generate(books: int, members: int, loans: int, seed: int = 42, years: int = 5, truncate: bool = False) -> None:
+    rng = random.Random(seed)
+    ensure_schema()
+    if truncate:
+        truncate_all()
+
+    started = time.perf_counter()
+    book_quantities = generate_books(books, rng)
+    print(f"✓ {books:,} books loaded ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    member_ids = generate_members(members, rng)
+    print(f"✓ {members:,} members loaded ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    generate_loans(loans, book_quantities, member_ids, rng, years=years)
+    print(f"✓ {loans:,} loans loaded ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    LoanRepository().reconcile_counters(fix=True)
+    print(f"✓ availability counters recomputed ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    StatsRepository().rebuild()
+    print(f"✓ circulation rollups rebuilt ({time.perf_counter() - started:.1f}s)")
+
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE books; ANALYZE users; ANALYZE members; ANALYZE loans;")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), help="preset sizes (overridden by explicit counts)")
+    parser.add_argument("--books", type=int)
+    parser.add_argument("--members", type=int)
+    parser.add_argument("--loans", type=int)
+    parser.add_argument("--years", type=int, default=5, help="loan history span in years")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="clear books, loans and generated members first")
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale or "small"])
+    for key in ("books", "members", "loans"):
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    try:
+        generate(seed=args.seed, years=args.years, truncate=args.truncate, **sizes)
+    except Exception as e:
+        print(f"✗ Dataset generation failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
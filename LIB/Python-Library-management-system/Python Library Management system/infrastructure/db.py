@@ -1,8 +1,49 @@
+import json
 import os
+import re
+import threading
+import time
 from contextlib import contextmanager
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 import psycopg2
+import psycopg2.extensions
+
+from infrastructure import metrics
+from infrastructure.instrumentation import InstrumentedCursor, QueryStats, settings_from_env
+
+# Base class of every error the driver raises (connection failures, SQL
+# errors), for callers that report them without importing psycopg2.
+DatabaseError = psycopg2.Error
+
+_CONNECTIONS_OPENED = metrics.REGISTRY.counter(
+    "library_db_connections_opened_total", "PostgreSQL connections opened."
+)
+_CONNECTIONS_IN_USE = metrics.REGISTRY.gauge(
+    "library_db_connections_in_use", "Connections currently held by connection_scope."
+)
+_CONNECT_SECONDS = metrics.REGISTRY.histogram(
+    "library_db_connect_seconds", "Time to establish a PostgreSQL connection."
+)
+_TRANSACTIONS = metrics.REGISTRY.counter(
+    "library_db_transactions_total", "connection_scope transactions by outcome."
+)
+_POOL_IDLE = metrics.REGISTRY.gauge(
+    "library_db_pool_idle_connections", "Open connections waiting in each pool."
+)
+_POOL_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    "library_db_pool_acquire_seconds", "Time connection_scope waited for a connection."
+)
+_ROUTED_SCOPES = metrics.REGISTRY.counter(
+    "library_db_routed_scopes_total", "connection_scope transactions by target server."
+)
+_REPLICA_LAG = metrics.REGISTRY.gauge(
+    "library_db_replica_lag_seconds", "Last measured replay lag per read replica."
+)
+
+# Query instrumentation is off unless LIB_DB_INSTRUMENT is set or
+# enable_instrumentation() is called; when off, cursors are plain.
+_query_stats: Optional[QueryStats] = None
 
 
 def _get_connection_params() -> Dict[str, Any]:
@@ -44,29 +85,510 @@ def _get_connection_params() -> Dict[str, Any]:
     }
 
 
-def get_connection():
+def _get_replica_params() -> List[Dict[str, Any]]:
+    """
+    Connection parameters for the optional read replicas, one per entry of
+      - LIB_DB_REPLICA_HOSTS  comma-separated host[:port] list (default: none)
+
+    Replicas share the primary's database name and credentials; a missing
+    port defaults to LIB_DB_PORT.
+    """
+    hosts = os.getenv("LIB_DB_REPLICA_HOSTS", "").strip()
+    if not hosts:
+        return []
+    base = _get_connection_params()
+    replicas = []
+    for entry in hosts.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port_str = entry.partition(":")
+        params = dict(base, host=host)
+        if port_str:
+            try:
+                params["port"] = int(port_str)
+            except ValueError:
+                raise ValueError(f"LIB_DB_REPLICA_HOSTS port must be a valid integer, got: {entry}")
+        replicas.append(params)
+    return replicas
+
+
+class _LibraryConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection that remembers which statements it has prepared.
+    `prepared` is None for one-shot connections, a set for pooled ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = None
+
+
+def get_connection(params: Optional[Dict[str, Any]] = None):
     """
-    Return a new psycopg2 connection.
-    Callers are responsible for closing it, or use connection_scope.
+    Return a new psycopg2 connection to the primary, or to the server
+    described by `params`. Callers are responsible for closing it, or use
+    connection_scope.
     """
+    started = time.perf_counter()
     # pyright: ignore[reportGeneralTypeIssues]
-    return psycopg2.connect(**_get_connection_params())
+    conn = psycopg2.connect(connection_factory=_LibraryConnection, **(params or _get_connection_params()))
+    _CONNECT_SECONDS.observe(time.perf_counter() - started)
+    _CONNECTIONS_OPENED.inc()
+    return conn
+
+
+class _ConnectionPool:
+    """
+    Blocking LIFO pool of long-lived connections used by connection_scope.
+
+    Keeping connections open avoids a TCP/auth handshake per repository call
+    and lets connections keep server-side prepared statements.
+    """
+
+    def __init__(self, max_size: int, timeout: float, params: Optional[Dict[str, Any]] = None, name: str = "primary"):
+        self._max_size = max_size
+        self._timeout = timeout
+        self._params = params
+        self.name = name
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + self._timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    _POOL_IDLE.set(len(self._idle), pool=self.name)
+                    return conn
+                if self._size < self._max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise psycopg2.OperationalError(
+                        f"Timed out after {self._timeout:.0f}s waiting for a database connection "
+                        f"(pool size {self._max_size})"
+                    )
+        try:
+            conn = get_connection(self._params)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        conn.prepared = set()
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        with self._cond:
+            if discard or conn.closed:
+                self._size -= 1
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+            else:
+                self._idle.append(conn)
+            _POOL_IDLE.set(len(self._idle), pool=self.name)
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+            _POOL_IDLE.set(0, pool=self.name)
+
+
+_pool: Optional[_ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_settings():
+    """
+    Pool sizing, shared by the primary and every replica pool:
+      - LIB_DB_POOL_SIZE    (default: 5; 0 opens a new connection per scope)
+      - LIB_DB_POOL_TIMEOUT (default: 30 seconds to wait for a free connection)
+    """
+    size_str = os.getenv("LIB_DB_POOL_SIZE", "5")
+    timeout_str = os.getenv("LIB_DB_POOL_TIMEOUT", "30")
+    try:
+        size = int(size_str)
+    except ValueError:
+        raise ValueError(f"LIB_DB_POOL_SIZE must be a valid integer, got: {size_str}")
+    try:
+        timeout = float(timeout_str)
+    except ValueError:
+        raise ValueError(f"LIB_DB_POOL_TIMEOUT must be a number, got: {timeout_str}")
+    return size, timeout
+
+
+def _get_pool() -> Optional[_ConnectionPool]:
+    """The shared primary pool, created on first use (None when pooling is off)."""
+    global _pool
+    if _pool is None:
+        size, timeout = _pool_settings()
+        if size <= 0:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = _ConnectionPool(size, timeout)
+    return _pool
+
+
+def _env_seconds(name: str, default: str) -> float:
+    value = os.getenv(name, default)
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got: {value}")
+
+
+class _Replica:
+    """One read replica: its pool (or params when pooling is off) and health."""
+
+    def __init__(self, params: Dict[str, Any], pool: Optional[_ConnectionPool]):
+        self.params = params
+        self.pool = pool
+        self.name = f"{params['host']}:{params['port']}"
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.down_until = 0.0
+
+    def acquire(self):
+        return self.pool.acquire() if self.pool is not None else get_connection(self.params)
+
+    def release(self, conn, discard: bool = False) -> None:
+        if self.pool is not None:
+            self.pool.release(conn, discard=discard)
+        else:
+            conn.close()
+
+
+class _ReplicaRouter:
+    """
+    Chooses a replica for read-only scopes. Configured by:
+      - LIB_DB_REPLICA_HOSTS          replicas to read from (see _get_replica_params)
+      - LIB_DB_REPLICA_MAX_LAG        (default: 5) skip a replica whose replay lag
+                                      exceeds this many seconds
+      - LIB_DB_REPLICA_LAG_CHECK      (default: 1) seconds to trust a lag reading
+      - LIB_DB_READ_YOUR_WRITES       (default: LIB_DB_REPLICA_MAX_LAG) seconds after
+                                      a committed write during which the same
+                                      thread keeps reading from the primary
+
+    Replicas are tried round-robin; one that is too far behind or refuses
+    connections is skipped, and if none qualifies the read goes to the primary.
+    """
+
+    # Zero when caught up with everything received (an idle primary sends no
+    # new WAL, so the last replay timestamp alone would overstate the lag).
+    LAG_SQL = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery()
+              OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+    DOWN_SECONDS = 30.0
+
+    def __init__(self, replicas: List[_Replica]):
+        self.replicas = replicas
+        self.max_lag = _env_seconds("LIB_DB_REPLICA_MAX_LAG", "5")
+        self.lag_check = _env_seconds("LIB_DB_REPLICA_LAG_CHECK", "1")
+        self.sticky_seconds = _env_seconds("LIB_DB_READ_YOUR_WRITES", str(self.max_lag))
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _measure_lag(self, replica: _Replica, conn) -> float:
+        with conn.cursor() as cur:
+            cur.execute(self.LAG_SQL)
+            lag = float(cur.fetchone()[0])
+        conn.rollback()
+        replica.lag = lag
+        replica.checked_at = time.monotonic()
+        _REPLICA_LAG.set(lag, replica=replica.name)
+        return lag
+
+    def acquire(self):
+        """Return (replica, connection) for a fresh-enough replica, or (None, None)."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.down_until > now:
+                continue
+            if replica.lag is not None and now - replica.checked_at < self.lag_check and replica.lag > self.max_lag:
+                continue
+            try:
+                conn = replica.acquire()
+            except psycopg2.OperationalError:
+                replica.down_until = now + self.DOWN_SECONDS
+                continue
+            try:
+                if replica.lag is None or now - replica.checked_at >= self.lag_check:
+                    self._measure_lag(replica, conn)
+            except psycopg2.Error:
+                replica.release(conn, discard=True)
+                replica.down_until = now + self.DOWN_SECONDS
+                continue
+            if replica.lag > self.max_lag:
+                replica.release(conn)
+                continue
+            return replica, conn
+        return None, None
+
+
+_router: Optional[_ReplicaRouter] = None
+_router_loaded = False
+
+
+def _get_router() -> Optional[_ReplicaRouter]:
+    """The replica router, or None when LIB_DB_REPLICA_HOSTS is not set."""
+    global _router, _router_loaded
+    if not _router_loaded:
+        with _pool_lock:
+            if not _router_loaded:
+                params = _get_replica_params()
+                if params:
+                    size, timeout = _pool_settings()
+                    replicas = []
+                    for replica_params in params:
+                        name = f"{replica_params['host']}:{replica_params['port']}"
+                        pool = _ConnectionPool(size, timeout, replica_params, name) if size > 0 else None
+                        replicas.append(_Replica(replica_params, pool))
+                    _router = _ReplicaRouter(replicas)
+                _router_loaded = True
+    return _router
+
+
+def close_pool() -> None:
+    """Close idle pooled connections (e.g. before exit or after a fork)."""
+    global _pool, _router, _router_loaded
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+        if _router is not None:
+            for replica in _router.replicas:
+                if replica.pool is not None:
+                    replica.pool.close_all()
+        _router = None
+        _router_loaded = False
+
+
+_scope_state = threading.local()
+
+
+@contextmanager
+def _savepoint_scope(conn):
+    """Nested connection_scope: run inside the outer transaction under a savepoint."""
+    depth = _scope_state.depth
+    name = f"scope_{depth}"
+    with conn.cursor() as cur:
+        cur.execute(f"SAVEPOINT {name}")
+    _scope_state.depth = depth + 1
+    try:
+        yield conn
+        with conn.cursor() as cur:
+            cur.execute(f"RELEASE SAVEPOINT {name}")
+    except Exception:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        except psycopg2.Error:
+            pass
+        raise
+    finally:
+        _scope_state.depth = depth
 
 
 @contextmanager
-def connection_scope():
+def connection_scope(readonly: bool = False):
     """
     Context manager that opens a connection and commits/rolls back safely.
+    Connections come from the shared pool unless LIB_DB_POOL_SIZE is 0.
+
+    Scopes nest per thread: a connection_scope opened while another is active
+    reuses the outer connection under a savepoint instead of committing, so a
+    service can wrap several repository calls in one transaction. A failing
+    inner scope rolls back only its own work.
+
+    `readonly=True` marks a pure read that may be served by a read replica
+    (see _ReplicaRouter). It still goes to the primary when nested in another
+    scope, when no replica is fresh enough, or shortly after this thread
+    committed a write, so a librarian always sees their own changes.
     """
-    conn = get_connection()
+    outer = getattr(_scope_state, "conn", None)
+    if outer is not None:
+        with _savepoint_scope(outer) as conn:
+            yield conn
+        return
+
+    router = _get_router()
+    replica = None
+    started = time.perf_counter()
+    conn = None
+    if readonly and router is not None:
+        last_write = getattr(_scope_state, "last_write", 0.0)
+        if time.monotonic() - last_write >= router.sticky_seconds:
+            replica, conn = router.acquire()
+    pool = _get_pool() if replica is None else replica.pool
+    if conn is None:
+        conn = pool.acquire() if pool is not None else get_connection()
+    _ROUTED_SCOPES.inc(target="replica" if replica is not None else "primary")
+    waited = time.perf_counter() - started
+    _POOL_WAIT_SECONDS.observe(waited)
+    if _query_stats is not None:
+        _query_stats.record_acquire(waited * 1000)
+        conn.cursor_factory = InstrumentedCursor
+    elif conn.cursor_factory is not None:
+        conn.cursor_factory = None
+    _CONNECTIONS_IN_USE.inc()
+    _scope_state.conn = conn
+    _scope_state.depth = 0
+    broken = False
     try:
         yield conn
+        wrote = False
+        if router is not None and replica is None and not readonly:
+            # Only transactions that were assigned an xid wrote anything.
+            with conn.cursor() as cur:
+                cur.execute("SELECT txid_current_if_assigned() IS NOT NULL")
+                wrote = cur.fetchone()[0]
         conn.commit()
-    except Exception:
-        conn.rollback()
+        if wrote:
+            _scope_state.last_write = time.monotonic()
+        _TRANSACTIONS.inc(outcome="commit")
+    except Exception as e:
+        broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        _TRANSACTIONS.inc(outcome="rollback")
         raise
     finally:
-        conn.close()
+        _scope_state.conn = None
+        _CONNECTIONS_IN_USE.dec()
+        if replica is not None:
+            replica.release(conn, discard=broken)
+        elif pool is not None:
+            pool.release(conn, discard=broken)
+        else:
+            conn.close()
+
+
+_PREPARED_ENABLED = os.getenv("LIB_DB_PREPARED", "1").lower() not in ("0", "false", "no", "off")
+_PLACEHOLDER = re.compile(r"%s")
+
+
+def execute_prepared(cur, name: str, sql: str, params: tuple) -> None:
+    """
+    Execute `sql` (written with %s placeholders) as the server-side prepared
+    statement `name`, sending PREPARE only the first time a pooled connection
+    runs it; later calls send just EXECUTE and reuse the plan. One-shot
+    connections, or LIB_DB_PREPARED=0, execute `sql` directly.
+    """
+    prepared = getattr(cur.connection, "prepared", None)
+    if prepared is None or not _PREPARED_ENABLED:
+        cur.execute(sql, params)
+        return
+    if name not in prepared:
+        numbers = iter(range(1, len(params) + 1))
+        cur.execute(f"PREPARE {name} AS " + _PLACEHOLDER.sub(lambda _: f"${next(numbers)}", sql))
+        prepared.add(name)
+    cur.execute(f"EXECUTE {name} (" + ", ".join(["%s"] * len(params)) + ")", params)
+
+
+def set_prepared_statements(enabled: bool) -> None:
+    """Turn execute_prepared's server-side preparation on or off at runtime."""
+    global _PREPARED_ENABLED
+    _PREPARED_ENABLED = enabled
+
+
+def enable_instrumentation(slow_query_ms: float = 200.0) -> QueryStats:
+    """
+    Start recording every statement: caller, SQL fingerprint, duration,
+    rows returned and connection acquire time. Statements slower than
+    `slow_query_ms` are logged to the "library.db.slow" logger with their
+    parameters redacted.
+    """
+    global _query_stats
+    if _query_stats is None:
+        _query_stats = QueryStats(slow_query_ms)
+    else:
+        _query_stats.slow_query_ms = slow_query_ms
+    InstrumentedCursor.stats = _query_stats
+    return _query_stats
+
+
+def disable_instrumentation() -> None:
+    global _query_stats
+    _query_stats = None
+    InstrumentedCursor.stats = None
+
+
+def get_query_stats() -> Dict[str, Any]:
+    """
+    Return per-fingerprint histograms and connection acquire times recorded
+    so far, or an empty dict when instrumentation is disabled.
+    """
+    return _query_stats.snapshot() if _query_stats is not None else {}
+
+
+def dump_query_stats(path: str) -> None:
+    """Write get_query_stats() as JSON, slowest fingerprints (by total time) first."""
+    stats = get_query_stats()
+    if stats:
+        stats["queries"] = dict(
+            sorted(stats["queries"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+
+
+def reset_query_stats() -> None:
+    if _query_stats is not None:
+        _query_stats.reset()
+
+
+def _query_stats_metrics():
+    """Expose instrumentation histograms (if enabled) on the metrics registry."""
+    if _query_stats is None:
+        return []
+    snapshot = _query_stats.snapshot()
+    lines = [
+        "# HELP library_db_query_seconds_total Total statement time by caller.",
+        "# TYPE library_db_query_seconds_total counter",
+    ]
+    per_caller = {}
+    for stats in snapshot["queries"].values():
+        for caller, totals in stats["callers"].items():
+            entry = per_caller.setdefault(caller, [0, 0.0])
+            entry[0] += totals["count"]
+            entry[1] += totals["total_ms"]
+    for caller, (_, total_ms) in sorted(per_caller.items()):
+        lines.append(f'library_db_query_seconds_total{{caller="{caller}"}} {total_ms / 1000.0!r}')
+    lines += [
+        "# HELP library_db_queries_total Statements executed by caller.",
+        "# TYPE library_db_queries_total counter",
+    ]
+    for caller, (count, _) in sorted(per_caller.items()):
+        lines.append(f'library_db_queries_total{{caller="{caller}"}} {count}')
+    return lines
+
+
+metrics.REGISTRY.register_collector(_query_stats_metrics)
+
+_slow_query_ms = settings_from_env()
+if _slow_query_ms is not None:
+    enable_instrumentation(_slow_query_ms)
 
 
 
@@ -0,0 +1,196 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psycopg2.extensions
+
+slow_query_log = logging.getLogger("library.db.slow")
+
+# Upper bounds (milliseconds) of the latency histogram buckets.
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql) -> str:
+    """
+    Normalize a statement so all executions of the same query share one key:
+    collapse whitespace and replace placeholders and literals with `?`.
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def redact(params) -> str:
+    """Describe parameters by type only, so slow-query logs never leak values."""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + "}"
+    return "(" + ", ".join(f"<{type(value).__name__}>" for value in params) + ")"
+
+
+def _caller() -> str:
+    """Name the repository/service method that issued the statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if "repositories" in filename or "services" in filename:
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            return f"{type(owner).__name__}.{name}" if owner is not None else name
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class _Histogram:
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "buckets", "callers")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.callers = {}
+
+    def add(self, elapsed_ms: float, rows: int, caller: Optional[str] = None) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        if rows > 0:
+            self.rows += rows
+        for index, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+        if caller is not None:
+            totals = self.callers.get(caller)
+            if totals is None:
+                totals = self.callers[caller] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed_ms
+
+    def percentile(self, pct: float) -> float:
+        """Upper bucket bound containing the pct-th percentile."""
+        if not self.count:
+            return 0.0
+        target = pct / 100.0 * self.count
+        seen = 0
+        for index, bound in enumerate(BUCKETS_MS):
+            seen += self.buckets[index]
+            if seen >= target:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "rows": self.rows,
+            "buckets": {("inf" if bound == float("inf") else str(bound)): n for bound, n in zip(BUCKETS_MS, self.buckets)},
+            "callers": {
+                caller: {"count": count, "total_ms": round(total_ms, 3)}
+                for caller, (count, total_ms) in self.callers.items()
+            },
+        }
+
+
+class QueryStats:
+    """In-memory, thread-safe per-fingerprint statement statistics."""
+
+    def __init__(self, slow_query_ms: float = 200.0):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._acquire = _Histogram()
+
+    def record_statement(self, sql, params, elapsed_ms: float, rows: int, caller: str) -> None:
+        key = fingerprint(sql)
+        with self._lock:
+            histogram = self._queries.get(key)
+            if histogram is None:
+                histogram = self._queries[key] = _Histogram()
+            histogram.add(elapsed_ms, rows, caller)
+        if elapsed_ms >= self.slow_query_ms:
+            slow_query_log.warning(
+                "slow query %.1f ms in %s (%d rows): %s params=%s",
+                elapsed_ms, caller, rows, key, redact(params),
+            )
+
+    def record_acquire(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self._acquire.add(elapsed_ms, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slow_query_ms": self.slow_query_ms,
+                "connection_acquire": self._acquire.as_dict(),
+                "queries": {key: histogram.as_dict() for key, histogram in self._queries.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._acquire = _Histogram()
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor that reports every execute() to a QueryStats."""
+
+    stats: Optional[QueryStats] = None
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            stats = InstrumentedCursor.stats
+            if stats is not None:
+                stats.record_statement(
+                    query, vars, (time.perf_counter() - started) * 1000, self.rowcount, _caller()
+                )
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            stats = InstrumentedCursor.stats
+            if stats is not None:
+                stats.record_statement(
+                    query, None, (time.perf_counter() - started) * 1000, self.rowcount, _caller()
+                )
+
+
+def settings_from_env() -> Optional[float]:
+    """
+    Return the slow-query threshold in ms if LIB_DB_INSTRUMENT is enabled,
+    else None. LIB_DB_SLOW_QUERY_MS overrides the 200 ms default.
+    """
+    if os.getenv("LIB_DB_INSTRUMENT", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    raw = os.getenv("LIB_DB_SLOW_QUERY_MS", "200")
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"LIB_DB_SLOW_QUERY_MS must be a number, got: {raw}")
@@ -0,0 +1,167 @@
+"""
+Opt-in profiling of UI actions and service calls.
+
+Enable with environment variables before starting the app:
+
+  - LIB_PROFILE=1           turn profiling on (off by default: zero overhead,
+                            the decorators return the original function)
+  - LIB_PROFILE_DIR         output directory (default: ./profiles)
+  - LIB_PROFILE_SAMPLE      fraction of calls to profile, 0..1 (default: 1)
+  - LIB_PROFILE_MEMORY=1    also take a tracemalloc snapshot per profiled call
+
+Each profiled call writes <action>-<n>.prof (cProfile) and, with memory
+profiling, <action>-<n>.alloc (tracemalloc snapshot) into a per-session
+directory, plus one line in index.jsonl. Summarize across sessions with:
+
+    python3 -m infrastructure.profiling [profiles-dir] --top 20
+"""
+
+import argparse
+import cProfile
+import functools
+import glob
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+
+def _enabled() -> bool:
+    return os.getenv("LIB_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+
+class _Session:
+    """Output directory and counters for one application run."""
+
+    def __init__(self):
+        base = os.getenv("LIB_PROFILE_DIR", "profiles")
+        self.directory = os.path.join(base, datetime.now().strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        self.sample_rate = float(os.getenv("LIB_PROFILE_SAMPLE", "1"))
+        self.memory = os.getenv("LIB_PROFILE_MEMORY", "").lower() in ("1", "true", "yes", "on")
+        self._lock = threading.Lock()
+        self._counter = 0
+        # cProfile cannot nest; a UI action that calls a profiled service
+        # method is profiled once, at the outermost level.
+        self._active = threading.local()
+        os.makedirs(self.directory, exist_ok=True)
+        if self.memory:
+            tracemalloc.start(10)
+
+    def next_index(self) -> int:
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def record(self, action: str, index: int, elapsed: float, profile: cProfile.Profile, snapshot) -> None:
+        stem = os.path.join(self.directory, f"{action}-{index}")
+        profile.dump_stats(stem + ".prof")
+        if snapshot is not None:
+            snapshot.dump(stem + ".alloc")
+        entry = {"action": action, "index": index, "seconds": round(elapsed, 6), "at": datetime.now().isoformat()}
+        with self._lock:
+            with open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+_session = None
+
+
+def _get_session() -> _Session:
+    global _session
+    if _session is None:
+        _session = _Session()
+    return _session
+
+
+def profiled(func):
+    """
+    Profile calls to `func` when LIB_PROFILE is set. Decorate UI handlers and
+    service methods; the action name is the function's qualified name.
+    """
+    if not _enabled():
+        return func
+    action = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _get_session()
+        if getattr(session._active, "running", False) or random.random() >= session.sample_rate:
+            return func(*args, **kwargs)
+        session._active.running = True
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot() if session.memory else None
+            session._active.running = False
+            try:
+                session.record(action, session.next_index(), elapsed, profile, snapshot)
+            except OSError:
+                pass
+
+    return wrapper
+
+
+def summarize(directory: str, top: int = 20, out=sys.stdout) -> None:
+    """Print slowest actions, hottest functions and top allocation sites."""
+    entries = []
+    for path in glob.glob(os.path.join(directory, "**", "index.jsonl"), recursive=True):
+        with open(path, encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    if not entries:
+        print(f"No profiles found under {directory}", file=out)
+        return
+
+    per_action = {}
+    for entry in entries:
+        totals = per_action.setdefault(entry["action"], [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += entry["seconds"]
+        totals[2] = max(totals[2], entry["seconds"])
+    print(f"== Actions ({len(entries)} profiled calls)", file=out)
+    print(f"{'action':50s} {'calls':>6s} {'total s':>9s} {'mean ms':>9s} {'max ms':>9s}", file=out)
+    for action, (calls, total, worst) in sorted(per_action.items(), key=lambda item: item[1][1], reverse=True)[:top]:
+        print(f"{action:50s} {calls:>6d} {total:>9.3f} {total / calls * 1000:>9.1f} {worst * 1000:>9.1f}", file=out)
+
+    prof_files = glob.glob(os.path.join(directory, "**", "*.prof"), recursive=True)
+    if prof_files:
+        buf = io.StringIO()
+        stats = pstats.Stats(prof_files[0], stream=buf)
+        for path in prof_files[1:]:
+            stats.add(path)
+        stats.sort_stats("cumulative").print_stats(top)
+        print(f"\n== Hottest functions across {len(prof_files)} profiles (cumulative)", file=out)
+        print(buf.getvalue(), file=out)
+
+    alloc_files = glob.glob(os.path.join(directory, "**", "*.alloc"), recursive=True)
+    if alloc_files:
+        sizes = {}
+        for path in alloc_files:
+            for stat in tracemalloc.Snapshot.load(path).statistics("lineno"):
+                frame = stat.traceback[0]
+                key = f"{frame.filename}:{frame.lineno}"
+                sizes[key] = max(sizes.get(key, 0), stat.size)
+        print(f"== Largest live allocations across {len(alloc_files)} snapshots", file=out)
+        for key, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"{size / 1024:>10.1f} KiB  {key}", file=out)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize profiles written with LIB_PROFILE=1")
+    parser.add_argument("directory", nargs="?", default=os.getenv("LIB_PROFILE_DIR", "profiles"))
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+    summarize(args.directory, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
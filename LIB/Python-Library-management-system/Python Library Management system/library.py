@@ -0,0 +1,352 @@
+"""
+Headless `library` command line for scripting and operations.
+
+Run from the project folder; connection settings come from the usual
+LIB_DB_* environment variables (never hard-code credentials):
+
+    python3 library.py search "dune"
+    python3 library.py search --author "frank herbert"  # all books by one author
+    python3 library.py authors herbert
+    python3 library.py browse --genre fantasy --from 1980 --to 1989
+    python3 library.py browse --sort title --desc --limit 100
+    python3 library.py borrow 42 1001 1002         # member 42 borrows two books
+    python3 library.py return 42 1001              # member 42 returns a book
+    python3 library.py return --isbn 9780441013593 # return by scanned ISBN
+    python3 library.py import books.csv            # title,author,isbn,genre,year[,quantity]
+    python3 library.py export loans --dir analytics
+    python3 library.py export books --output catalogue.csv.gz
+    python3 library.py export books --format jsonl --query tolkien > tolkien.jsonl
+    python3 library.py stats --days 7
+    python3 library.py db-check
+    python3 library.py db-check --init              # create or migrate the schema
+
+Startup is kept small so the command can be called thousands of times from
+scripts: only argparse is imported up front, each subcommand imports the
+services it needs when it runs, Qt is never imported, and the connection
+pool is capped at one connection that every call in the invocation reuses.
+Services are built without their schema bootstrap, so a call runs no DDL
+and read-only commands work with read-only credentials; `db-check --init`
+creates or migrates the schema once, e.g. at deploy time.
+`--timings` prints startup and command time to stderr;
+benchmarks/cli_startup.py checks startup against a budget.
+
+Exit code is 1 if the command failed or any item in a batch was rejected.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
+IMPORT_BATCH = 5000
+
+
+def _print_rows(rows) -> None:
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def _print_results(results) -> int:
+    failed = 0
+    for item, ok, message in results:
+        print(f"{'✓' if ok else '✗'} {item}: {message}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+def _loan_service():
+    from repositories.book_repository import BookRepository
+    from repositories.loan_repository import LoanRepository
+    from services.loan_service import LoanService
+
+    return LoanService(BookRepository(), LoanRepository(), bootstrap=False)
+
+
+def _book_service():
+    from services.book_service import BookService
+
+    return BookService(bootstrap=False)
+
+
+def cmd_search(args) -> int:
+    service = _book_service()
+    rows = service.books_by_author(args.keyword) if args.author else service.search_books(args.keyword)
+    _print_rows(rows[: args.limit] if args.limit else rows)
+    return 0
+
+
+def cmd_authors(args) -> int:
+    _print_rows(_book_service().find_authors(args.query, args.limit))
+    return 0
+
+
+def cmd_browse(args) -> int:
+    service = _book_service()
+    filters = {"year_from": args.year_from, "year_to": args.year_to, "query": args.query}
+    if args.genre:
+        matches = [gid for gid, name in service.list_genres() if name.lower() == args.genre.strip().lower()]
+        if not matches:
+            raise ValueError(f"No genre named {args.genre!r}")
+        filters["genre_id"] = matches[0]
+    result = service.browse(
+        filters, after_id=args.after, limit=args.limit,
+        sort=args.sort, direction="desc" if args.desc else "asc",
+        # An empty value stands for an unknown year.
+        after_value=args.after_value or None,
+    )
+    print(f"== {result['total']:,} book(s)")
+    print("== genres")
+    _print_rows(result["genres"])
+    print("== decades")
+    _print_rows(result["decades"])
+    print("== books")
+    _print_rows(result["books"])
+    if result["next"]:
+        import shlex
+
+        after_value = result["next"]["after_value"]
+        print(f"== next page: --after {result['next']['after_id']}"
+              + (f" --after-value {shlex.quote('' if after_value is None else str(after_value))}"
+                 if args.sort != "id" else ""))
+    return 0
+
+
+def cmd_borrow(args) -> int:
+    return _print_results(_loan_service().borrow_books(args.member_id, args.book_ids))
+
+
+def cmd_return(args) -> int:
+    if args.isbn:
+        # The optional member id slot picks up the first ISBN.
+        isbns = ([args.member_id] if args.member_id else []) + args.items
+        return _print_results(_loan_service().return_scanned(isbns))
+    if args.member_id is None:
+        raise ValueError("return needs a member id and book ids, or --isbn and ISBNs")
+    try:
+        member_id, book_ids = int(args.member_id), [int(item) for item in args.items]
+    except ValueError:
+        raise ValueError("member and book ids must be integers (use --isbn to return by ISBN)")
+    return _print_results(_loan_service().return_books(member_id, book_ids))
+
+
+def _read_books(stream):
+    """Yield (title, author, isbn, genre, year, quantity) tuples from a CSV with a header row."""
+    import csv
+
+    reader = csv.DictReader(stream)
+    missing = {"title", "author", "isbn", "genre", "year"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    for record in reader:
+        yield (
+            record["title"], record["author"], record["isbn"], record["genre"], record["year"],
+            int(record.get("quantity") or 1),
+        )
+
+
+def cmd_import(args) -> int:
+    service = _book_service()
+    stream = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    imported = 0
+    try:
+        batch = []
+        for book in _read_books(stream):
+            batch.append(book)
+            if len(batch) >= IMPORT_BATCH:
+                imported += service.add_books(batch)
+                batch = []
+        imported += service.add_books(batch)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"✓ {imported:,} book(s) imported")
+    return 0
+
+
+def _export_books(args) -> int:
+    service = _book_service()
+    compress = args.gzip or (args.output or "").endswith(".gz")
+    if not args.output or args.output == "-":
+        books = service.export_books(sys.stdout.buffer, args.format, args.query, compress)
+        sys.stdout.buffer.flush()
+        print(f"✓ {books:,} book(s) exported", file=sys.stderr)
+        return 0
+    # Write beside the target and rename, so readers never see a partial file.
+    tmp_path = f"{args.output}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            books = service.export_books(f, args.format, args.query, compress)
+        os.replace(tmp_path, args.output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"✓ {books:,} book(s) exported to {args.output}")
+    return 0
+
+
+def cmd_export(args) -> int:
+    if args.what == "books":
+        args.format = args.format or "csv"
+        return _export_books(args)
+    import export_loan_history
+
+    args.format = args.format or "auto"
+    if args.format not in export_loan_history.WRITERS and args.format != "auto":
+        raise ValueError("loan history formats are auto, parquet and npz")
+    exported = export_loan_history.export(args.dir, args.format, full=args.full)
+    print(f"✓ {len(exported)} month(s), {sum(exported.values()):,} loan(s) exported to {args.dir}")
+    return 0
+
+
+def cmd_stats(args) -> int:
+    from services.stats_service import StatsService
+
+    report = StatsService(bootstrap=False).dashboard(args.days)
+    for name, rows in report.items():
+        print(f"== {name.replace('_', ' ')}")
+        _print_rows(rows)
+    return 0
+
+
+CHECK_TABLES = ("authors", "genres", "books", "members", "users", "roles", "loans", "holds", "loan_events", "notice_outbox")
+
+
+def _init_schema() -> None:
+    """Create missing tables, functions and indexes and run pending migrations."""
+    from repositories.hold_repository import HoldRepository
+    from repositories.loan_repository import LoanRepository
+    from repositories.notice_repository import NoticeRepository
+    from services.auth_service import AuthService
+    from services.book_service import BookService
+    from services.stats_service import StatsService
+
+    # Same order as generate_dataset.ensure_schema.
+    AuthService()
+    BookService()
+    LoanRepository().create_table()
+    HoldRepository().create_table()
+    NoticeRepository().create_table()
+    StatsService()
+
+
+def cmd_db_check(args) -> int:
+    from infrastructure.db import connection_scope
+
+    if args.init:
+        _init_schema()
+        print("✓ Schema created or migrated")
+    with connection_scope() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT current_database(), current_setting('server_version'), pg_is_in_recovery()")
+            database, version, in_recovery = cur.fetchone()
+            cur.execute(
+                "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NULL",
+                (list(CHECK_TABLES),),
+            )
+            missing = [row[0] for row in cur.fetchall()]
+    print(f"✓ Connected to {database} (PostgreSQL {version}{', standby' if in_recovery else ''})")
+    if missing:
+        print(f"✗ Missing table(s): {', '.join(missing)} (run `library.py db-check --init`)")
+        return 1
+    print(f"✓ All {len(CHECK_TABLES)} core tables present")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="library", description="Library management command line")
+    parser.add_argument("--timings", action="store_true", help="print startup and command time to stderr")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    search = commands.add_parser("search", help="search the catalogue")
+    search.add_argument("keyword")
+    search.add_argument("--limit", type=int, default=0, help="rows to print (0 = all)")
+    search.add_argument("--author", action="store_true", help="keyword is an author's full name")
+    search.set_defaults(func=cmd_search)
+
+    authors = commands.add_parser("authors", help="look up authors by name")
+    authors.add_argument("query")
+    authors.add_argument("--limit", type=int, default=20)
+    authors.set_defaults(func=cmd_authors)
+
+    browse = commands.add_parser("browse", help="browse by genre and year with facet counts")
+    browse.add_argument("--genre", help="genre name")
+    browse.add_argument("--from", dest="year_from", type=int, help="first publication year")
+    browse.add_argument("--to", dest="year_to", type=int, help="last publication year")
+    browse.add_argument("--query", help="only books matching this search")
+    browse.add_argument("--sort", choices=["id", "title", "author", "year"], default="id")
+    browse.add_argument("--desc", action="store_true", help="sort in descending order")
+    browse.add_argument("--after", type=int, default=0, help="id of the last book of the previous page")
+    browse.add_argument("--after-value", help="sort value of the last book of the previous page")
+    browse.add_argument("--limit", type=int, default=50)
+    browse.set_defaults(func=cmd_browse)
+
+    borrow = commands.add_parser("borrow", help="borrow books for a member")
+    borrow.add_argument("member_id", type=int)
+    borrow.add_argument("book_ids", type=int, nargs="+")
+    borrow.set_defaults(func=cmd_borrow)
+
+    ret = commands.add_parser("return", help="return books by member and book id, or by ISBN")
+    ret.add_argument("--isbn", action="store_true", help="items are scanned ISBNs")
+    ret.add_argument("member_id", nargs="?", help="omit with --isbn")
+    ret.add_argument("items", nargs="+", help="book ids, or ISBNs with --isbn")
+    ret.set_defaults(func=cmd_return)
+
+    imp = commands.add_parser("import", help="import books from CSV")
+    imp.add_argument("file", help="CSV file with a header row, or - for stdin")
+    imp.set_defaults(func=cmd_import)
+
+    export = commands.add_parser("export", help="export data")
+    export.add_argument("what", choices=["loans", "books"], help="loans: columnar loan history; books: catalogue")
+    export.add_argument("--format", choices=["auto", "parquet", "npz", "csv", "jsonl"],
+                        help="loans: auto (default), parquet or npz; books: csv (default) or jsonl")
+    export.add_argument("--dir", default="analytics", help="loans: output directory")
+    export.add_argument("--full", action="store_true", help="loans: re-export every month")
+    export.add_argument("--output", help="books: output file (default: stdout; .gz implies --gzip)")
+    export.add_argument("--query", help="books: only books matching this search")
+    export.add_argument("--gzip", action="store_true", help="books: gzip-compress the output")
+    export.set_defaults(func=cmd_export)
+
+    stats = commands.add_parser("stats", help="circulation statistics")
+    stats.add_argument("--days", type=int, default=30)
+    stats.set_defaults(func=cmd_stats)
+
+    check = commands.add_parser("db-check", help="check the connection and schema")
+    check.add_argument("--init", action="store_true", help="create or migrate the schema first (needs DDL rights)")
+    check.set_defaults(func=cmd_db_check)
+    return parser
+
+
+def _reported_errors() -> tuple:
+    """Errors main() reports as one line; database errors once the driver is loaded."""
+    errors = (ValueError, ImportError, OSError)
+    if "infrastructure.db" in sys.modules:
+        errors += (sys.modules["infrastructure.db"].DatabaseError,)
+    return errors
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    # One invocation runs its calls one after another: one connection is enough.
+    os.environ.setdefault("LIB_DB_POOL_SIZE", "1")
+    started = time.perf_counter()
+    try:
+        return args.func(args)
+    except _reported_errors() as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    finally:
+        if "infrastructure.db" in sys.modules:
+            sys.modules["infrastructure.db"].close_pool()
+        if args.timings:
+            print(
+                f"startup {(started - _STARTED) * 1000:.1f} ms, "
+                f"command {(time.perf_counter() - started) * 1000:.1f} ms",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
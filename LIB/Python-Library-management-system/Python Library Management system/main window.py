@@ -16,46 +16,281 @@ if not os.getenv("LIB_DB_PORT"):
     os.environ['LIB_DB_PORT'] = '5433'
 
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, \
-    QPushButton, QLineEdit, QMessageBox, QHBoxLayout, QLabel, QGroupBox, QGridLayout, QInputDialog
-from PyQt5.QtCore import Qt
+    QPushButton, QLineEdit, QMessageBox, QHBoxLayout, QLabel, QGroupBox, QGridLayout, QInputDialog, \
+    QDialog, QPlainTextEdit, QTabWidget, QComboBox, QHeaderView
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 
-from services.book_service import BookService
-from services.loan_service import LoanService
-from repositories.book_repository import BookRepository
-from repositories.loan_repository import LoanRepository
+# Services and repositories (and with them psycopg2) are imported by
+# _ServiceLoader off the UI thread, so the window paints before they load.
+from infrastructure import metrics
+from infrastructure.profiling import profiled
 
 
-class LibraryApp(QWidget):
-    def __init__(self):
-        super().__init__()
+class ReturnKioskDialog(QDialog):
+    """
+    High-throughput return mode: a barcode scanner types an ISBN and Enter
+    into the input, scans are queued and returned in batches, and a running
+    log shows what happened to each item.
+    """
+
+    def __init__(self, loan_service, parent=None):
+        super().__init__(parent)
+        from services.return_queue import ReturnQueue
+
+        self.setWindowTitle("Return Kiosk")
+        self.resize(700, 500)
+        self.queue = ReturnQueue(loan_service, on_results=self.log_results)
+
+        layout = QVBoxLayout()
+        self.scan_input = QLineEdit(self)
+        self.scan_input.setPlaceholderText("Scan ISBN barcode...")
+        self.scan_input.returnPressed.connect(self.scan)
+        layout.addWidget(self.scan_input)
+
+        self.status_label = QLabel(self)
+        layout.addWidget(self.status_label)
+
+        self.log = QPlainTextEdit(self)
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(5000)
+        layout.addWidget(self.log, 1)
+
+        self.flush_button = QPushButton("Process Now", self)
+        self.flush_button.clicked.connect(self.flush)
+        layout.addWidget(self.flush_button)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush_if_due)
+        self.timer.start(500)
+        self.update_status()
+        self.scan_input.setFocus()
+
+    def scan(self):
+        code = self.scan_input.text()
+        self.scan_input.clear()
+        try:
+            self.queue.scan(code)
+        except Exception as e:
+            self.log.appendPlainText(f"ERROR: {e} (batch kept, will retry)")
+        self.update_status()
+
+    def flush_if_due(self):
+        try:
+            self.queue.flush_if_due()
+        except Exception as e:
+            self.log.appendPlainText(f"ERROR: {e} (batch kept, will retry)")
+        self.update_status()
+
+    def flush(self):
+        try:
+            self.queue.flush()
+        except Exception as e:
+            self.log.appendPlainText(f"ERROR: {e} (batch kept, will retry)")
+        self.update_status()
+
+    def log_results(self, results):
+        self.log.appendPlainText(
+            "\n".join(f"{'OK ' if ok else 'ERR'} {isbn}: {message}" for isbn, ok, message in results)
+        )
+
+    def update_status(self):
+        self.status_label.setText(
+            f"Queued: {self.queue.pending}   Returned: {self.queue.returned}   Not found: {self.queue.failed}"
+        )
+
+    def done(self, result):
+        self.timer.stop()
+        self.flush()
+        if self.queue.pending:
+            # The last batch failed: closing would drop returns the patrons
+            # believe are done, so only do it if the librarian says so.
+            codes = self.queue.pending_codes
+            shown = ", ".join(codes[:10]) + (f" and {len(codes) - 10} more" if len(codes) > 10 else "")
+            answer = QMessageBox.warning(
+                self, "Returns not processed",
+                f"{len(codes)} scanned return(s) could not be processed:\n{shown}\n\n"
+                "Close anyway and discard them? Choose No to keep the kiosk open and retry.",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+            )
+            if answer != QMessageBox.Yes:
+                self.timer.start(500)
+                self.scan_input.setFocus()
+                return
+        super().done(result)
+
+
+class StatsDashboard(QWidget):
+    """
+    Statistics tab: daily checkout volume, top titles, loans per genre and
+    most active members for a chosen window. Reads only the rollup tables
+    (see StatsService), so it loads quickly however long the history is.
+    """
+
+    PERIODS = [("Last 7 days", 7), ("Last 30 days", 30), ("Last 90 days", 90), ("Last 365 days", 365)]
+
+    def __init__(self, stats_service, parent=None):
+        super().__init__(parent)
+        self.stats_service = stats_service
+        self.loaded = False
+
+        layout = QVBoxLayout()
+        controls = QHBoxLayout()
+        self.period_combo = QComboBox(self)
+        for label, _ in self.PERIODS:
+            self.period_combo.addItem(label)
+        self.period_combo.setCurrentIndex(1)
+        self.period_combo.currentIndexChanged.connect(self.load)
+        controls.addWidget(self.period_combo)
+        self.summary_label = QLabel(self)
+        controls.addWidget(self.summary_label, 1)
+        self.refresh_button = QPushButton('Refresh', self)
+        self.refresh_button.clicked.connect(self.load)
+        controls.addWidget(self.refresh_button)
+        layout.addLayout(controls)
+
+        grid = QGridLayout()
+        self.volume_table = self.add_report(grid, 0, 0, "Daily Checkouts", ['Day', 'Loans', 'Returns'])
+        self.titles_table = self.add_report(grid, 0, 1, "Top Titles", ['ID', 'Title', 'Author', 'Loans'])
+        self.genre_table = self.add_report(grid, 1, 0, "Loans per Genre", ['Genre', 'Loans', 'Returns'])
+        self.members_table = self.add_report(grid, 1, 1, "Most Active Members", ['ID', 'Member', 'Loans'])
+        layout.addLayout(grid, 1)
+        self.setLayout(layout)
+
+    def add_report(self, grid, row, column, title, headers):
+        group = QGroupBox(title, self)
+        group_layout = QVBoxLayout()
+        table = QTableWidget(self)
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setAlternatingRowColors(True)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        group_layout.addWidget(table)
+        group.setLayout(group_layout)
+        grid.addWidget(group, row, column)
+        return table
+
+    @staticmethod
+    def fill(table, rows):
+        table.setRowCount(len(rows))
+        for row_position, row in enumerate(rows):
+            for column, data in enumerate(row):
+                table.setItem(row_position, column, QTableWidgetItem(str(data)))
+
+    @metrics.timed_ui_action
+    @profiled
+    def load(self):
+        days = self.PERIODS[self.period_combo.currentIndex()][1]
+        try:
+            report = self.stats_service.dashboard(days)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load statistics:\n{str(e)}")
+            return
+        self.loaded = True
+        # Newest day first in the table.
+        self.fill(self.volume_table, list(reversed(report["daily_volume"])))
+        self.fill(self.titles_table, report["top_titles"])
+        self.fill(self.genre_table, report["loans_per_genre"])
+        self.fill(self.members_table, report["top_members"])
+        loans = sum(row[1] for row in report["daily_volume"])
+        returns = sum(row[2] for row in report["daily_volume"])
+        self.summary_label.setText(f"{loans:,} loans, {returns:,} returns")
+
+
+class _ServiceLoader(QThread):
+    """
+    Startup work that needs the database, run off the UI thread: import the
+    service layer, let it create missing tables (DDL) and read the first
+    page of the catalogue and the browse facets. Emits `loaded` with the
+    services, first page and facets, or `failed` with the exception.
+    """
+
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    FIRST_PAGE = 500
+
+    def run(self):
         try:
-            # Use the clean architecture services instead of direct DB access
-            self.book_service = BookService()
+            from repositories.book_repository import BookRepository
+            from repositories.loan_repository import LoanRepository
+            from services.book_service import BookService
+            from services.loan_service import LoanService
+            from services.member_service import MemberService
+            from services.stats_service import StatsService
 
-            # Loan service with PostgreSQL-backed repositories
-            book_repo = BookRepository()
+            book_service = BookService()
             loan_repo = LoanRepository()
             loan_repo.create_table()
-            self.loan_service = LoanService(book_repo, loan_repo)
-            self.init_ui()
+            self.loaded.emit({
+                "book_service": book_service,
+                "loan_service": LoanService(BookRepository(), loan_repo),
+                "member_service": MemberService(),
+                "stats_service": StatsService(),
+                "first_page": book_service.list_books_page(0, self.FIRST_PAGE),
+                "facets": book_service.browse(limit=0),
+            })
         except Exception as e:
-            error_msg = str(e)
-            if "password authentication failed" in error_msg.lower():
-                detailed_msg = (
-                    f"PostgreSQL password authentication failed.\n\n"
-                    f"Current settings:\n"
-                    f"  Database: {os.getenv('LIB_DB_NAME')}\n"
-                    f"  User: {os.getenv('LIB_DB_USER')}\n"
-                    f"  Host: {os.getenv('LIB_DB_HOST')}\n"
-                    f"  Port: {os.getenv('LIB_DB_PORT')}\n\n"
-                    f"Please update the password in the code (line 11-12) or set the "
-                    f"LIB_DB_PASSWORD environment variable with your PostgreSQL password."
-                )
-            else:
-                detailed_msg = f"Failed to initialize application:\n{str(e)}"
-            
-            QMessageBox.critical(None, "Initialization Error", detailed_msg)
-            raise
+            self.failed.emit(e)
+
+
+def _startup_error_message(e) -> str:
+    error_msg = str(e)
+    if "password authentication failed" in error_msg.lower():
+        return (
+            f"PostgreSQL password authentication failed.\n\n"
+            f"Current settings:\n"
+            f"  Database: {os.getenv('LIB_DB_NAME')}\n"
+            f"  User: {os.getenv('LIB_DB_USER')}\n"
+            f"  Host: {os.getenv('LIB_DB_HOST')}\n"
+            f"  Port: {os.getenv('LIB_DB_PORT')}\n\n"
+            f"Please update the password in the code (line 11-12) or set the "
+            f"LIB_DB_PASSWORD environment variable with your PostgreSQL password."
+        )
+    return f"Failed to initialize application:\n{error_msg}"
+
+
+class LibraryApp(QWidget):
+    def __init__(self):
+        super().__init__()
+        # Set by services_loaded once _ServiceLoader has connected; the
+        # catalogue and statistics tabs stay disabled until then.
+        self.book_service = None
+        self.loan_service = None
+        self.member_service = None
+        self.stats_service = None
+        # Server-side order of the catalogue table (BookService sort key and
+        # direction) and the cursor for its next page, if any.
+        self.sort_key = "id"
+        self.sort_direction = "asc"
+        self.browse_next = None
+        self.init_ui()
+
+        self.loader = _ServiceLoader(self)
+        self.loader.loaded.connect(self.services_loaded)
+        self.loader.failed.connect(self.services_failed)
+        self.loader.start()
+
+    def services_loaded(self, loaded):
+        self.book_service = loaded["book_service"]
+        self.loan_service = loaded["loan_service"]
+        self.member_service = loaded["member_service"]
+        self.stats_service = loaded["stats_service"]
+        self.stats_tab.stats_service = self.stats_service
+        self.fill_books(loaded["first_page"])
+        self.fill_facets(loaded["facets"])
+        if len(loaded["first_page"]) < _ServiceLoader.FIRST_PAGE:
+            self.startup_label.hide()
+        else:
+            self.startup_label.setText(
+                f"Showing the first {_ServiceLoader.FIRST_PAGE} books - use View All or Search for more."
+            )
+        self.tabs.setEnabled(True)
+
+    def services_failed(self, error):
+        QMessageBox.critical(self, "Initialization Error", _startup_error_message(error))
+        QApplication.exit(1)
 
     def init_ui(self):
         self.setWindowTitle('LUCT Library Management System')
@@ -158,6 +393,29 @@ class LibraryApp(QWidget):
                 background-color: rgba(26, 26, 26, 0.8);
                 color: #ffd700;
             }
+            QTabWidget::pane {
+                border: 2px solid #ffd700;
+                border-radius: 10px;
+            }
+            QTabBar::tab {
+                background-color: #1a1a1a;
+                color: #ffd700;
+                padding: 10px 25px;
+                border: 2px solid #ffd700;
+                border-bottom: none;
+                font-weight: bold;
+            }
+            QTabBar::tab:selected {
+                background-color: #ffd700;
+                color: #000000;
+            }
+            QComboBox {
+                background-color: #1a1a1a;
+                color: #ffd700;
+                border: 2px solid #ffd700;
+                padding: 8px;
+                border-radius: 8px;
+            }
             QGroupBox::title {
                 subcontrol-origin: margin;
                 left: 20px;
@@ -187,6 +445,11 @@ class LibraryApp(QWidget):
         header_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(header_label)
 
+        # Catalogue tab: search, book table and management
+        catalogue_tab = QWidget(self)
+        catalogue_layout = QVBoxLayout()
+        catalogue_layout.setSpacing(20)
+
         # Top section: Search and Quick Actions
         top_section = QHBoxLayout()
         top_section.setSpacing(15)
@@ -227,21 +490,74 @@ class LibraryApp(QWidget):
         self.return_button.clicked.connect(self.return_selected_book)
         quick_layout.addWidget(self.return_button)
         
+        self.hold_button = QPushButton('Place Hold', self)
+        self.hold_button.clicked.connect(self.place_hold_on_selected_book)
+        quick_layout.addWidget(self.hold_button)
+
+        self.kiosk_button = QPushButton('Return Kiosk', self)
+        self.kiosk_button.clicked.connect(self.open_return_kiosk)
+        quick_layout.addWidget(self.kiosk_button)
+
         quick_actions.setLayout(quick_layout)
         top_section.addWidget(quick_actions, 1)
         
-        main_layout.addLayout(top_section)
+        catalogue_layout.addLayout(top_section)
+
+        # Browse by genre and decade. Each choice shows how many books it
+        # would leave, given the other choice and the search text.
+        browse_group = QGroupBox("🗂 Browse", self)
+        browse_layout = QHBoxLayout()
+        browse_layout.setSpacing(10)
+
+        browse_layout.addWidget(QLabel('Genre:', self))
+        self.genre_combo = QComboBox(self)
+        self.genre_combo.setMinimumWidth(220)
+        self.genre_combo.activated.connect(self.browse_books)
+        browse_layout.addWidget(self.genre_combo)
+
+        browse_layout.addWidget(QLabel('Decade:', self))
+        self.decade_combo = QComboBox(self)
+        self.decade_combo.setMinimumWidth(160)
+        self.decade_combo.activated.connect(self.browse_books)
+        browse_layout.addWidget(self.decade_combo)
+
+        self.browse_more_button = QPushButton('More', self)
+        self.browse_more_button.setEnabled(False)
+        self.browse_more_button.clicked.connect(self.browse_more)
+        browse_layout.addWidget(self.browse_more_button)
+
+        self.browse_label = QLabel(self)
+        browse_layout.addWidget(self.browse_label, 1)
+
+        browse_group.setLayout(browse_layout)
+        catalogue_layout.addWidget(browse_group)
 
         # Table to display books - Larger and prominent
         self.table = QTableWidget(self)
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(['ID', 'Title', 'Author', 'ISBN', 'Genre', 'Year'])
+        self.table.setColumnCount(8)
+        self.table.setHorizontalHeaderLabels(['ID', 'Title', 'Author', 'ISBN', 'Genre', 'Year', 'Copies', 'Available'])
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.setSelectionMode(QTableWidget.ExtendedSelection)
+        # Header clicks re-query the database in the new order (see
+        # sort_by_column) instead of sorting only the rows already loaded.
+        self.table.horizontalHeader().setSortIndicatorShown(True)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.table.horizontalHeader().sectionClicked.connect(self.sort_by_column)
         self.table.setAlternatingRowColors(True)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setMinimumHeight(350)
-        main_layout.addWidget(self.table, 1)
+        catalogue_layout.addWidget(self.table, 1)
+
+        # "Borrowed together" suggestions for the selected book; the lookup
+        # waits until the selection settles so arrow-key scrolling is cheap.
+        self.related_label = QLabel(self)
+        self.related_label.setWordWrap(True)
+        catalogue_layout.addWidget(self.related_label)
+        self.related_timer = QTimer(self)
+        self.related_timer.setSingleShot(True)
+        self.related_timer.setInterval(200)
+        self.related_timer.timeout.connect(self.show_related_books)
+        self.table.itemSelectionChanged.connect(self.related_timer.start)
 
         # Bottom section: Book Management
         bottom_section = QHBoxLayout()
@@ -303,11 +619,25 @@ class LibraryApp(QWidget):
         actions_group.setLayout(actions_layout)
         bottom_section.addWidget(actions_group, 1)
         
-        main_layout.addLayout(bottom_section)
+        catalogue_layout.addLayout(bottom_section)
+        catalogue_tab.setLayout(catalogue_layout)
+
+        # Statistics tab, loaded the first time it is opened
+        self.stats_tab = StatsDashboard(self.stats_service, self)
+        self.tabs = QTabWidget(self)
+        self.tabs.addTab(catalogue_tab, '📚 Catalogue')
+        self.tabs.addTab(self.stats_tab, '📊 Statistics')
+        self.tabs.currentChanged.connect(self.tab_changed)
+        self.tabs.setEnabled(False)
+
+        self.startup_label = QLabel('Connecting to the database...', self)
+        main_layout.addWidget(self.startup_label)
+        main_layout.addWidget(self.tabs, 1)
 
         self.setLayout(main_layout)
-        self.View_books()
 
+    @metrics.timed_ui_action
+    @profiled
     def add_book(self):
         title = self.title_input.text()
         author = self.author_input.text()
@@ -332,6 +662,8 @@ class LibraryApp(QWidget):
         else:
             QMessageBox.warning(self, 'Error', 'All fields are required!')
 
+    @metrics.timed_ui_action
+    @profiled
     def update_book(self):
         selected_row = self.table.currentRow()
         if selected_row >= 0:
@@ -367,6 +699,8 @@ class LibraryApp(QWidget):
         else:
             QMessageBox.warning(self, 'Error', 'No book selected for update!')
 
+    @metrics.timed_ui_action
+    @profiled
     def delete_book(self):
         selected_row = self.table.currentRow()
         if selected_row >= 0:
@@ -386,99 +720,284 @@ class LibraryApp(QWidget):
         else:
             QMessageBox.warning(self, 'Error', 'No book selected for deletion!')
 
+    @metrics.timed_ui_action
+    @profiled
     def View_books(self):
         try:
             self.table.setRowCount(0)
-            books = self.book_service.list_books()
-            for book in books:
-                row_position = self.table.rowCount()
-                self.table.insertRow(row_position)
-                for column, data in enumerate(book):
-                    self.table.setItem(row_position, column, QTableWidgetItem(str(data)))
+            self.fill_books(self.book_service.list_books(self.sort_key, self.sort_direction))
+            self.startup_label.hide()
+            self.browse_next = None
+            self.browse_more_button.setEnabled(False)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load books:\n{str(e)}")
             # Still show empty table so window is usable
 
+    @metrics.timed_ui_action
+    @profiled
     def search_books(self):
         keyword = self.search_input.text()
         books = self.book_service.search_books(keyword)
         self.table.setRowCount(0)
+        self.fill_books(books)
+        self.startup_label.hide()
+        self.browse_next = None
+        self.browse_more_button.setEnabled(False)
+
+    def fill_books(self, books):
+        """Append book rows to the table."""
         for book in books:
             row_position = self.table.rowCount()
             self.table.insertRow(row_position)
             for column, data in enumerate(book):
-                self.table.setItem(row_position, column, QTableWidgetItem(str(data)))
+                self.table.setItem(row_position, column, QTableWidgetItem("" if data is None else str(data)))
 
-    def borrow_selected_book(self):
-        selected_row = self.table.currentRow()
-        if selected_row < 0:
-            QMessageBox.warning(self, "Error", "Please select a book to borrow.")
-            return
+    BROWSE_PAGE = 500
+
+    def browse_filters(self):
+        """Filters for BookService.browse from the facet combos and search text."""
+        filters = {"genre_id": self.genre_combo.currentData(), "query": self.search_input.text().strip()}
+        decade = self.decade_combo.currentData()
+        if decade is not None:
+            filters.update(year_from=decade, year_to=decade + 9)
+        return filters
 
-        book_id_item = self.table.item(selected_row, 0)
-        if book_id_item is None:
-            QMessageBox.warning(self, "Error", "Invalid selection.")
+    def fill_facets(self, facets):
+        """Repopulate the genre and decade combos with counts, keeping the current choices."""
+        for combo, all_label, items in (
+            (self.genre_combo, "All genres", facets["genres"]),
+            # Books with no year are only reachable through "All decades".
+            (self.decade_combo, "All decades", [
+                (decade, f"{decade}s", count) for decade, count in facets["decades"] if decade is not None
+            ]),
+        ):
+            current = combo.currentData()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(all_label, None)
+            for value, label, count in items:
+                combo.addItem(f"{label} ({count:,})", value)
+            index = combo.findData(current)
+            combo.setCurrentIndex(index if index >= 0 else 0)
+            combo.blockSignals(False)
+        self.browse_label.setText(f"{facets['total']:,} book(s)")
+
+    @metrics.timed_ui_action
+    @profiled
+    def browse_books(self, *args):
+        """Show the first page of books for the chosen genre and decade, in the current sort order."""
+        try:
+            result = self.book_service.browse(
+                self.browse_filters(), limit=self.BROWSE_PAGE, sort=self.sort_key, direction=self.sort_direction
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to browse books:\n{str(e)}")
             return
+        self.table.setRowCount(0)
+        self.fill_books(result["books"])
+        self.fill_facets(result)
+        self.show_browse_progress(result)
+        self.startup_label.hide()
 
-        # Get member ID from user input
-        member_id, ok = QInputDialog.getInt(
-            self, 
-            "Borrow Book", 
-            "Enter Member ID:", 
-            value=1, 
-            min=1
+    @metrics.timed_ui_action
+    @profiled
+    def browse_more(self):
+        """Append the next page of the current browse."""
+        if not self.browse_next:
+            return
+        result = self.book_service.browse(
+            self.browse_filters(), limit=self.BROWSE_PAGE, sort=self.sort_key, direction=self.sort_direction,
+            **self.browse_next
         )
-        
+        self.fill_books(result["books"])
+        self.show_browse_progress(result)
+
+    def show_browse_progress(self, result):
+        self.browse_next = result["next"]
+        self.browse_label.setText(f"Showing {self.table.rowCount():,} of {result['total']:,} book(s)")
+        self.browse_more_button.setEnabled(self.browse_next is not None)
+
+    # Table column -> BookService sort key; other columns are not sortable.
+    SORT_COLUMNS = {0: "id", 1: "title", 2: "author", 5: "year"}
+
+    def sort_by_column(self, column):
+        """
+        Header click: reload the first page of the current browse sorted by
+        that column on the server, flipping the direction on a second click.
+        """
+        header = self.table.horizontalHeader()
+        sort_key = self.SORT_COLUMNS.get(column)
+        if sort_key is None:
+            # Put the indicator back on the column the table is sorted by.
+            current = next(col for col, key in self.SORT_COLUMNS.items() if key == self.sort_key)
+            header.setSortIndicator(
+                current, Qt.DescendingOrder if self.sort_direction == "desc" else Qt.AscendingOrder
+            )
+            self.browse_label.setText("Sort by ID, Title, Author or Year.")
+            return
+        if sort_key == self.sort_key:
+            self.sort_direction = "desc" if self.sort_direction == "asc" else "asc"
+        else:
+            self.sort_key, self.sort_direction = sort_key, "asc"
+        header.setSortIndicator(column, Qt.DescendingOrder if self.sort_direction == "desc" else Qt.AscendingOrder)
+        if self.book_service is not None:
+            self.browse_books()
+
+    def pick_member(self, title):
+        """
+        Ask for a member name, username or ID and let the librarian choose
+        from the matches. Returns the member id, or None if cancelled.
+        """
+        query, ok = QInputDialog.getText(self, title, "Member name, username or ID:")
+        if not ok or not query.strip():
+            return None
+
+        try:
+            members = self.member_service.search_members(query)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to search members:\n{str(e)}")
+            return None
+
+        if not members:
+            QMessageBox.warning(self, "No Match", f"No member found for '{query.strip()}'.")
+            return None
+        if len(members) == 1:
+            return members[0][0]
+
+        labels = [f"{full_name} ({username}) - ID {member_id}" for member_id, username, full_name, _ in members]
+        choice, ok = QInputDialog.getItem(self, title, "Select member:", labels, 0, False)
         if not ok:
+            return None
+        return members[labels.index(choice)][0]
+
+    def show_related_books(self):
+        book_ids = self.selected_book_ids()
+        if len(book_ids) != 1:
+            self.related_label.clear()
+            return
+        try:
+            related = self.book_service.related_books(book_ids[0])
+        except Exception:
+            self.related_label.clear()
+            return
+        if not related:
+            self.related_label.setText("Borrowed together: no suggestions yet.")
             return
+        self.related_label.setText(
+            "Borrowed together: " + "; ".join(f"{book[1]} ({book[2]}) - ID {book[0]}" for book in related)
+        )
+
+    def tab_changed(self, index):
+        if self.tabs.widget(index) is self.stats_tab and not self.stats_tab.loaded:
+            self.stats_tab.load()
+
+    def open_return_kiosk(self):
+        ReturnKioskDialog(self.loan_service, self).exec_()
+
+    def selected_book_ids(self):
+        """Book ids of all selected table rows, in table order."""
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        book_ids = []
+        for row in rows:
+            item = self.table.item(row, 0)
+            if item is not None:
+                book_ids.append(int(item.text()))
+        return book_ids
 
-        book_id = int(book_id_item.text())
+    def refresh_book_rows(self, book_ids):
+        """Re-read just these books and update their rows (e.g. Available) in place."""
         try:
-            self.loan_service.borrow_book(member_id, book_id)
-            QMessageBox.information(
-                self,
-                "Borrowed",
-                f"Book borrowed successfully. Due in {LoanService.LOAN_DAYS} days.",
-            )
-            self.View_books()  # Refresh the table
+            fresh = {book[0]: book for book in self.book_service.get_books(book_ids)}
+        except Exception:
+            return
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            book = fresh.get(int(item.text())) if item is not None else None
+            if book is not None:
+                for column, data in enumerate(book):
+                    self.table.setItem(row, column, QTableWidgetItem(str(data)))
+
+    def show_loan_results(self, title, results):
+        """Summarize per-book (book_id, ok, message) results from LoanService."""
+        failed = [(book_id, message) for book_id, ok, message in results if not ok]
+        done = len(results) - len(failed)
+        lines = [f"{done} of {len(results)} book(s) processed."]
+        lines += [f"Book {book_id}: {message}" for book_id, message in failed]
+        if failed:
+            QMessageBox.warning(self, title, "\n".join(lines))
+        else:
+            QMessageBox.information(self, title, lines[0])
+
+    @metrics.timed_ui_action
+    @profiled
+    def borrow_selected_book(self):
+        book_ids = self.selected_book_ids()
+        if not book_ids:
+            QMessageBox.warning(self, "Error", "Please select one or more books to borrow.")
+            return
+
+        member_id = self.pick_member("Borrow Books")
+        if member_id is None:
+            return
+
+        try:
+            results = self.loan_service.borrow_books(member_id, book_ids)
+            self.refresh_book_rows(book_ids)
+            self.show_loan_results(f"Borrowed (due in {self.loan_service.LOAN_DAYS} days)", results)
         except ValueError as ve:
             QMessageBox.warning(self, "Cannot Borrow", str(ve))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while borrowing: {e}")
 
+    @metrics.timed_ui_action
+    @profiled
     def return_selected_book(self):
-        selected_row = self.table.currentRow()
-        if selected_row < 0:
-            QMessageBox.warning(self, "Error", "Please select a book to return.")
+        book_ids = self.selected_book_ids()
+        if not book_ids:
+            QMessageBox.warning(self, "Error", "Please select one or more books to return.")
             return
 
-        book_id_item = self.table.item(selected_row, 0)
-        if book_id_item is None:
-            QMessageBox.warning(self, "Error", "Invalid selection.")
-            return
-
-        # Get member ID from user input
-        member_id, ok = QInputDialog.getInt(
-            self, 
-            "Return Book", 
-            "Enter Member ID:", 
-            value=1, 
-            min=1
-        )
-        
-        if not ok:
+        member_id = self.pick_member("Return Books")
+        if member_id is None:
             return
 
-        book_id = int(book_id_item.text())
         try:
-            self.loan_service.return_book_for_member_and_book(member_id, book_id)
-            QMessageBox.information(self, "Returned", "Book returned successfully.")
-            self.View_books()  # Refresh the table
+            results = self.loan_service.return_books(member_id, book_ids)
+            self.refresh_book_rows(book_ids)
+            self.show_loan_results("Returned", results)
         except ValueError as ve:
             QMessageBox.warning(self, "Cannot Return", str(ve))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while returning: {e}")
 
+    @metrics.timed_ui_action
+    @profiled
+    def place_hold_on_selected_book(self):
+        book_ids = self.selected_book_ids()
+        if not book_ids:
+            QMessageBox.warning(self, "Error", "Please select one or more books to hold.")
+            return
+
+        member_id = self.pick_member("Place Hold")
+        if member_id is None:
+            return
+
+        results = []
+        for book_id in book_ids:
+            try:
+                position = self.loan_service.place_hold(member_id, book_id)
+                results.append((book_id, True, f"Queue position {position}."))
+            except ValueError as ve:
+                results.append((book_id, False, str(ve)))
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"An error occurred while placing a hold: {e}")
+                return
+        lines = [f"Book {book_id}: {message}" for book_id, _, message in results]
+        if all(ok for _, ok, _ in results):
+            QMessageBox.information(self, "Hold Placed", "\n".join(lines))
+        else:
+            QMessageBox.warning(self, "Hold", "\n".join(lines))
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -489,6 +1008,7 @@ if __name__ == '__main__':
         print(f"User: {os.getenv('LIB_DB_USER')}")
         print(f"Host: {os.getenv('LIB_DB_HOST')}")
         print(f"Port: {os.getenv('LIB_DB_PORT')}")
+        metrics.start_from_env()
         
         window = LibraryApp()
         print("Window created successfully!")
@@ -496,7 +1016,10 @@ if __name__ == '__main__':
         window.raise_()  # Bring window to front
         window.activateWindow()  # Activate the window
         print("Window displayed!")
-        sys.exit(app.exec_())
+        exit_code = app.exec_()
+        # Let a still-connecting loader finish before Qt objects are torn down.
+        window.loader.wait()
+        sys.exit(exit_code)
     except Exception as e:
         import traceback
         error_msg = f"Failed to start application:\n{str(e)}\n\nPlease check the database connection."
@@ -0,0 +1,65 @@
+"""
+Due-date reminder and overdue-notice scheduler.
+
+Every cycle it:
+  1. queues a reminder for each member with loans due in the next two days
+     and an overdue notice for each member with loans past due, one notice
+     per member listing all their loans (see NoticeService),
+  2. expires ready holds not picked up in time, passing each copy on,
+  3. delivers unsent notices from the outbox to JSON-lines files in --spool.
+
+Progress is checkpointed in the database, so each cycle only scans loans
+that came due since the previous one and a restart never re-notifies.
+
+Run from the project folder:
+
+    python3 notice_scheduler.py --once          # one cycle (cron / Task Scheduler)
+    python3 notice_scheduler.py --interval 900  # keep running, every 15 minutes
+"""
+
+import argparse
+import sys
+import time
+
+from repositories.book_repository import BookRepository
+from repositories.loan_repository import LoanRepository
+from services.loan_service import LoanService
+from services.notice_service import NoticeService
+
+
+def run_cycle(notices: NoticeService, loans: LoanService, spool_dir: str) -> None:
+    started = time.perf_counter()
+    queued = notices.queue_due()
+    expired = loans.expire_holds()
+    delivered = notices.deliver(spool_dir)
+    print(
+        f"✓ {queued['due_soon']:,} reminder(s), {queued['overdue']:,} overdue notice(s) queued, "
+        f"{expired:,} hold(s) expired, {delivered:,} notice(s) delivered "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Queue and deliver due-date notices")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--interval", type=int, default=3600, help="seconds between cycles")
+    parser.add_argument("--spool", default="outbox", help="directory notices are delivered to")
+    args = parser.parse_args(argv)
+
+    notices = NoticeService()
+    loans = LoanService(BookRepository(), LoanRepository())
+    while True:
+        try:
+            run_cycle(notices, loans, args.spool)
+        except Exception as e:
+            if args.once:
+                print(f"✗ Notice cycle failed: {e}")
+                return 1
+            print(f"✗ Notice cycle failed, retrying next cycle: {e}")
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
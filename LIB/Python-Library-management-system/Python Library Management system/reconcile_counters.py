@@ -0,0 +1,44 @@
+"""
+Recompute the denormalized loan counters and report drift:
+
+  - books.available_count   = quantity - active loans of the book
+  - members.active_loan_count = active loans of the member
+
+Both are maintained by triggers on `loans`; drift only appears after
+TRUNCATE, manual edits or bulk loads with the trigger disabled.
+
+Run from the project folder:
+
+    python3 reconcile_counters.py            # report and fix
+    python3 reconcile_counters.py --dry-run  # report only
+
+Exit code is 1 if drift was found.
+"""
+
+import argparse
+import sys
+
+from repositories.loan_repository import LoanRepository
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile available/active loan counters")
+    parser.add_argument("--dry-run", action="store_true", help="report drift without fixing it")
+    parser.add_argument("--show", type=int, default=20, help="drifted rows to list per table")
+    args = parser.parse_args(argv)
+
+    drift = LoanRepository().reconcile_counters(fix=not args.dry_run)
+    for table, column in (("books", "available_count"), ("members", "active_loan_count")):
+        rows = drift[table]
+        if not rows:
+            print(f"✓ {table}.{column}: no drift")
+            continue
+        action = "found" if args.dry_run else "fixed"
+        print(f"✗ {table}.{column}: {len(rows)} row(s) {action}")
+        for row_id, stored, expected in rows[:args.show]:
+            print(f"    id {row_id}: stored {stored}, actual {expected}")
+    return 1 if drift["books"] or drift["members"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
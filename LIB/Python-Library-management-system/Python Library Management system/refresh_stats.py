@@ -0,0 +1,36 @@
+"""
+Fold pending loan events into the circulation rollups used by the
+Statistics dashboard. Run it every few minutes (cron / Task Scheduler) so
+the dashboard never has a backlog to catch up on.
+
+Run from the project folder:
+
+    python3 refresh_stats.py            # consume pending events
+    python3 refresh_stats.py --rebuild  # recompute every rollup from loans
+"""
+
+import argparse
+import sys
+import time
+
+from services.stats_service import StatsService
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Refresh circulation rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from the loans table")
+    args = parser.parse_args(argv)
+
+    service = StatsService()
+    started = time.perf_counter()
+    if args.rebuild:
+        service.rebuild()
+        print(f"✓ Rollups rebuilt from loans ({time.perf_counter() - started:.1f}s)")
+    else:
+        consumed = service.refresh()
+        print(f"✓ {consumed:,} loan event(s) folded into rollups ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
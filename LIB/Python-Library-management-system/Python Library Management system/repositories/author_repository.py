@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List, Optional
+
+from infrastructure.db import connection_scope, execute_prepared
+
+
+class AuthorRepository:
+    """
+    DAO for authors (domain.models.Author).
+
+    Each author is stored once; books reference it through books.author_id.
+    Names are compared by author_key(): trimmed, inner whitespace collapsed
+    and lower-cased, so "Le Guin, Ursula" and " le guin,  ursula " are one
+    author. A unique index on author_key(name) enforces this.
+    """
+
+    def create_table(self) -> None:
+        sql = """
+        CREATE OR REPLACE FUNCTION author_key(name TEXT) RETURNS TEXT AS $$
+            SELECT lower(regexp_replace(btrim(name), '\\s+', ' ', 'g'))
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+        CREATE TABLE IF NOT EXISTS authors (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_authors_key ON authors (author_key(name));
+
+        -- Substring search on author names (catalogue search, author lookup).
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_authors_name_trgm ON authors USING gin (name gin_trgm_ops);
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def get_or_create_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Map each name to its author id, creating authors that do not exist
+        yet. Names that differ only in case or spacing map to the same id.
+        """
+        wanted = list(set(names))
+        if not wanted:
+            return {}
+        lookup = """
+        SELECT n, a.id
+        FROM unnest(%s::text[]) AS n
+        JOIN authors a ON author_key(a.name) = author_key(n)
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(lookup, (wanted,))
+                ids = dict(cur.fetchall())
+                missing = [name for name in wanted if name not in ids]
+                if missing:
+                    # A concurrent insert of the same author makes ours a
+                    # no-op; the second lookup then sees its committed row.
+                    cur.execute(
+                        """
+                        INSERT INTO authors (name)
+                        SELECT DISTINCT ON (author_key(n)) btrim(n) FROM unnest(%s::text[]) AS n
+                        ON CONFLICT (author_key(name)) DO NOTHING
+                        """,
+                        (missing,),
+                    )
+                    cur.execute(lookup, (missing,))
+                    ids.update(cur.fetchall())
+                return ids
+
+    def get_author(self, author_id: int) -> Optional[tuple]:
+        """(id, name, book count) or None."""
+        sql = """
+        SELECT a.id, a.name, (SELECT COUNT(*) FROM books b WHERE b.author_id = a.id)
+        FROM authors a
+        WHERE a.id = %s
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (author_id,))
+                return cur.fetchone()
+
+    def find_by_name(self, name: str) -> Optional[tuple]:
+        """Exact lookup ignoring case and spacing, via the unique key index: (id, name) or None."""
+        sql = "SELECT id, name FROM authors WHERE author_key(name) = author_key(%s)"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "author_by_name", sql, (name,))
+                return cur.fetchone()
+
+    def search_authors(self, query: str, limit: int = 20) -> List[tuple]:
+        """
+        Authors whose name contains `query`, as (id, name, book count),
+        names starting with it first.
+        """
+        sql = """
+        SELECT a.id, a.name, (SELECT COUNT(*) FROM books b WHERE b.author_id = a.id)
+        FROM authors a
+        WHERE a.name ILIKE %(pattern)s
+        ORDER BY author_key(a.name) NOT LIKE author_key(%(query)s) || '%%', author_key(a.name), a.id
+        LIMIT %(limit)s
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, {"pattern": f"%{query.strip()}%", "query": query, "limit": limit})
+                return cur.fetchall()
@@ -1,6 +1,10 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from infrastructure.db import connection_scope
+from psycopg2.extras import execute_values
+
+from infrastructure.db import connection_scope, execute_prepared
+from repositories.author_repository import AuthorRepository
+from repositories.genre_repository import GenreRepository
 
 
 class BookRepository:
@@ -8,20 +12,271 @@ class BookRepository:
     DAO for books. Implements CRUD using psycopg2.
 
     Schema kept close to the existing UI:
-      - id, title, author, isbn, genre, year, quantity
+      - id, title, author_id, isbn, genre_id, year, quantity, available_count
+
+    Book rows are returned as
+    (id, title, author name, isbn, genre name, year, quantity, available_count);
+    writers take the author's and genre's names and resolve them to ids via
+    AuthorRepository and GenreRepository, creating them if needed. year is
+    an integer, or None when unknown.
+
+    book_facets holds the number of books per (genre_id, decade), kept
+    current by triggers, so browse facet counts never scan books.
+
+    available_count is maintained by triggers (see LoanRepository.create_table)
+    and is never written by this class.
     """
 
+    # Rows per multi-row statement in the batch methods.
+    BATCH_PAGE_SIZE = 1000
+
+    # Decade of books whose year is unknown, in book_facets.
+    UNKNOWN_DECADE = -1
+
+    # Columns and joins shared by the readers below.
+    _SELECT_BOOKS = """
+        SELECT b.id, b.title, a.name, b.isbn, g.name, b.year, b.quantity, b.available_count
+        FROM books b
+        JOIN authors a ON a.id = b.author_id
+        JOIN genres g ON g.id = b.genre_id
+    """
+
+    # Sort keys accepted by list_books_page and browse_books, as
+    # (sort expression, the same expression over a bound value, index of
+    # the value in a book row). Pages are ordered by (expression, id), so
+    # keyset pagination stays exact when many books share a value; each
+    # key has a matching index created in create_table. Unknown years sort
+    # after every known year.
+    SORT_KEYS = {
+        "id": ("b.id", None, 0),
+        "title": ("b.title", "%(after_value)s::text", 1),
+        "author": ("author_key(a.name)", "author_key(%(after_value)s::text)", 2),
+        "year": ("COALESCE(b.year, 2147483647)", "COALESCE(%(after_value)s::integer, 2147483647)", 5),
+    }
+    SORT_DIRECTIONS = ("asc", "desc")
+
+    # Keyword match used by search_books, export_books and browse.
+    _KEYWORD_MATCH = (
+        "(b.title ILIKE %(pattern)s OR a.name ILIKE %(pattern)s "
+        "OR b.isbn ILIKE %(pattern)s OR g.name ILIKE %(pattern)s)"
+    )
+
+    def __init__(self, author_repo=None, genre_repo=None):
+        self._authors = author_repo or AuthorRepository()
+        self._genres = genre_repo or GenreRepository()
+
     def create_table(self) -> None:
+        self._authors.create_table()
+        self._genres.create_table()
         sql = """
         CREATE TABLE IF NOT EXISTS books (
             id SERIAL PRIMARY KEY,
             title TEXT NOT NULL,
-            author TEXT NOT NULL,
+            author_id INTEGER NOT NULL REFERENCES authors(id),
             isbn TEXT NOT NULL,
-            genre TEXT NOT NULL,
-            year TEXT NOT NULL,
+            genre_id INTEGER NOT NULL REFERENCES genres(id),
+            year INTEGER,
             quantity INTEGER NOT NULL DEFAULT 1
         );
+
+        -- Older catalogues stored the author as free text on every book.
+        -- Move each distinct name (by author_key, keeping its most common
+        -- spelling) into authors once and point the books at it.
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'books' AND column_name = 'author'
+            ) THEN
+                INSERT INTO authors (name)
+                SELECT DISTINCT ON (author_key(author)) btrim(author)
+                FROM (SELECT author, COUNT(*) AS uses FROM books GROUP BY author) spellings
+                ORDER BY author_key(author), uses DESC, btrim(author)
+                ON CONFLICT (author_key(name)) DO NOTHING;
+
+                ALTER TABLE books ADD COLUMN IF NOT EXISTS author_id INTEGER REFERENCES authors(id);
+                UPDATE books b SET author_id = a.id
+                FROM authors a
+                WHERE author_key(a.name) = author_key(b.author);
+                ALTER TABLE books ALTER COLUMN author_id SET NOT NULL;
+                ALTER TABLE books DROP COLUMN author;
+            END IF;
+        END $$;
+
+        -- Genre and year used to be free text. Genres move into the lookup
+        -- table the same way authors do; years that are not a plain number
+        -- become NULL (unknown).
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'books' AND column_name = 'genre'
+            ) THEN
+                INSERT INTO genres (name)
+                SELECT DISTINCT ON (lower(btrim(genre))) btrim(genre)
+                FROM (SELECT genre, COUNT(*) AS uses FROM books GROUP BY genre) spellings
+                ORDER BY lower(btrim(genre)), uses DESC, btrim(genre)
+                ON CONFLICT (lower(btrim(name))) DO NOTHING;
+
+                ALTER TABLE books ADD COLUMN IF NOT EXISTS genre_id INTEGER REFERENCES genres(id);
+                UPDATE books b SET genre_id = g.id
+                FROM genres g
+                WHERE lower(btrim(g.name)) = lower(btrim(b.genre));
+                ALTER TABLE books ALTER COLUMN genre_id SET NOT NULL;
+                ALTER TABLE books DROP COLUMN genre;
+            END IF;
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'books' AND column_name = 'year' AND data_type = 'text'
+            ) THEN
+                ALTER TABLE books
+                    ALTER COLUMN year DROP NOT NULL,
+                    ALTER COLUMN year TYPE INTEGER
+                        USING CASE WHEN year ~ '^\\s*-?\\d{1,4}\\s*$' THEN btrim(year)::integer END;
+            END IF;
+        END $$;
+
+        CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn);
+        -- "All books by author", the author FK checks and author-sorted
+        -- pages (walked author by author through idx_authors_key).
+        DROP INDEX IF EXISTS idx_books_author_id;
+        CREATE INDEX IF NOT EXISTS idx_books_author ON books (author_id, id);
+        -- Title- and year-sorted pages (see SORT_KEYS).
+        CREATE INDEX IF NOT EXISTS idx_books_title_id ON books (title, id);
+        CREATE INDEX IF NOT EXISTS idx_books_year_sort ON books ((COALESCE(year, 2147483647)), id);
+        -- Browsing by genre (optionally within a year range) and by year alone.
+        CREATE INDEX IF NOT EXISTS idx_books_genre_year ON books (genre_id, year);
+        CREATE INDEX IF NOT EXISTS idx_books_year ON books (year);
+
+        CREATE OR REPLACE FUNCTION year_decade(year INTEGER) RETURNS INTEGER AS $$
+            SELECT year - ((year % 10) + 10) % 10
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+        -- Facet counts. Created and backfilled once; afterwards kept
+        -- current by the triggers below. Rows are never deleted, so a
+        -- count can be 0.
+        DO $$
+        BEGIN
+            IF to_regclass('book_facets') IS NULL THEN
+                CREATE TABLE book_facets (
+                    genre_id INTEGER NOT NULL,
+                    decade INTEGER NOT NULL,
+                    books BIGINT NOT NULL,
+                    PRIMARY KEY (genre_id, decade)
+                );
+                INSERT INTO book_facets (genre_id, decade, books)
+                SELECT genre_id, COALESCE(year_decade(year), -1), COUNT(*)
+                FROM books
+                GROUP BY 1, 2;
+            END IF;
+        END $$;
+
+        -- Inserts and deletes (including COPY and multi-row batches) apply
+        -- one grouped change per statement from the transition table.
+        CREATE OR REPLACE FUNCTION books_count_facets() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO book_facets AS f (genre_id, decade, books)
+                SELECT genre_id, COALESCE(year_decade(year), -1), COUNT(*)
+                FROM new_books
+                GROUP BY 1, 2
+                ON CONFLICT (genre_id, decade) DO UPDATE SET books = f.books + EXCLUDED.books;
+            ELSE
+                UPDATE book_facets f SET books = f.books - d.books
+                FROM (
+                    SELECT genre_id, COALESCE(year_decade(year), -1) AS decade, COUNT(*) AS books
+                    FROM old_books
+                    GROUP BY 1, 2
+                ) d
+                WHERE f.genre_id = d.genre_id AND f.decade = d.decade;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Updates move a book between facets only when its genre or decade
+        -- changes; checkouts (available_count) never get here.
+        CREATE OR REPLACE FUNCTION books_move_facet() RETURNS trigger AS $$
+        BEGIN
+            UPDATE book_facets SET books = books - 1
+            WHERE genre_id = OLD.genre_id AND decade = COALESCE(year_decade(OLD.year), -1);
+            INSERT INTO book_facets AS f (genre_id, decade, books)
+            VALUES (NEW.genre_id, COALESCE(year_decade(NEW.year), -1), 1)
+            ON CONFLICT (genre_id, decade) DO UPDATE SET books = f.books + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'books_facets_insert') THEN
+                CREATE TRIGGER books_facets_insert
+                    AFTER INSERT ON books
+                    REFERENCING NEW TABLE AS new_books
+                    FOR EACH STATEMENT EXECUTE FUNCTION books_count_facets();
+                CREATE TRIGGER books_facets_delete
+                    AFTER DELETE ON books
+                    REFERENCING OLD TABLE AS old_books
+                    FOR EACH STATEMENT EXECUTE FUNCTION books_count_facets();
+                CREATE TRIGGER books_facets_update
+                    AFTER UPDATE OF genre_id, year ON books
+                    FOR EACH ROW
+                    WHEN (OLD.genre_id IS DISTINCT FROM NEW.genre_id
+                          OR year_decade(OLD.year) IS DISTINCT FROM year_decade(NEW.year))
+                    EXECUTE FUNCTION books_move_facet();
+            END IF;
+        END $$;
+
+        -- Copies currently on the shelf. Added once and backfilled from
+        -- active loans; afterwards kept current by triggers.
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'books' AND column_name = 'available_count'
+            ) THEN
+                ALTER TABLE books ADD COLUMN available_count INTEGER;
+                IF to_regclass('loans') IS NOT NULL THEN
+                    UPDATE books b
+                    SET available_count = b.quantity - (
+                        SELECT COUNT(*) FROM loans l
+                        WHERE l.book_id = b.id AND l.return_date IS NULL
+                    );
+                ELSE
+                    UPDATE books SET available_count = quantity;
+                END IF;
+                ALTER TABLE books ALTER COLUMN available_count SET NOT NULL;
+            END IF;
+            -- More copies out than owned is a bug, not a state to store.
+            -- NOT VALID: enforced on every write from now on, without failing
+            -- on rows that already drifted (reconcile_counters fixes those).
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'books_available_count_nonnegative'
+            ) THEN
+                ALTER TABLE books ADD CONSTRAINT books_available_count_nonnegative
+                    CHECK (available_count >= 0) NOT VALID;
+            END IF;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION books_sync_available_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                NEW.available_count := NEW.quantity;
+            ELSE
+                NEW.available_count := OLD.available_count + NEW.quantity - OLD.quantity;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'books_sync_available_count') THEN
+                CREATE TRIGGER books_sync_available_count
+                    BEFORE INSERT OR UPDATE OF quantity ON books
+                    FOR EACH ROW EXECUTE FUNCTION books_sync_available_count();
+            END IF;
+        END $$;
         """
         with connection_scope() as conn:
             with conn.cursor() as cur:
@@ -33,16 +288,18 @@ class BookRepository:
         author: str,
         isbn: str,
         genre: str,
-        year: str,
+        year: Optional[int],
         quantity: int = 1,
     ) -> None:
         sql = """
-        INSERT INTO books (title, author, isbn, genre, year, quantity)
+        INSERT INTO books (title, author_id, isbn, genre_id, year, quantity)
         VALUES (%s, %s, %s, %s, %s, %s)
         """
         with connection_scope() as conn:
+            author_id = self._authors.get_or_create_ids([author])[author]
+            genre_id = self._genres.get_or_create_ids([genre])[genre]
             with conn.cursor() as cur:
-                cur.execute(sql, (title, author, isbn, genre, year, quantity))
+                cur.execute(sql, (title, author_id, isbn, genre_id, year, quantity))
 
     def update_book(
         self,
@@ -51,66 +308,343 @@ class BookRepository:
         author: str,
         isbn: str,
         genre: str,
-        year: str,
-        quantity: int,
+        year: Optional[int],
+        quantity: Optional[int] = None,
     ) -> None:
+        """Update a book; quantity None keeps the current number of copies."""
         sql = """
         UPDATE books
         SET title = %s,
-            author = %s,
+            author_id = %s,
             isbn = %s,
-            genre = %s,
+            genre_id = %s,
             year = %s,
-            quantity = %s
+            quantity = COALESCE(%s, quantity)
         WHERE id = %s
         """
         with connection_scope() as conn:
+            author_id = self._authors.get_or_create_ids([author])[author]
+            genre_id = self._genres.get_or_create_ids([genre])[genre]
             with conn.cursor() as cur:
-                cur.execute(sql, (title, author, isbn, genre, year, quantity, book_id))
+                cur.execute(sql, (title, author_id, isbn, genre_id, year, quantity, book_id))
 
-    def delete_book(self, book_id: int) -> None:
-        sql = "DELETE FROM books WHERE id = %s"
+    def add_books(self, books: Iterable[Sequence]) -> int:
+        """
+        Insert many books in one transaction.
+
+        `books` yields (title, author, isbn, genre, year, quantity) tuples; rows
+        are sent as multi-row INSERTs of BATCH_PAGE_SIZE rows each.
+        Returns the number of rows inserted.
+        """
+        sql = "INSERT INTO books (title, author_id, isbn, genre_id, year, quantity) VALUES %s"
+        rows = [tuple(book) for book in books]
+        if not rows:
+            return 0
         with connection_scope() as conn:
+            author_ids = self._authors.get_or_create_ids(row[1] for row in rows)
+            genre_ids = self._genres.get_or_create_ids(row[3] for row in rows)
+            rows = [(row[0], author_ids[row[1]], row[2], genre_ids[row[3]]) + row[4:] for row in rows]
             with conn.cursor() as cur:
-                cur.execute(sql, (book_id,))
+                execute_values(cur, sql, rows, page_size=self.BATCH_PAGE_SIZE)
+        return len(rows)
 
-    def get_book(self, book_id: int) -> Optional[tuple]:
+    def update_books(self, books: Iterable[Sequence]) -> int:
+        """
+        Update many books in one statement per page.
+
+        `books` yields (book_id, title, author, isbn, genre, year, quantity);
+        a quantity of None keeps the book's current number of copies.
+        Returns the number of rows updated.
+        """
         sql = """
-        SELECT id, title, author, isbn, genre, year, quantity
-        FROM books
-        WHERE id = %s
+        UPDATE books AS b
+        SET title = v.title,
+            author_id = v.author_id,
+            isbn = v.isbn,
+            genre_id = v.genre_id,
+            year = v.year,
+            quantity = COALESCE(v.quantity, b.quantity)
+        FROM (VALUES %s) AS v(id, title, author_id, isbn, genre_id, year, quantity)
+        WHERE b.id = v.id
         """
+        rows = [tuple(book) for book in books]
+        if not rows:
+            return 0
+        template = "(%s::integer, %s, %s::integer, %s, %s::integer, %s::integer, %s::integer)"
+        updated = 0
+        with connection_scope() as conn:
+            author_ids = self._authors.get_or_create_ids(row[2] for row in rows)
+            genre_ids = self._genres.get_or_create_ids(row[4] for row in rows)
+            rows = [row[:2] + (author_ids[row[2]], row[3], genre_ids[row[4]]) + row[5:] for row in rows]
+            with conn.cursor() as cur:
+                for start in range(0, len(rows), self.BATCH_PAGE_SIZE):
+                    execute_values(cur, sql, rows[start:start + self.BATCH_PAGE_SIZE], template=template)
+                    updated += cur.rowcount
+        return updated
+
+    def delete_books(self, book_ids: Iterable[int]) -> int:
+        """Delete many books with a single statement. Returns rows deleted."""
+        ids = list(book_ids)
+        if not ids:
+            return 0
+        sql = "DELETE FROM books WHERE id = ANY(%s)"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (ids,))
+                return cur.rowcount
+
+    def delete_book(self, book_id: int) -> None:
+        sql = "DELETE FROM books WHERE id = %s"
         with connection_scope() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (book_id,))
+
+    def get_book(self, book_id: int) -> Optional[tuple]:
+        sql = self._SELECT_BOOKS + "WHERE b.id = %s"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "book_get", sql, (book_id,))
                 return cur.fetchone()
 
-    def list_books(self) -> List[tuple]:
+    def lock_available_counts(self, book_ids: Iterable[int]) -> dict:
+        """
+        Lock the given book rows until the end of the current transaction
+        and return {book_id: available_count}. Rows are locked in id order so
+        concurrent multi-book checkouts cannot deadlock. Missing ids are omitted.
+        """
+        ids = sorted(set(book_ids))
+        if not ids:
+            return {}
         sql = """
-        SELECT id, title, author, isbn, genre, year, quantity
+        SELECT id, available_count
         FROM books
+        WHERE id = ANY(%s)
         ORDER BY id
+        FOR UPDATE
         """
         with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (ids,))
+                return dict(cur.fetchall())
+
+    def get_books(self, book_ids: Iterable[int]) -> List[tuple]:
+        """Fetch several books by id in one query (missing ids are skipped)."""
+        ids = list(book_ids)
+        if not ids:
+            return []
+        sql = self._SELECT_BOOKS + "WHERE b.id = ANY(%s)"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (ids,))
+                return cur.fetchall()
+
+    def list_books(self, sort: str = "id", direction: str = "asc") -> List[tuple]:
+        _, order, _ = self._sorted_page(sort, direction, 0, None)
+        sql = self._SELECT_BOOKS + order
+        with connection_scope(readonly=True) as conn:
             with conn.cursor() as cur:
                 cur.execute(sql)
                 return cur.fetchall()
 
-    def search_books(self, keyword: str) -> List[tuple]:
-        sql = """
-        SELECT id, title, author, isbn, genre, year, quantity
-        FROM books
-        WHERE title ILIKE %s
-           OR author ILIKE %s
-           OR isbn ILIKE %s
-           OR genre ILIKE %s
-        ORDER BY id
+    def _sorted_page(self, sort: str, direction: str, after_id: int, after_value) -> Tuple[List[str], str, dict]:
         """
-        pattern = f"%{keyword}%"
-        with connection_scope() as conn:
+        Keyset condition(s), ORDER BY clause and parameters for one page in
+        `sort` order. after_id 0 means the first page; otherwise after_id and
+        after_value are the id and sort value of the previous page's last row.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Cannot sort books by {sort!r}; choose one of: {', '.join(self.SORT_KEYS)}")
+        if direction not in self.SORT_DIRECTIONS:
+            raise ValueError("Sort direction must be 'asc' or 'desc'")
+        expression, value, _ = self.SORT_KEYS[sort]
+        compare = "<" if direction == "desc" else ">"
+        if sort == "id":
+            order = f"ORDER BY b.id {direction.upper()}"
+        else:
+            order = f"ORDER BY {expression} {direction.upper()}, b.id {direction.upper()}"
+        if not after_id:
+            return [], order, {}
+        if sort == "id":
+            return [f"b.id {compare} %(after_id)s"], order, {"after_id": after_id}
+        conditions = [
+            # The row comparison breaks ties on id; the plain bound lets the
+            # planner start the index scan at the previous page's value.
+            f"{expression} {compare}= {value}",
+            f"({expression}, b.id) {compare} ({value}, %(after_id)s)",
+        ]
+        return conditions, order, {"after_id": after_id, "after_value": after_value}
+
+    @classmethod
+    def sort_value(cls, book: Sequence, sort: str):
+        """The value of `sort` in a book row, to pass back as after_value."""
+        return book[cls.SORT_KEYS[sort][2]]
+
+    def list_books_page(
+        self,
+        after_id: int = 0,
+        limit: int = 500,
+        sort: str = "id",
+        direction: str = "asc",
+        after_value=None,
+    ) -> List[tuple]:
+        """
+        Return one page of books in `sort` order (a SORT_KEYS key, 'asc' or
+        'desc'); pass the id and sort value (see sort_value) of the last row
+        of the previous page as `after_id` and `after_value` to fetch the
+        next one. after_id 0 fetches the first page.
+        """
+        conditions, order, params = self._sorted_page(sort, direction, after_id, after_value)
+        params["limit"] = limit
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        sql = self._SELECT_BOOKS + f"{where}{order} LIMIT %(limit)s"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+
+    def list_books_by_author(self, author_id: int) -> List[tuple]:
+        """All books by one author, by title, read through idx_books_author."""
+        sql = self._SELECT_BOOKS + "WHERE b.author_id = %s ORDER BY b.title, b.id"
+        with connection_scope(readonly=True) as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (pattern, pattern, pattern, pattern))
+                cur.execute(sql, (author_id,))
                 return cur.fetchall()
 
+    def _browse_conditions(
+        self,
+        genre_id: Optional[int],
+        year_from: Optional[int],
+        year_to: Optional[int],
+        query: Optional[str],
+    ) -> Tuple[List[str], dict]:
+        conditions, params = [], {}
+        if genre_id is not None:
+            conditions.append("b.genre_id = %(genre_id)s")
+            params["genre_id"] = genre_id
+        if year_from is not None:
+            conditions.append("b.year >= %(year_from)s")
+            params["year_from"] = year_from
+        if year_to is not None:
+            conditions.append("b.year <= %(year_to)s")
+            params["year_to"] = year_to
+        if query:
+            conditions.append(self._KEYWORD_MATCH)
+            params["pattern"] = f"%{query}%"
+        return conditions, params
+
+    def browse_books(
+        self,
+        genre_id: Optional[int] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        query: Optional[str] = None,
+        after_id: int = 0,
+        limit: int = 50,
+        sort: str = "id",
+        direction: str = "asc",
+        after_value=None,
+    ) -> List[tuple]:
+        """
+        One page of books in a genre and/or inclusive year range (and
+        matching `query`, as in search_books), paged and sorted as in
+        list_books_page.
+        """
+        conditions, params = self._browse_conditions(genre_id, year_from, year_to, query)
+        keyset, order, keyset_params = self._sorted_page(sort, direction, after_id, after_value)
+        conditions += keyset
+        params.update(keyset_params, limit=limit)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        sql = self._SELECT_BOOKS + f"{where}{order} LIMIT %(limit)s"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+
+    def facet_cells(
+        self,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        query: Optional[str] = None,
+    ) -> List[tuple]:
+        """
+        Book counts per (genre_id, decade) as (genre_id, decade, in_range,
+        books): `books` counts every book in the cell, `in_range` only those
+        within the inclusive year range. decade is None for unknown years.
+        Only books matching `query` are counted.
+
+        Without a query, and with year bounds on decade boundaries (year_from
+        ending in 0, year_to in 9), this reads the small book_facets table;
+        otherwise it is one grouped scan of the matching books.
+        """
+        aligned = (year_from is None or year_from % 10 == 0) and (year_to is None or year_to % 10 == 9)
+        if not query and aligned:
+            in_range = ["decade <> %(unknown)s"] if year_from is not None or year_to is not None else []
+            if year_from is not None:
+                in_range.append("decade >= %(year_from)s")
+            if year_to is not None:
+                in_range.append("decade <= %(year_to)s")
+            sql = f"""
+            SELECT genre_id, NULLIF(decade, %(unknown)s),
+                   CASE WHEN {' AND '.join(in_range) or 'TRUE'} THEN books ELSE 0 END, books
+            FROM book_facets
+            WHERE books > 0
+            """
+            params = {"unknown": self.UNKNOWN_DECADE, "year_from": year_from, "year_to": year_to}
+        else:
+            in_range, params = self._browse_conditions(None, year_from, year_to, None)
+            where, query_params = self._browse_conditions(None, None, None, query)
+            params.update(query_params)
+            sql = f"""
+            SELECT b.genre_id, year_decade(b.year),
+                   COUNT(*) FILTER (WHERE {' AND '.join(in_range) or 'TRUE'}), COUNT(*)
+            FROM books b
+            JOIN authors a ON a.id = b.author_id
+            JOIN genres g ON g.id = b.genre_id
+            WHERE {' AND '.join(where) or 'TRUE'}
+            GROUP BY 1, 2
+            """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
 
+    def export_books(self, stream, fmt: str = "csv", query: Optional[str] = None) -> int:
+        """
+        Stream books (optionally only those matching `query`, as in
+        search_books) from COPY ... TO STDOUT into the binary `stream`, in
+        constant memory. `fmt` is 'csv' (with a header row) or 'jsonl' (one
+        JSON object per line). Returns the number of books written.
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                # COPY takes no parameters, so the search pattern is bound by mogrify.
+                where = ""
+                if query:
+                    where = "WHERE " + cur.mogrify(self._KEYWORD_MATCH, {"pattern": f"%{query}%"}).decode()
+                select = (
+                    "SELECT b.id, b.title, a.name AS author, b.isbn, g.name AS genre, b.year, "
+                    "b.quantity, b.available_count "
+                    "FROM books b JOIN authors a ON a.id = b.author_id JOIN genres g ON g.id = b.genre_id "
+                    f"{where} ORDER BY b.id"
+                )
+                if fmt == "csv":
+                    copy = f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)"
+                elif fmt == "jsonl":
+                    # CSV mode with a quote and delimiter that never occur in
+                    # row_to_json output writes each JSON document verbatim;
+                    # text mode would escape its backslashes.
+                    copy = (
+                        f"COPY (SELECT row_to_json(r) FROM ({select}) r) TO STDOUT "
+                        "WITH (FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02')"
+                    )
+                else:
+                    raise ValueError(f"Unknown export format: {fmt}")
+                cur.copy_expert(copy, stream)
+                return cur.rowcount
 
+    def search_books(self, keyword: str) -> List[tuple]:
+        sql = self._SELECT_BOOKS + f"WHERE {self._KEYWORD_MATCH} ORDER BY b.id"
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, {"pattern": f"%{keyword}%"})
+                return cur.fetchall()
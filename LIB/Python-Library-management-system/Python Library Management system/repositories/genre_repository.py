@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, List
+
+from infrastructure.db import connection_scope
+
+
+class GenreRepository:
+    """
+    DAO for the genre lookup table referenced by books.genre_id.
+
+    Genre names are unique ignoring case and surrounding spaces.
+    """
+
+    def create_table(self) -> None:
+        sql = """
+        CREATE TABLE IF NOT EXISTS genres (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_genres_key ON genres (lower(btrim(name)));
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def get_or_create_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """Map each name to its genre id, creating genres that do not exist yet."""
+        wanted = list(set(names))
+        if not wanted:
+            return {}
+        lookup = """
+        SELECT n, g.id
+        FROM unnest(%s::text[]) AS n
+        JOIN genres g ON lower(btrim(g.name)) = lower(btrim(n))
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(lookup, (wanted,))
+                ids = dict(cur.fetchall())
+                missing = [name for name in wanted if name not in ids]
+                if missing:
+                    cur.execute(
+                        """
+                        INSERT INTO genres (name)
+                        SELECT DISTINCT ON (lower(btrim(n))) btrim(n) FROM unnest(%s::text[]) AS n
+                        ON CONFLICT (lower(btrim(name))) DO NOTHING
+                        """,
+                        (missing,),
+                    )
+                    cur.execute(lookup, (missing,))
+                    ids.update(cur.fetchall())
+                return ids
+
+    def list_genres(self) -> List[tuple]:
+        """All genres as (id, name), by name."""
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, name FROM genres ORDER BY name")
+                return cur.fetchall()
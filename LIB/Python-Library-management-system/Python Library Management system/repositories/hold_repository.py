@@ -0,0 +1,236 @@
+from typing import Dict, Iterable, List, Optional
+
+from infrastructure.db import connection_scope, execute_prepared
+
+
+class HoldRepository:
+    """
+    DAO for holds (reservations).
+
+    A hold is 'waiting' in its book's FIFO queue (ordered by id) until a
+    copy comes back, then 'ready' on the hold shelf until the member borrows
+    it ('fulfilled'), cancels it or lets it expire. A copy on the hold shelf
+    is not on the open shelf, so a trigger keeps books.available_count equal
+    to quantity - active loans - ready holds.
+    """
+
+    def create_table(self) -> None:
+        sql = """
+        CREATE TABLE IF NOT EXISTS holds (
+            id BIGSERIAL PRIMARY KEY,
+            book_id INTEGER NOT NULL REFERENCES books(id),
+            member_id INTEGER NOT NULL REFERENCES members(id),
+            placed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            status TEXT NOT NULL DEFAULT 'waiting'
+                CHECK (status IN ('waiting', 'ready', 'fulfilled', 'cancelled', 'expired')),
+            ready_at TIMESTAMPTZ,
+            expires_at TIMESTAMPTZ
+        );
+
+        -- Each book's queue in FIFO order. Allocation reads its head and a
+        -- position lookup is an index-only count of the entries before a hold.
+        CREATE INDEX IF NOT EXISTS idx_holds_queue
+            ON holds (book_id, id)
+            WHERE status = 'waiting';
+
+        -- One open hold per member and book.
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_open_member_book
+            ON holds (member_id, book_id)
+            WHERE status IN ('waiting', 'ready');
+
+        CREATE INDEX IF NOT EXISTS idx_holds_ready_expiry
+            ON holds (expires_at)
+            WHERE status = 'ready';
+
+        CREATE OR REPLACE FUNCTION holds_maintain_available() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'ready' THEN
+                UPDATE books SET available_count = available_count + 1 WHERE id = OLD.book_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'ready' THEN
+                UPDATE books SET available_count = available_count - 1 WHERE id = NEW.book_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = 'holds_maintain_available' AND tgrelid = 'holds'::regclass
+            ) THEN
+                CREATE TRIGGER holds_maintain_available
+                    AFTER INSERT OR DELETE OR UPDATE OF status ON holds
+                    FOR EACH ROW EXECUTE FUNCTION holds_maintain_available();
+            END IF;
+        END $$;
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def create_hold(self, member_id: int, book_id: int) -> Optional[int]:
+        """Queue a hold; returns its id, or None if the member already has one open."""
+        sql = """
+        INSERT INTO holds (book_id, member_id)
+        VALUES (%s, %s)
+        ON CONFLICT (member_id, book_id) WHERE status IN ('waiting', 'ready') DO NOTHING
+        RETURNING id
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (book_id, member_id))
+                row = cur.fetchone()
+                return row[0] if row else None
+
+    def cancel_hold(self, member_id: int, book_id: int) -> Optional[str]:
+        """
+        Cancel the member's open hold on this book. Returns the status it
+        had ('waiting' or 'ready'), or None if there was no open hold.
+        """
+        sql = """
+        WITH target AS (
+            SELECT id, status FROM holds
+            WHERE member_id = %s AND book_id = %s AND status IN ('waiting', 'ready')
+            FOR UPDATE
+        )
+        UPDATE holds h SET status = 'cancelled'
+        FROM target t
+        WHERE h.id = t.id
+        RETURNING t.status
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (member_id, book_id))
+                row = cur.fetchone()
+                return row[0] if row else None
+
+    def allocate(self, copies_by_book: Dict[int, int], pickup_days: int) -> List[tuple]:
+        """
+        Move the head of each book's queue to 'ready', one hold per returned
+        copy, in a single statement. Holds locked by a concurrent allocation
+        are skipped, so two terminals returning the same title serve two
+        different patrons. Returns (hold_id, book_id, member_id) per allocation.
+        """
+        if not copies_by_book:
+            return []
+        sql = """
+        WITH returned(book_id, copies) AS (
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        ),
+        next AS (
+            SELECT h.id
+            FROM returned r
+            CROSS JOIN LATERAL (
+                SELECT id FROM holds
+                WHERE book_id = r.book_id AND status = 'waiting'
+                ORDER BY id
+                LIMIT r.copies
+                FOR UPDATE SKIP LOCKED
+            ) h
+        )
+        UPDATE holds h
+        SET status = 'ready', ready_at = now(), expires_at = now() + make_interval(days => %s)
+        FROM next
+        WHERE h.id = next.id
+        RETURNING h.id, h.book_id, h.member_id
+        """
+        book_ids = sorted(copies_by_book)
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (book_ids, [copies_by_book[book_id] for book_id in book_ids], pickup_days))
+                return cur.fetchall()
+
+    def ready_book_ids(self, member_id: int, book_ids: Iterable[int]) -> List[int]:
+        """Which of these books have a copy on the hold shelf for this member."""
+        ids = list(book_ids)
+        if not ids:
+            return []
+        sql = "SELECT book_id FROM holds WHERE member_id = %s AND book_id = ANY(%s) AND status = 'ready'"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (member_id, ids))
+                return [row[0] for row in cur.fetchall()]
+
+    def fulfill(self, member_id: int, book_ids: Iterable[int]) -> int:
+        """
+        Close the member's open holds on books they have just borrowed. A
+        ready hold's copy leaves the hold shelf for the new loan.
+        """
+        ids = list(book_ids)
+        if not ids:
+            return 0
+        sql = """
+        UPDATE holds SET status = 'fulfilled'
+        WHERE member_id = %s AND book_id = ANY(%s) AND status IN ('waiting', 'ready')
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (member_id, ids))
+                return cur.rowcount
+
+    def expire_ready(self, limit: int) -> List[tuple]:
+        """
+        Expire up to `limit` ready holds past their pickup deadline and
+        return (hold_id, book_id, member_id) for each.
+        """
+        sql = """
+        WITH due AS (
+            SELECT id FROM holds
+            WHERE status = 'ready' AND expires_at < now()
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE holds h SET status = 'expired'
+        FROM due
+        WHERE h.id = due.id
+        RETURNING h.id, h.book_id, h.member_id
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (limit,))
+                return cur.fetchall()
+
+    def get_position(self, member_id: int, book_id: int) -> Optional[int]:
+        """
+        1-based queue position of the member's waiting hold on this book,
+        0 if it is ready for pickup, or None if there is no open hold.
+        """
+        sql = """
+        SELECT h.status,
+               CASE WHEN h.status = 'waiting' THEN (
+                   SELECT COUNT(*) FROM holds q
+                   WHERE q.book_id = h.book_id AND q.status = 'waiting' AND q.id <= h.id
+               ) ELSE 0 END
+        FROM holds h
+        WHERE h.member_id = %s AND h.book_id = %s AND h.status IN ('waiting', 'ready')
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "hold_position", sql, (member_id, book_id))
+                row = cur.fetchone()
+                return row[1] if row else None
+
+    def list_holds_for_member(self, member_id: int) -> List[tuple]:
+        """
+        Open holds as (hold_id, book_id, title, status, position, expires_at),
+        where position is 0 for holds ready for pickup.
+        """
+        sql = """
+        SELECT h.id, h.book_id, b.title, h.status,
+               CASE WHEN h.status = 'waiting' THEN (
+                   SELECT COUNT(*) FROM holds q
+                   WHERE q.book_id = h.book_id AND q.status = 'waiting' AND q.id <= h.id
+               ) ELSE 0 END,
+               h.expires_at
+        FROM holds h
+        JOIN books b ON b.id = h.book_id
+        WHERE h.member_id = %s AND h.status IN ('waiting', 'ready')
+        ORDER BY h.id
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (member_id,))
+                return cur.fetchall()
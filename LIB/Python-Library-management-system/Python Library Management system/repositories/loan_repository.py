@@ -1,6 +1,127 @@
-from typing import List
+import csv
+import gzip
+import os
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence
 
-from infrastructure.db import connection_scope
+from psycopg2.extras import execute_values
+
+from infrastructure.db import connection_scope, execute_prepared
+
+# Archive files hold UTC timestamps with fixed-width microseconds, which
+# datetime.fromisoformat parses on every supported Python version.
+_TIMESTAMP = "to_char({0} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US')"
+_ARCHIVE_COLUMNS = ", ".join(
+    ["id", "book_id", "member_id"]
+    + [_TIMESTAMP.format(column) + f" AS {column}" for column in ("loan_date", "due_date", "return_date")]
+)
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc) if value else None
+
+
+_ARCHIVE_HEADER = b"id,book_id,member_id,loan_date,due_date,return_date\n"
+
+
+def _archive_path(partition_name: str, path: str) -> str:
+    """
+    Where an archived partition can be read on this host: the recorded
+    path, or <LIB_ARCHIVE_DIR>/<file name> when the archive directory is
+    mounted somewhere else. Raises ValueError if neither is readable.
+    """
+    if os.path.exists(path):
+        return path
+    directory = os.getenv("LIB_ARCHIVE_DIR")
+    if directory:
+        moved = os.path.join(directory, os.path.basename(path))
+        if os.path.exists(moved):
+            return moved
+    raise ValueError(
+        f"Archived loans of {partition_name} are in {path}, which is not readable on this host; "
+        "set LIB_ARCHIVE_DIR to the directory holding the archive files."
+    )
+
+
+def _archive_rows(lines: Iterable[str], member_id: int) -> List[tuple]:
+    """Loans of `member_id` among archive CSV lines, as list_loans_for_member rows."""
+    rows = []
+    for record in csv.reader(lines):
+        if record[0] == "id" or int(record[2]) != member_id:
+            continue
+        rows.append((
+            int(record[0]),
+            int(record[1]),
+            member_id,
+            _parse_timestamp(record[3]),
+            _parse_timestamp(record[4]),
+            _parse_timestamp(record[5]),
+        ))
+    return rows
+
+
+def _read_archive_block(path: str, offset: int, length: int, member_id: int) -> List[tuple]:
+    """One member's loans from the gzip block at `offset` of an indexed archive."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        block = gzip.decompress(f.read(length))
+    return _archive_rows(block.decode("utf-8").splitlines(), member_id)
+
+
+def _read_archive(path: str, member_id: int) -> List[tuple]:
+    """Loans of `member_id` from a whole archive file (archives written before block indexes)."""
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        return _archive_rows(f, member_id)
+
+
+class _ArchiveBlockWriter:
+    """
+    Target for COPY ... TO STDOUT of loans ordered by member_id: writes the
+    rows as a series of gzip members of about BLOCK_BYTES each, never
+    splitting one member's loans, and records (first_member_id,
+    last_member_id, byte_offset, byte_length) per block in `blocks`. The
+    file is still a plain .csv.gz (concatenated gzip members).
+    """
+
+    BLOCK_BYTES = 64 * 1024
+
+    def __init__(self, f):
+        self._f = f
+        self._pending = b""
+        self._lines = []
+        self._size = 0
+        self._first = self._last = None
+        self.blocks = []
+        self._f.write(gzip.compress(_ARCHIVE_HEADER))
+
+    def write(self, data) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            # id, book_id and member_id are plain integers: no CSV quoting.
+            member_id = int(line.split(b",", 3)[2])
+            if self._size >= self.BLOCK_BYTES and member_id != self._last:
+                self._flush()
+            if self._first is None:
+                self._first = member_id
+            self._last = member_id
+            self._lines.append(line + b"\n")
+            self._size += len(line) + 1
+
+    def _flush(self) -> None:
+        if not self._lines:
+            return
+        offset = self._f.tell()
+        self._f.write(gzip.compress(b"".join(self._lines)))
+        self.blocks.append((self._first, self._last, offset, self._f.tell() - offset))
+        self._lines, self._size, self._first, self._last = [], 0, None, None
+
+    def close(self) -> None:
+        if self._pending:
+            self.write(b"\n")
+        self._flush()
 
 
 class LoanRepository:
@@ -8,27 +129,351 @@ class LoanRepository:
     DAO for loans.
     """
 
+    # Rows per multi-row INSERT in create_loans.
+    BATCH_PAGE_SIZE = 1000
+
     def create_table(self) -> None:
+        """
+        Create `loans` as a table range-partitioned by loan_date, one
+        partition per calendar year plus a default partition, and migrate an
+        existing unpartitioned `loans` table in place (same ids and sequence).
+        """
         sql = """
+        CREATE SEQUENCE IF NOT EXISTS loans_id_seq;
+
+        -- One-time migration: move the old heap table out of the way.
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('loans') AND relkind = 'r') THEN
+                ALTER TABLE loans RENAME TO loans_unpartitioned;
+                ALTER INDEX IF EXISTS loans_pkey RENAME TO loans_unpartitioned_pkey;
+                DROP INDEX IF EXISTS idx_loans_active_by_book;
+            END IF;
+        END $$;
+
         CREATE TABLE IF NOT EXISTS loans (
-            id SERIAL PRIMARY KEY,
+            id INTEGER NOT NULL DEFAULT nextval('loans_id_seq'),
             book_id INTEGER NOT NULL REFERENCES books(id),
             member_id INTEGER NOT NULL REFERENCES members(id),
             loan_date TIMESTAMPTZ NOT NULL,
             due_date TIMESTAMPTZ NOT NULL,
-            return_date TIMESTAMPTZ
+            return_date TIMESTAMPTZ,
+            PRIMARY KEY (id, loan_date)
+        ) PARTITION BY RANGE (loan_date);
+
+        CREATE TABLE IF NOT EXISTS loans_default PARTITION OF loans DEFAULT;
+
+        -- Create the partition for one calendar year (UTC). Rows that already
+        -- landed in loans_default for that year are moved into it; the delete
+        -- and re-insert leave the loan counters unchanged, and the
+        -- library.moving_loans flag keeps loans_record_event (StatsRepository)
+        -- from counting the moved loans as new circulation.
+        CREATE OR REPLACE FUNCTION loans_ensure_partition(year INTEGER) RETURNS void AS $$
+        DECLARE
+            part TEXT := format('loans_y%s', year);
+            lo TIMESTAMPTZ := make_timestamptz(year, 1, 1, 0, 0, 0, 'UTC');
+            hi TIMESTAMPTZ := make_timestamptz(year + 1, 1, 1, 0, 0, 0, 'UTC');
+        BEGIN
+            IF to_regclass(part) IS NOT NULL THEN
+                RETURN;
+            END IF;
+            CREATE TEMP TABLE loans_moving AS
+                SELECT * FROM loans_default WHERE loan_date >= lo AND loan_date < hi;
+            DELETE FROM loans_default WHERE loan_date >= lo AND loan_date < hi;
+            EXECUTE format('CREATE TABLE %I PARTITION OF loans FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+            PERFORM set_config('library.moving_loans', 'on', true);
+            INSERT INTO loans SELECT * FROM loans_moving;
+            PERFORM set_config('library.moving_loans', 'off', true);
+            DROP TABLE loans_moving;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        SELECT loans_ensure_partition(y::int)
+        FROM generate_series(
+            extract(year FROM now() AT TIME ZONE 'UTC')::int - 1,
+            extract(year FROM now() AT TIME ZONE 'UTC')::int + 1
+        ) AS y;
+
+        DO $$
+        BEGIN
+            IF to_regclass('loans_unpartitioned') IS NOT NULL THEN
+                PERFORM loans_ensure_partition(y::int)
+                FROM generate_series(
+                    (SELECT extract(year FROM min(loan_date) AT TIME ZONE 'UTC')::int FROM loans_unpartitioned),
+                    (SELECT extract(year FROM max(loan_date) AT TIME ZONE 'UTC')::int FROM loans_unpartitioned)
+                ) AS y;
+                -- The counter trigger is created below, after the copy, so the
+                -- already-correct counters are not incremented a second time.
+                INSERT INTO loans (id, book_id, member_id, loan_date, due_date, return_date)
+                SELECT id, book_id, member_id, loan_date, due_date, return_date FROM loans_unpartitioned;
+                ALTER SEQUENCE loans_id_seq OWNED BY loans.id;
+                DROP TABLE loans_unpartitioned;
+            END IF;
+        END $$;
+
+        ALTER SEQUENCE loans_id_seq OWNED BY loans.id;
+
+        -- Active loans by book, oldest first: resolves a scanned return
+        -- without knowing the member.
+        CREATE INDEX IF NOT EXISTS idx_loans_active_by_book
+            ON loans (book_id, loan_date)
+            WHERE return_date IS NULL;
+
+        -- A member's history, newest first.
+        CREATE INDEX IF NOT EXISTS idx_loans_member_history
+            ON loans (member_id, loan_date);
+
+        -- loan_date follows insertion order, so a BRIN index stays tiny and
+        -- lets date-range history and reporting queries skip whole blocks.
+        CREATE INDEX IF NOT EXISTS idx_loans_loan_date_brin
+            ON loans USING brin (loan_date);
+
+        -- Archived (detached, exported and dropped) partitions.
+        CREATE TABLE IF NOT EXISTS loans_archive (
+            partition_name TEXT PRIMARY KEY,
+            range_start TIMESTAMPTZ NOT NULL,
+            range_end TIMESTAMPTZ NOT NULL,
+            row_count BIGINT NOT NULL,
+            path TEXT NOT NULL,
+            archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
         );
+        -- Archives written sorted by member_id in gzip blocks, with the
+        -- member range and byte range of every block, so one member's
+        -- history reads a single block. Older archives are read whole.
+        ALTER TABLE loans_archive ADD COLUMN IF NOT EXISTS indexed BOOLEAN NOT NULL DEFAULT false;
+        CREATE TABLE IF NOT EXISTS loans_archive_blocks (
+            partition_name TEXT NOT NULL REFERENCES loans_archive(partition_name) ON DELETE CASCADE,
+            first_member_id INTEGER NOT NULL,
+            last_member_id INTEGER NOT NULL,
+            byte_offset BIGINT NOT NULL,
+            byte_length INTEGER NOT NULL,
+            PRIMARY KEY (partition_name, first_member_id)
+        );
+
+        -- Keep members.active_loan_count and books.available_count in step
+        -- with every write to loans (single rows, batches and COPY alike).
+        CREATE OR REPLACE FUNCTION loans_maintain_counters() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.return_date IS NULL THEN
+                UPDATE members SET active_loan_count = active_loan_count - 1 WHERE id = OLD.member_id;
+                UPDATE books SET available_count = available_count + 1 WHERE id = OLD.book_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.return_date IS NULL THEN
+                UPDATE members SET active_loan_count = active_loan_count + 1 WHERE id = NEW.member_id;
+                UPDATE books SET available_count = available_count - 1 WHERE id = NEW.book_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = 'loans_maintain_counters' AND tgrelid = 'loans'::regclass
+            ) THEN
+                CREATE TRIGGER loans_maintain_counters
+                    AFTER INSERT OR DELETE OR UPDATE OF return_date, book_id, member_id ON loans
+                    FOR EACH ROW EXECUTE FUNCTION loans_maintain_counters();
+            END IF;
+        END $$;
         """
         with connection_scope() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql)
 
-    def count_active_loans_for_member(self, member_id: int) -> int:
-        sql = "SELECT COUNT(*) FROM loans WHERE member_id = %s AND return_date IS NULL"
+    def ensure_partitions(self, first_year: int, last_year: int) -> None:
+        """Create the yearly partitions for first_year..last_year (inclusive)."""
+        sql = "SELECT loans_ensure_partition(y) FROM generate_series(%s, %s) AS y"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (first_year, last_year))
+
+    def list_partitions(self) -> List[tuple]:
+        """
+        Return (partition_name, range_start, range_end, rows, active_loans)
+        for every yearly partition, oldest first. Row counts are exact.
+        """
+        sql = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'loans'::regclass AND c.relname <> 'loans_default'
+        ORDER BY c.relname
+        """
+        partitions = []
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                for (name,) in cur.fetchall():
+                    cur.execute(f"SELECT COUNT(*), COUNT(*) FILTER (WHERE return_date IS NULL) FROM {name}")
+                    rows, active = cur.fetchone()
+                    year = int(name[len("loans_y"):])
+                    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+                    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+                    partitions.append((name, start, end, rows, active))
+        return partitions
+
+    def archive_partition(self, partition_name: str, directory: str) -> int:
+        """
+        Detach a yearly partition whose loans are all returned, export it to
+        <directory>/<partition_name>.csv.gz, record it in loans_archive and
+        drop it, all in one transaction: if the export fails the partition
+        stays attached. Returns the number of loans archived.
+
+        The file is sorted by member and written in gzip blocks indexed in
+        loans_archive_blocks (see _ArchiveBlockWriter).
+        """
+        if not partition_name.startswith("loans_y") or not partition_name[len("loans_y"):].isdigit():
+            raise ValueError(f"Not a yearly loans partition: {partition_name}")
+        year = int(partition_name[len("loans_y"):])
+        start = datetime(year, 1, 1, tzinfo=timezone.utc)
+        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.abspath(os.path.join(directory, f"{partition_name}.csv.gz"))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"ALTER TABLE loans DETACH PARTITION {partition_name}")
+                cur.execute(f"SELECT COUNT(*) FILTER (WHERE return_date IS NULL), COUNT(*) FROM {partition_name}")
+                active, rows = cur.fetchone()
+                if active:
+                    raise ValueError(f"{partition_name} still has {active} active loan(s).")
+                try:
+                    with open(tmp_path, "wb") as f:
+                        writer = _ArchiveBlockWriter(f)
+                        cur.copy_expert(
+                            f"COPY (SELECT {_ARCHIVE_COLUMNS} FROM {partition_name} ORDER BY member_id, id) "
+                            "TO STDOUT WITH (FORMAT csv)",
+                            writer,
+                        )
+                        writer.close()
+                    cur.execute(
+                        """
+                        INSERT INTO loans_archive (partition_name, range_start, range_end, row_count, path, indexed)
+                        VALUES (%s, %s, %s, %s, %s, true)
+                        """,
+                        (partition_name, start, end, rows, path),
+                    )
+                    execute_values(
+                        cur,
+                        "INSERT INTO loans_archive_blocks "
+                        "(partition_name, first_member_id, last_member_id, byte_offset, byte_length) VALUES %s",
+                        [(partition_name,) + block for block in writer.blocks],
+                        page_size=self.BATCH_PAGE_SIZE,
+                    )
+                    cur.execute(f"DROP TABLE {partition_name}")
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+        os.replace(tmp_path, path)
+        return rows
+
+    def lock_member(self, member_id: int) -> Optional[int]:
+        """
+        Lock the member row until the end of the current transaction so
+        concurrent checkouts for the same member are serialized. Returns the
+        member's active loan count, or None if the member does not exist.
+        """
+        sql = "SELECT active_loan_count FROM members WHERE id = %s FOR UPDATE"
         with connection_scope() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (member_id,))
-                return cur.fetchone()[0]
+                row = cur.fetchone()
+                return row[0] if row else None
+
+    def lock_members(self, member_ids: Iterable[int]) -> dict:
+        """
+        Lock several member rows, in id order, until the end of the current
+        transaction and return {member_id: active_loan_count}. Missing ids
+        are omitted.
+        """
+        ids = sorted(set(member_ids))
+        if not ids:
+            return {}
+        sql = "SELECT id, active_loan_count FROM members WHERE id = ANY(%s) ORDER BY id FOR UPDATE"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (ids,))
+                return dict(cur.fetchall())
+
+    def count_active_loans_for_member(self, member_id: int) -> int:
+        """O(1): reads the trigger-maintained members.active_loan_count."""
+        sql = "SELECT active_loan_count FROM members WHERE id = %s"
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "loan_count_active_for_member", sql, (member_id,))
+                row = cur.fetchone()
+                return row[0] if row else 0
+
+    def reconcile_counters(self, fix: bool = True) -> dict:
+        """
+        Recompute books.available_count and members.active_loan_count from
+        loans (and copies waiting on the hold shelf, see HoldRepository) with
+        set-based queries and report rows that drifted as
+        {"books": [(id, stored, actual), ...], "members": [...]}. With
+        fix=True the drifted rows are corrected in the same transaction.
+        """
+        books_sql = """
+        WITH actual AS (
+            SELECT b.id, b.available_count AS stored,
+                   b.quantity - COALESCE(a.active, 0) - COALESCE(h.ready, 0) AS expected
+            FROM books b
+            LEFT JOIN (
+                SELECT book_id, COUNT(*) AS active FROM loans
+                WHERE return_date IS NULL GROUP BY book_id
+            ) a ON a.book_id = b.id
+            LEFT JOIN ({ready_holds}) h ON h.book_id = b.id
+        )
+        SELECT id, stored, expected FROM actual
+        WHERE stored IS DISTINCT FROM expected
+        ORDER BY id
+        """
+        members_sql = """
+        WITH actual AS (
+            SELECT m.id, m.active_loan_count AS stored, COALESCE(a.active, 0) AS expected
+            FROM members m
+            LEFT JOIN (
+                SELECT member_id, COUNT(*) AS active FROM loans
+                WHERE return_date IS NULL GROUP BY member_id
+            ) a ON a.member_id = m.id
+        )
+        SELECT id, stored, expected FROM actual
+        WHERE stored IS DISTINCT FROM expected
+        ORDER BY id
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                # Block loan writes so the recount and the fix see one state.
+                cur.execute("LOCK TABLE loans IN SHARE MODE")
+                cur.execute("SELECT to_regclass('holds') IS NOT NULL")
+                if cur.fetchone()[0]:
+                    cur.execute("LOCK TABLE holds IN SHARE MODE")
+                    ready_holds = "SELECT book_id, COUNT(*) AS ready FROM holds WHERE status = 'ready' GROUP BY book_id"
+                else:
+                    ready_holds = "SELECT NULL::int AS book_id, 0 AS ready WHERE false"
+                cur.execute(books_sql.format(ready_holds=ready_holds))
+                books = cur.fetchall()
+                cur.execute(members_sql)
+                members = cur.fetchall()
+                if fix and books:
+                    execute_values(
+                        cur,
+                        "UPDATE books AS b SET available_count = v.expected "
+                        "FROM (VALUES %s) AS v(id, expected) WHERE b.id = v.id",
+                        [(book_id, expected) for book_id, _, expected in books],
+                        page_size=self.BATCH_PAGE_SIZE,
+                    )
+                if fix and members:
+                    execute_values(
+                        cur,
+                        "UPDATE members AS m SET active_loan_count = v.expected "
+                        "FROM (VALUES %s) AS v(id, expected) WHERE m.id = v.id",
+                        [(member_id, expected) for member_id, _, expected in members],
+                        page_size=self.BATCH_PAGE_SIZE,
+                    )
+        return {"books": books, "members": members}
 
     def create_loan(self, book_id: int, member_id: int, loan_date, due_date) -> None:
         sql = """
@@ -39,22 +484,134 @@ class LoanRepository:
             with conn.cursor() as cur:
                 cur.execute(sql, (book_id, member_id, loan_date, due_date))
 
-    def mark_returned(self, loan_id: int, return_date) -> None:
-        sql = "UPDATE loans SET return_date = %s WHERE id = %s"
+    def create_loans(self, loans: Iterable[Sequence]) -> int:
+        """
+        Insert many loans in one transaction.
+
+        `loans` yields (book_id, member_id, loan_date, due_date) tuples.
+        Returns the number of rows inserted.
+        """
+        sql = "INSERT INTO loans (book_id, member_id, loan_date, due_date) VALUES %s"
+        rows = [tuple(loan) for loan in loans]
+        if not rows:
+            return 0
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, sql, rows, page_size=self.BATCH_PAGE_SIZE)
+        return len(rows)
+
+    def mark_returned_many(self, loan_ids: Iterable[int], return_date) -> List[int]:
+        """
+        Mark many loans returned with a single statement. Loans that are
+        already returned are left untouched. Returns the book id of each
+        loan actually closed (one entry per copy).
+        """
+        ids = list(loan_ids)
+        if not ids:
+            return []
+        sql = """
+        UPDATE loans SET return_date = %s
+        WHERE id = ANY(%s) AND return_date IS NULL
+        RETURNING book_id
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (return_date, ids))
+                return [row[0] for row in cur.fetchall()]
+
+    def mark_returned(self, loan_id: int, return_date) -> Optional[int]:
+        """Close one loan; returns its book id, or None if it was not open."""
+        sql = "UPDATE loans SET return_date = %s WHERE id = %s AND return_date IS NULL RETURNING book_id"
         with connection_scope() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (return_date, loan_id))
+                row = cur.fetchone()
+                return row[0] if row else None
 
-    def list_loans_for_member(self, member_id: int) -> List[tuple]:
+    def list_loans_for_member(self, member_id: int, include_archived: bool = False) -> List[tuple]:
+        """
+        Return the member's loans, newest first. With include_archived=True,
+        loans from archived partitions (see archive_partition) are read back
+        from their export files and merged in: only the one block holding
+        this member is read from each indexed archive. Raises ValueError if
+        an archive file is not readable on this host (see LIB_ARCHIVE_DIR).
+        """
         sql = """
         SELECT id, book_id, member_id, loan_date, due_date, return_date
         FROM loans
         WHERE member_id = %s
         ORDER BY loan_date DESC
         """
-        with connection_scope() as conn:
+        with connection_scope(readonly=True) as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (member_id,))
+                rows = cur.fetchall()
+                if not include_archived:
+                    return rows
+                cur.execute(
+                    """
+                    SELECT a.partition_name, a.path, a.indexed, b.byte_offset, b.byte_length
+                    FROM loans_archive a
+                    LEFT JOIN loans_archive_blocks b
+                      ON b.partition_name = a.partition_name
+                     AND b.first_member_id <= %(member_id)s AND b.last_member_id >= %(member_id)s
+                    WHERE NOT a.indexed OR b.partition_name IS NOT NULL
+                    ORDER BY a.range_start DESC
+                    """,
+                    {"member_id": member_id},
+                )
+                archives = cur.fetchall()
+        for partition_name, path, indexed, offset, length in archives:
+            path = _archive_path(partition_name, path)
+            if indexed:
+                rows.extend(_read_archive_block(path, offset, length, member_id))
+            else:
+                rows.extend(_read_archive(path, member_id))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def get_active_loans_for_member_and_books(self, member_id: int, book_ids: Iterable[int]) -> List[tuple]:
+        """
+        Return (book_id, loan_id) for the most recent active loan of each of
+        `book_ids` held by this member; books without one are omitted.
+        """
+        ids = list(book_ids)
+        if not ids:
+            return []
+        sql = """
+        SELECT DISTINCT ON (book_id) book_id, id
+        FROM loans
+        WHERE member_id = %s
+          AND book_id = ANY(%s)
+          AND return_date IS NULL
+        ORDER BY book_id, loan_date DESC
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (member_id, ids))
+                return cur.fetchall()
+
+    def get_active_loans_for_isbns(self, isbns: Iterable[str]) -> List[tuple]:
+        """
+        Return (isbn, loan_id, member_id, book_id) for every active loan of a
+        book with one of these ISBNs, oldest loan first per ISBN. Rows are
+        locked (skipping loans another terminal is already returning) until
+        the end of the current transaction.
+        """
+        codes = list(isbns)
+        if not codes:
+            return []
+        sql = """
+        SELECT b.isbn, l.id, l.member_id, l.book_id
+        FROM books b
+        JOIN loans l ON l.book_id = b.id AND l.return_date IS NULL
+        WHERE b.isbn = ANY(%s)
+        ORDER BY b.isbn, l.loan_date
+        FOR UPDATE OF l SKIP LOCKED
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (codes,))
                 return cur.fetchall()
 
     def get_active_loan_for_member_and_book(self, member_id: int, book_id: int):
@@ -73,7 +630,7 @@ class LoanRepository:
         """
         with connection_scope() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (member_id, book_id))
+                execute_prepared(cur, "loan_active_for_member_and_book", sql, (member_id, book_id))
                 return cur.fetchone()
 
 
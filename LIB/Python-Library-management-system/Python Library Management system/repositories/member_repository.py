@@ -26,6 +26,43 @@ class MemberRepository:
             id INTEGER PRIMARY KEY REFERENCES users(id),
             full_name TEXT NOT NULL
         );
+
+        -- Member search: trigram indexes serve ILIKE '%term%' on both columns
+        -- for terms of three or more characters; the lower() prefix indexes
+        -- serve lower(col) LIKE 'ab%' for shorter terms (which trigrams can't
+        -- narrow) and the prefix-first ordering of the results.
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+            ON users USING GIN (username gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_users_username_lower_prefix
+            ON users (lower(username) text_pattern_ops);
+        CREATE INDEX IF NOT EXISTS idx_members_full_name_trgm
+            ON members USING GIN (full_name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_members_full_name_lower_prefix
+            ON members (lower(full_name) text_pattern_ops);
+
+        -- Active loans per member, maintained by triggers on loans (see
+        -- LoanRepository.create_table). Added once and backfilled.
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'members' AND column_name = 'active_loan_count'
+            ) THEN
+                ALTER TABLE members ADD COLUMN active_loan_count INTEGER;
+                IF to_regclass('loans') IS NOT NULL THEN
+                    UPDATE members m
+                    SET active_loan_count = (
+                        SELECT COUNT(*) FROM loans l
+                        WHERE l.member_id = m.id AND l.return_date IS NULL
+                    );
+                ELSE
+                    UPDATE members SET active_loan_count = 0;
+                END IF;
+                ALTER TABLE members ALTER COLUMN active_loan_count SET DEFAULT 0;
+                ALTER TABLE members ALTER COLUMN active_loan_count SET NOT NULL;
+            END IF;
+        END $$;
         """
         with connection_scope() as conn:
             with conn.cursor() as cur:
@@ -54,22 +91,74 @@ class MemberRepository:
         JOIN members m ON u.id = m.id
         WHERE u.id = %s
         """
-        with connection_scope() as conn:
+        with connection_scope(readonly=True) as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (member_id,))
                 return cur.fetchone()
 
-    def list_members(self) -> List[tuple]:
+    def list_members(self, after_id: int = 0, limit: int = 50) -> List[tuple]:
+        """
+        Return one page of members ordered by id.
+
+        Keyset pagination: pass the id of the last row of the previous page
+        as `after_id` to fetch the next one. Each page is a primary-key range
+        scan, so deep pages cost the same as the first.
+        """
         sql = """
         SELECT u.id, u.username, m.full_name, u.role_id
         FROM users u
         JOIN members m ON u.id = m.id
+        WHERE u.id > %s
         ORDER BY u.id
+        LIMIT %s
         """
-        with connection_scope() as conn:
+        with connection_scope(readonly=True) as conn:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                cur.execute(sql, (after_id, limit))
                 return cur.fetchall()
 
+    # Shortest term the trigram indexes can narrow; shorter terms only
+    # match as a prefix.
+    MIN_CONTAINS_LENGTH = 3
 
+    def search_members(self, query: str, limit: int = 20) -> List[tuple]:
+        """
+        Find members whose username or full name contains `query`
+        (case-insensitive). Username prefix matches are listed first.
 
+        Each branch of the UNION is an index scan on one table capped at
+        `limit` ids, so only that small set is joined and sorted. Terms
+        shorter than MIN_CONTAINS_LENGTH match username and full name
+        prefixes only.
+        """
+        branches = [
+            """
+            (SELECT id FROM users WHERE lower(username) LIKE %(prefix)s
+             ORDER BY lower(username) LIMIT %(limit)s)
+            """,
+            """
+            (SELECT id FROM members WHERE lower(full_name) LIKE %(prefix)s
+             ORDER BY lower(full_name) LIMIT %(limit)s)
+            """,
+        ]
+        term = query.strip()
+        if len(term) >= self.MIN_CONTAINS_LENGTH:
+            branches += [
+                "(SELECT id FROM users WHERE username ILIKE %(pattern)s LIMIT %(limit)s)",
+                "(SELECT id FROM members WHERE full_name ILIKE %(pattern)s LIMIT %(limit)s)",
+            ]
+        sql = """
+        WITH hits AS (%s)
+        SELECT u.id, u.username, m.full_name, u.role_id
+        FROM hits h
+        JOIN users u ON u.id = h.id
+        JOIN members m ON m.id = h.id
+        ORDER BY (lower(u.username) LIKE %%(prefix)s) DESC, u.username, u.id
+        LIMIT %%(limit)s
+        """ % " UNION ".join(branches)
+        term = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params = {"pattern": f"%{term}%", "prefix": f"{term.lower()}%", "limit": limit}
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
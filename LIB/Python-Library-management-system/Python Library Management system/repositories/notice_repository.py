@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import List, Optional
+
+from infrastructure.db import connection_scope
+
+
+class NoticeRepository:
+    """
+    DAO for due-date reminders and overdue notices.
+
+    Notices are generated per due_date window: each kind keeps a checkpoint
+    (`through`) and every run only scans open loans due after it, via a
+    partial index on open loans, so a loan is never scanned or notified
+    twice for the same kind. Notices go to notice_outbox, one row per member
+    per window, until a deliverer marks them sent.
+    """
+
+    def create_table(self) -> None:
+        sql = """
+        CREATE TABLE IF NOT EXISTS notice_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            member_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            sent_at TIMESTAMPTZ
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_notice_outbox_unsent
+            ON notice_outbox (id)
+            WHERE sent_at IS NULL;
+
+        CREATE TABLE IF NOT EXISTS notice_checkpoints (
+            kind TEXT PRIMARY KEY,
+            -- Loans due at or before this have been handled; NULL before the first run.
+            through TIMESTAMPTZ
+        );
+
+        -- Open loans by due date: the only index the scheduler reads.
+        CREATE INDEX IF NOT EXISTS idx_loans_open_due
+            ON loans (due_date)
+            WHERE return_date IS NULL;
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def lock_checkpoint(self, kind: str) -> Optional[datetime]:
+        """
+        Lock this kind's checkpoint row until the end of the transaction, so
+        concurrent schedulers take turns, and return it (None on first run).
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO notice_checkpoints (kind, through) VALUES (%s, NULL) "
+                    "ON CONFLICT (kind) DO NOTHING",
+                    (kind,),
+                )
+                cur.execute("SELECT through FROM notice_checkpoints WHERE kind = %s FOR UPDATE", (kind,))
+                return cur.fetchone()[0]
+
+    def set_checkpoint(self, kind: str, through: datetime) -> None:
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE notice_checkpoints SET through = %s WHERE kind = %s", (through, kind))
+
+    def earliest_open_due_date(self) -> Optional[datetime]:
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT min(due_date) FROM loans WHERE return_date IS NULL")
+                return cur.fetchone()[0]
+
+    def queue_notices(self, kind: str, start: datetime, end: datetime) -> int:
+        """
+        Add one outbox notice per member with open loans due in (start, end],
+        listing those loans. Returns the number of notices queued.
+        """
+        sql = """
+        INSERT INTO notice_outbox (member_id, kind, payload)
+        SELECT l.member_id, %(kind)s,
+               jsonb_build_object(
+                   'full_name', min(m.full_name),
+                   'loans', jsonb_agg(
+                       jsonb_build_object(
+                           'loan_id', l.id, 'book_id', l.book_id, 'title', b.title, 'due_date', l.due_date
+                       ) ORDER BY l.due_date, l.id
+                   )
+               )
+        FROM loans l
+        JOIN books b ON b.id = l.book_id
+        JOIN members m ON m.id = l.member_id
+        WHERE l.return_date IS NULL
+          AND l.due_date > %(start)s
+          AND l.due_date <= %(end)s
+        GROUP BY l.member_id
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, {"kind": kind, "start": start, "end": end})
+                return cur.rowcount
+
+    def lock_unsent(self, limit: int) -> List[tuple]:
+        """
+        Lock up to `limit` unsent notices, oldest first, skipping ones another
+        deliverer holds. Returns (id, member_id, kind, payload, created_at).
+        """
+        sql = """
+        SELECT id, member_id, kind, payload, created_at
+        FROM notice_outbox
+        WHERE sent_at IS NULL
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (limit,))
+                return cur.fetchall()
+
+    def mark_sent(self, notice_ids: List[int]) -> None:
+        if not notice_ids:
+            return
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE notice_outbox SET sent_at = now() WHERE id = ANY(%s)", (notice_ids,))
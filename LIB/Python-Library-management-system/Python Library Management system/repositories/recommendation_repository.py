@@ -0,0 +1,107 @@
+import io
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from infrastructure.db import connection_scope
+
+
+class RecommendationRepository:
+    """
+    DAO for "borrowed together" recommendations.
+
+    book_recommendations holds the top neighbours of each book as computed
+    by build_recommendations.py; a desk lookup is one primary-key range read.
+    """
+
+    def create_table(self) -> None:
+        sql = """
+        CREATE TABLE IF NOT EXISTS book_recommendations (
+            book_id INTEGER NOT NULL,
+            rank SMALLINT NOT NULL,
+            related_book_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (book_id, rank)
+        );
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def get_related(self, book_id: int, limit: int) -> List[tuple]:
+        """
+        Books most often borrowed by patrons who also borrowed `book_id`, as
+        (id, title, author, isbn, genre, year, quantity, available_count, score)
+        in rank order. Neighbours deleted since the last build are skipped.
+        """
+        sql = """
+        SELECT b.id, b.title, a.name, b.isbn, g.name, b.year, b.quantity, b.available_count, r.score
+        FROM book_recommendations r
+        JOIN books b ON b.id = r.related_book_id
+        JOIN authors a ON a.id = b.author_id
+        JOIN genres g ON g.id = b.genre_id
+        WHERE r.book_id = %s
+        ORDER BY r.rank
+        LIMIT %s
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (book_id, limit))
+                return cur.fetchall()
+
+    def iter_member_histories(self, max_per_member: int, fetch_size: int = 50_000) -> Iterator[List[Tuple[int, int]]]:
+        """
+        Stream distinct (member_id, book_id) pairs ordered by member, keeping
+        each member's `max_per_member` most recently borrowed books. Yields
+        lists of up to about `fetch_size` pairs from a server-side cursor, so
+        memory stays flat however many loans there are.
+        """
+        sql = """
+        SELECT member_id, book_id
+        FROM (
+            SELECT member_id, book_id,
+                   row_number() OVER (PARTITION BY member_id ORDER BY max(loan_date) DESC) AS recency
+            FROM loans
+            GROUP BY member_id, book_id
+        ) t
+        WHERE recency <= %s
+        ORDER BY member_id
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor(name="member_histories") as cur:
+                cur.itersize = fetch_size
+                cur.execute(sql, (max_per_member,))
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        return
+                    yield rows
+
+    def replace_all(self, chunks: Iterable[Sequence[tuple]]) -> int:
+        """
+        Replace every recommendation with the rows in `chunks`, each a list
+        of (book_id, rank, related_book_id, score). The new set is loaded with
+        COPY into a staging table and swapped in, so desk lookups keep
+        reading the old set until the final rename commits.
+        """
+        total = 0
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DROP TABLE IF EXISTS book_recommendations_new")
+                cur.execute(
+                    "CREATE TABLE book_recommendations_new (LIKE book_recommendations INCLUDING DEFAULTS)"
+                )
+                for chunk in chunks:
+                    buf = io.StringIO()
+                    for book_id, rank, related_book_id, score in chunk:
+                        buf.write(f"{book_id}\t{rank}\t{related_book_id}\t{score:.6g}\n")
+                        total += 1
+                    buf.seek(0)
+                    cur.copy_expert(
+                        "COPY book_recommendations_new (book_id, rank, related_book_id, score) FROM STDIN", buf
+                    )
+                cur.execute("ALTER TABLE book_recommendations_new ADD PRIMARY KEY (book_id, rank)")
+                cur.execute("DROP TABLE book_recommendations")
+                cur.execute("ALTER TABLE book_recommendations_new RENAME TO book_recommendations")
+                cur.execute(
+                    "ALTER INDEX book_recommendations_new_pkey RENAME TO book_recommendations_pkey"
+                )
+        return total
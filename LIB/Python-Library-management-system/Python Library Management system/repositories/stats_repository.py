@@ -0,0 +1,263 @@
+from typing import List
+
+from infrastructure.db import connection_scope
+
+
+class StatsRepository:
+    """
+    DAO for circulation rollups.
+
+    A trigger on loans appends one row to loan_events per checkout and per
+    return. `refresh()` consumes those events in batches and folds them into
+    daily rollup tables, so reports read a few rows per day instead of
+    scanning loan history. Days are UTC calendar days.
+    """
+
+    # Events consumed per refresh statement.
+    REFRESH_BATCH = 10_000
+
+    def create_table(self) -> None:
+        """Create rollup tables and the loans event trigger (loans must exist)."""
+        sql = """
+        CREATE TABLE IF NOT EXISTS loan_events (
+            id BIGSERIAL PRIMARY KEY,
+            kind TEXT NOT NULL CHECK (kind IN ('loan', 'return')),
+            book_id INTEGER NOT NULL,
+            member_id INTEGER NOT NULL,
+            day DATE NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS loan_daily_totals (
+            day DATE PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS loan_daily_book (
+            day DATE NOT NULL,
+            book_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, book_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS loan_daily_genre (
+            day DATE NOT NULL,
+            genre TEXT NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, genre)
+        );
+
+        CREATE TABLE IF NOT EXISTS loan_daily_member (
+            day DATE NOT NULL,
+            member_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, member_id)
+        );
+
+        CREATE OR REPLACE FUNCTION loans_record_event() RETURNS trigger AS $$
+        BEGIN
+            -- Rows moved between partitions by loans_ensure_partition are
+            -- not new loans or returns.
+            IF current_setting('library.moving_loans', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO loan_events (kind, book_id, member_id, day)
+                VALUES ('loan', NEW.book_id, NEW.member_id, (NEW.loan_date AT TIME ZONE 'UTC')::date);
+            END IF;
+            IF NEW.return_date IS NOT NULL AND (TG_OP = 'INSERT' OR OLD.return_date IS NULL) THEN
+                INSERT INTO loan_events (kind, book_id, member_id, day)
+                VALUES ('return', NEW.book_id, NEW.member_id, (NEW.return_date AT TIME ZONE 'UTC')::date);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = 'loans_record_event' AND tgrelid = 'loans'::regclass
+            ) THEN
+                CREATE TRIGGER loans_record_event
+                    AFTER INSERT OR UPDATE OF return_date ON loans
+                    FOR EACH ROW EXECUTE FUNCTION loans_record_event();
+            END IF;
+        END $$;
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    def refresh(self, max_batches: int = 0) -> int:
+        """
+        Fold pending loan events into the rollups, REFRESH_BATCH at a time,
+        until none are left (or `max_batches` batches when > 0). Each batch
+        is one statement: events are deleted and their counts upserted
+        atomically, and concurrent refreshers skip each other's rows.
+        Returns the number of events consumed.
+        """
+        sql = """
+        WITH batch AS (
+            DELETE FROM loan_events
+            WHERE id IN (
+                SELECT id FROM loan_events ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+            )
+            RETURNING kind, book_id, member_id, day
+        ),
+        totals AS (
+            INSERT INTO loan_daily_totals AS t (day, loans, returns)
+            SELECT day, COUNT(*) FILTER (WHERE kind = 'loan'), COUNT(*) FILTER (WHERE kind = 'return')
+            FROM batch GROUP BY day
+            ON CONFLICT (day) DO UPDATE
+            SET loans = t.loans + EXCLUDED.loans, returns = t.returns + EXCLUDED.returns
+        ),
+        per_book AS (
+            INSERT INTO loan_daily_book AS t (day, book_id, loans, returns)
+            SELECT day, book_id, COUNT(*) FILTER (WHERE kind = 'loan'), COUNT(*) FILTER (WHERE kind = 'return')
+            FROM batch GROUP BY day, book_id
+            ON CONFLICT (day, book_id) DO UPDATE
+            SET loans = t.loans + EXCLUDED.loans, returns = t.returns + EXCLUDED.returns
+        ),
+        per_genre AS (
+            INSERT INTO loan_daily_genre AS t (day, genre, loans, returns)
+            SELECT e.day, COALESCE(g.name, 'Unknown'),
+                   COUNT(*) FILTER (WHERE e.kind = 'loan'), COUNT(*) FILTER (WHERE e.kind = 'return')
+            FROM batch e
+            LEFT JOIN books b ON b.id = e.book_id
+            LEFT JOIN genres g ON g.id = b.genre_id
+            GROUP BY e.day, COALESCE(g.name, 'Unknown')
+            ON CONFLICT (day, genre) DO UPDATE
+            SET loans = t.loans + EXCLUDED.loans, returns = t.returns + EXCLUDED.returns
+        ),
+        per_member AS (
+            INSERT INTO loan_daily_member AS t (day, member_id, loans, returns)
+            SELECT day, member_id, COUNT(*) FILTER (WHERE kind = 'loan'), COUNT(*) FILTER (WHERE kind = 'return')
+            FROM batch GROUP BY day, member_id
+            ON CONFLICT (day, member_id) DO UPDATE
+            SET loans = t.loans + EXCLUDED.loans, returns = t.returns + EXCLUDED.returns
+        )
+        SELECT COUNT(*) FROM batch
+        """
+        consumed = 0
+        batches = 0
+        while True:
+            with connection_scope() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, (self.REFRESH_BATCH,))
+                    count = cur.fetchone()[0]
+            consumed += count
+            batches += 1
+            if count < self.REFRESH_BATCH or (max_batches and batches >= max_batches):
+                return consumed
+
+    def rebuild(self) -> None:
+        """
+        Recompute every rollup from loans (after bulk loads with the event
+        trigger disabled, or to repair drift). Loan writes wait meanwhile.
+        """
+        per_day = """
+        WITH events AS (
+            SELECT 'loan' AS kind, book_id, member_id, (loan_date AT TIME ZONE 'UTC')::date AS day FROM loans
+            UNION ALL
+            SELECT 'return', book_id, member_id, (return_date AT TIME ZONE 'UTC')::date FROM loans
+            WHERE return_date IS NOT NULL
+        )
+        INSERT INTO {table} (day, {key}loans, returns)
+        SELECT day, {key}COUNT(*) FILTER (WHERE kind = 'loan'), COUNT(*) FILTER (WHERE kind = 'return')
+        FROM events GROUP BY day{group}
+        """
+        per_genre = """
+        WITH events AS (
+            SELECT 'loan' AS kind, book_id, (loan_date AT TIME ZONE 'UTC')::date AS day FROM loans
+            UNION ALL
+            SELECT 'return', book_id, (return_date AT TIME ZONE 'UTC')::date FROM loans
+            WHERE return_date IS NOT NULL
+        )
+        INSERT INTO loan_daily_genre (day, genre, loans, returns)
+        SELECT e.day, COALESCE(g.name, 'Unknown'),
+               COUNT(*) FILTER (WHERE e.kind = 'loan'), COUNT(*) FILTER (WHERE e.kind = 'return')
+        FROM events e
+        LEFT JOIN books b ON b.id = e.book_id
+        LEFT JOIN genres g ON g.id = b.genre_id
+        GROUP BY e.day, COALESCE(g.name, 'Unknown')
+        """
+        with connection_scope() as conn:
+            with conn.cursor() as cur:
+                cur.execute("LOCK TABLE loans IN SHARE MODE")
+                cur.execute(
+                    "TRUNCATE loan_events, loan_daily_totals, loan_daily_book, loan_daily_genre, loan_daily_member"
+                )
+                cur.execute(per_day.format(table="loan_daily_totals", key="", group=""))
+                cur.execute(per_day.format(table="loan_daily_book", key="book_id, ", group=", book_id"))
+                cur.execute(per_day.format(table="loan_daily_member", key="member_id, ", group=", member_id"))
+                cur.execute(per_genre)
+
+    def daily_volume(self, days: int) -> List[tuple]:
+        """(day, loans, returns) for the last `days` days, oldest first."""
+        sql = """
+        SELECT day, loans, returns FROM loan_daily_totals
+        WHERE day > (now() AT TIME ZONE 'UTC')::date - %s
+        ORDER BY day
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (days,))
+                return cur.fetchall()
+
+    def top_titles(self, days: int, limit: int) -> List[tuple]:
+        """(book_id, title, author, loans) most borrowed in the last `days` days."""
+        sql = """
+        SELECT r.book_id, b.title, a.name, r.loans
+        FROM (
+            SELECT book_id, SUM(loans) AS loans FROM loan_daily_book
+            WHERE day > (now() AT TIME ZONE 'UTC')::date - %s
+            GROUP BY book_id
+            HAVING SUM(loans) > 0
+            ORDER BY SUM(loans) DESC, book_id
+            LIMIT %s
+        ) r
+        JOIN books b ON b.id = r.book_id
+        JOIN authors a ON a.id = b.author_id
+        ORDER BY r.loans DESC, r.book_id
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (days, limit))
+                return cur.fetchall()
+
+    def loans_per_genre(self, days: int) -> List[tuple]:
+        """(genre, loans, returns) over the last `days` days, busiest first."""
+        sql = """
+        SELECT genre, SUM(loans), SUM(returns) FROM loan_daily_genre
+        WHERE day > (now() AT TIME ZONE 'UTC')::date - %s
+        GROUP BY genre
+        ORDER BY SUM(loans) DESC, genre
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (days,))
+                return cur.fetchall()
+
+    def top_members(self, days: int, limit: int) -> List[tuple]:
+        """(member_id, full_name, loans) most active in the last `days` days."""
+        sql = """
+        SELECT r.member_id, m.full_name, r.loans
+        FROM (
+            SELECT member_id, SUM(loans) AS loans FROM loan_daily_member
+            WHERE day > (now() AT TIME ZONE 'UTC')::date - %s
+            GROUP BY member_id
+            HAVING SUM(loans) > 0
+            ORDER BY SUM(loans) DESC, member_id
+            LIMIT %s
+        ) r
+        JOIN members m ON m.id = r.member_id
+        ORDER BY r.loans DESC, r.member_id
+        """
+        with connection_scope(readonly=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (days, limit))
+                return cur.fetchall()
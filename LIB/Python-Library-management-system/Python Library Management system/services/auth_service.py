@@ -2,7 +2,9 @@ import hashlib
 from typing import Optional, Tuple
 
 from repositories.member_repository import MemberRepository
-from infrastructure.db import connection_scope
+from infrastructure.db import connection_scope, execute_prepared
+from infrastructure.metrics import timed_service
+from infrastructure.profiling import profiled
 
 
 def _hash_password(raw: str) -> str:
@@ -80,6 +82,8 @@ class AuthService:
                         (member_id, "Regular Member"),
                     )
 
+    @timed_service
+    @profiled
     def login(self, username: str, password: str) -> Optional[Tuple[int, str]]:
         """
         Returns (user_id, role_name) on success, or None on failure.
@@ -87,7 +91,9 @@ class AuthService:
         password_hash = _hash_password(password)
         with connection_scope() as conn:
             with conn.cursor() as cur:
-                cur.execute(
+                execute_prepared(
+                    cur,
+                    "auth_login",
                     """
                     SELECT u.id, r.name
                     FROM users u
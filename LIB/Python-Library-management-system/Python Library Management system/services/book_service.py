@@ -1,6 +1,12 @@
-from typing import List, Tuple
+import gzip
+from typing import List, Optional, Tuple
 
+from repositories.author_repository import AuthorRepository
 from repositories.book_repository import BookRepository
+from repositories.genre_repository import GenreRepository
+from repositories.recommendation_repository import RecommendationRepository
+from infrastructure.metrics import timed_service
+from infrastructure.profiling import profiled
 
 
 class BookService:
@@ -11,37 +17,242 @@ class BookService:
     database code directly.
     """
 
+    EXPORT_FORMATS = ("csv", "jsonl")
+    # gzip level for exports: level 1 keeps compression from becoming the
+    # bottleneck on multi-million-row handoffs, at a modest size cost.
+    EXPORT_GZIP_LEVEL = 1
+
+    BROWSE_FILTERS = ("genre_id", "year_from", "year_to", "query")
+
     # Note: we avoid the `BookRepository | None` syntax to remain
     # compatible with Python 3.9 on your system.
-    def __init__(self, repo=None):
-        self._repo = repo or BookRepository()
-        # Ensure table exists once
-        self._repo.create_table()
+    # bootstrap=False skips the schema DDL for callers that run against an
+    # already-initialised database (the CLI; see `library.py db-check --init`).
+    def __init__(self, repo=None, recommendation_repo=None, author_repo=None, genre_repo=None, bootstrap=True):
+        self._authors = author_repo or AuthorRepository()
+        self._genres = genre_repo or GenreRepository()
+        self._repo = repo or BookRepository(self._authors, self._genres)
+        self._recommendations = recommendation_repo or RecommendationRepository()
+        if bootstrap:
+            # Ensure tables exist once (creates authors and genres too)
+            self._repo.create_table()
+            self._recommendations.create_table()
+
+    @staticmethod
+    def _year(year) -> Optional[int]:
+        """Publication year as an integer; blank means unknown."""
+        if year is None or isinstance(year, int):
+            return year
+        text = str(year).strip()
+        if not text:
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            raise ValueError(f"Year must be a whole number, not {text!r}")
 
-    def add_book(self, title: str, author: str, isbn: str, genre: str, year: str) -> None:
-        # Simple validation could go here if needed
-        self._repo.add_book(title=title, author=author, isbn=isbn, genre=genre, year=year, quantity=1)
+    @timed_service
+    @profiled
+    def add_book(self, title: str, author: str, isbn: str, genre: str, year) -> None:
+        self._repo.add_book(title=title, author=author, isbn=isbn, genre=genre, year=self._year(year), quantity=1)
 
-    def update_book(self, book_id: int, title: str, author: str, isbn: str, genre: str, year: str) -> None:
-        # For now always set quantity to 1 (no stock logic yet)
+    @timed_service
+    @profiled
+    def update_book(self, book_id: int, title: str, author: str, isbn: str, genre: str, year) -> None:
+        # Editing details never changes the number of copies: forcing it
+        # would drive available_count negative while copies are out.
         self._repo.update_book(
             book_id=book_id,
             title=title,
             author=author,
             isbn=isbn,
             genre=genre,
-            year=year,
-            quantity=1,
+            year=self._year(year),
         )
 
+    @timed_service
+    @profiled
+    def add_books(self, books: List[Tuple]) -> int:
+        """
+        Bulk insert (title, author, isbn, genre, year) or
+        (title, author, isbn, genre, year, quantity) tuples in one transaction.
+        """
+        rows = [
+            tuple(book[:4]) + (self._year(book[4]), book[5] if len(book) == 6 else 1)
+            for book in books
+        ]
+        return self._repo.add_books(rows)
+
+    @timed_service
+    @profiled
+    def update_books(self, books: List[Tuple]) -> int:
+        """Bulk update (book_id, title, author, isbn, genre, year) tuples."""
+        # Same as update_book: each book keeps its quantity.
+        return self._repo.update_books(tuple(book[:5]) + (self._year(book[5]), None) for book in books)
+
+    @timed_service
+    @profiled
+    def delete_books(self, book_ids: List[int]) -> int:
+        return self._repo.delete_books(book_ids)
+
+    @timed_service
+    @profiled
     def delete_book(self, book_id: int) -> None:
         self._repo.delete_book(book_id)
 
-    def list_books(self) -> List[Tuple]:
-        return self._repo.list_books()
+    @timed_service
+    @profiled
+    def get_book(self, book_id: int) -> Optional[Tuple]:
+        return self._repo.get_book(book_id)
+
+    @timed_service
+    @profiled
+    def get_books(self, book_ids: List[int]) -> List[Tuple]:
+        return self._repo.get_books(book_ids)
+
+    @timed_service
+    @profiled
+    def list_books(self, sort: str = "id", direction: str = "asc") -> List[Tuple]:
+        return self._repo.list_books(sort, direction)
+
+    @timed_service
+    @profiled
+    def list_books_page(
+        self,
+        after_id: int = 0,
+        limit: int = 500,
+        sort: str = "id",
+        direction: str = "asc",
+        after_value=None,
+    ) -> List[Tuple]:
+        """
+        One page of the catalogue sorted server-side by `sort` (id, title,
+        author or year) in `direction` ('asc' or 'desc'). For the next page
+        pass the last row's id and sort value, i.e. next_page(rows, sort).
+        """
+        return self._repo.list_books_page(
+            after_id=after_id, limit=limit, sort=sort, direction=direction, after_value=after_value
+        )
+
+    @staticmethod
+    def next_page(books: List[Tuple], sort: str = "id") -> dict:
+        """Keyword arguments that continue after the last of `books` in `sort` order."""
+        last = books[-1]
+        return {"after_id": last[0], "after_value": BookRepository.sort_value(last, sort)}
 
+    @timed_service
+    @profiled
+    def list_genres(self) -> List[Tuple]:
+        """All genres as (genre_id, name), by name."""
+        return self._genres.list_genres()
+
+    @timed_service
+    @profiled
+    def browse(
+        self,
+        filters: Optional[dict] = None,
+        after_id: int = 0,
+        limit: int = 50,
+        sort: str = "id",
+        direction: str = "asc",
+        after_value=None,
+    ) -> dict:
+        """
+        One page of books narrowed by `filters` plus facet counts for the
+        whole result. Filters (all optional): genre_id, year_from and
+        year_to (inclusive), and query (as in search_books). Pages are
+        sorted and continued as in list_books_page.
+
+        Returns {"books": one page of rows, "next": keyword arguments for the
+        following page (None after the last), "genres": [(genre_id, name, count)],
+        "decades": [(decade, count)] with decade None for unknown years,
+        "total": books matching all filters}. Facets are disjunctive: genre
+        counts ignore the genre filter and decade counts ignore the year
+        range, so each shows what choosing another value would give.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value not in (None, "")}
+        unknown = set(filters) - set(self.BROWSE_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown browse filter(s): {', '.join(sorted(unknown))}")
+        genre_id = filters.get("genre_id")
+        year_from = self._year(filters.get("year_from"))
+        year_to = self._year(filters.get("year_to"))
+        if year_from is not None and year_to is not None and year_from > year_to:
+            raise ValueError("year_from must not be after year_to")
+        query = filters.get("query")
+
+        books = self._repo.browse_books(
+            genre_id, year_from, year_to, query,
+            after_id=after_id, limit=limit, sort=sort, direction=direction, after_value=after_value,
+        )
+        per_genre, per_decade, total = {}, {}, 0
+        for cell_genre, decade, in_range, count in self._repo.facet_cells(year_from, year_to, query):
+            per_genre[cell_genre] = per_genre.get(cell_genre, 0) + in_range
+            if genre_id is None or cell_genre == genre_id:
+                per_decade[decade] = per_decade.get(decade, 0) + count
+                total += in_range
+        genres = [
+            (gid, name, per_genre.get(gid, 0))
+            for gid, name in self._genres.list_genres()
+            if per_genre.get(gid) or gid == genre_id
+        ]
+        decades = sorted(per_decade.items(), key=lambda item: (item[0] is None, item[0] or 0))
+        next_page = self.next_page(books, sort) if books and len(books) == limit else None
+        return {"books": books, "next": next_page, "genres": genres, "decades": decades, "total": total}
+
+    @timed_service
+    @profiled
+    def export_books(self, stream, fmt: str = "csv", query: Optional[str] = None, compress: bool = False) -> int:
+        """
+        Write the catalogue, or the books matching `query`, to the binary
+        `stream` as CSV or JSON lines, gzip-compressed if `compress`. Rows
+        stream straight from PostgreSQL's COPY, so memory use does not grow
+        with the catalogue. Returns the number of books written.
+        """
+        if fmt not in self.EXPORT_FORMATS:
+            raise ValueError(f"Export format must be one of: {', '.join(self.EXPORT_FORMATS)}")
+        if not compress:
+            return self._repo.export_books(stream, fmt, query)
+        # Closing the GzipFile writes the trailer but leaves `stream` open.
+        with gzip.GzipFile(fileobj=stream, mode="wb", compresslevel=self.EXPORT_GZIP_LEVEL) as gz:
+            return self._repo.export_books(gz, fmt, query)
+
+    @timed_service
+    @profiled
     def search_books(self, keyword: str) -> List[Tuple]:
         return self._repo.search_books(keyword)
 
+    @timed_service
+    @profiled
+    def find_authors(self, query: str, limit: int = 20) -> List[Tuple]:
+        """(author_id, name, book count) for authors whose name contains `query`."""
+        return self._authors.search_authors(query, limit)
+
+    @timed_service
+    @profiled
+    def get_author(self, author_id: int) -> Optional[Tuple]:
+        return self._authors.get_author(author_id)
+
+    @timed_service
+    @profiled
+    def books_by_author(self, author: str) -> List[Tuple]:
+        """All books by the author with this name (case and spacing ignored)."""
+        found = self._authors.find_by_name(author)
+        return self._repo.list_books_by_author(found[0]) if found else []
+
+    @timed_service
+    @profiled
+    def books_by_author_id(self, author_id: int) -> List[Tuple]:
+        return self._repo.list_books_by_author(author_id)
+
+    @timed_service
+    @profiled
+    def related_books(self, book_id: int, limit: int = 5) -> List[Tuple]:
+        """
+        "Patrons who borrowed this also borrowed": book rows plus a score,
+        best first, as last computed by build_recommendations.py.
+        """
+        return self._recommendations.get_related(book_id, limit)
+
 
 
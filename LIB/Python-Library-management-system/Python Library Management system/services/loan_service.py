@@ -1,7 +1,13 @@
+from collections import Counter
 from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
 
 from repositories.book_repository import BookRepository
+from repositories.hold_repository import HoldRepository
 from repositories.loan_repository import LoanRepository
+from infrastructure.db import connection_scope
+from infrastructure.metrics import timed_service
+from infrastructure.profiling import profiled
 
 
 class LoanService:
@@ -10,30 +16,78 @@ class LoanService:
 
     Business rules:
       - Max 3 active loans per member.
+      - A book can only be borrowed while available_count > 0, or by the
+        member whose hold it is waiting for on the hold shelf.
       - Loan due date is 7 days from loan_date.
+      - Holds can only be placed when no copy is available; each returned
+        copy goes to the oldest waiting hold and is kept for 3 days.
     """
 
     MAX_ACTIVE_LOANS_PER_MEMBER = 3
     LOAN_DAYS = 7
+    HOLD_PICKUP_DAYS = 3
+    # Ready holds expired per statement by expire_holds.
+    EXPIRE_BATCH = 1000
 
-    def __init__(self, book_repo: BookRepository, loan_repo: LoanRepository):
+    # hold_repo is optional so existing callers keep working; avoid
+    # `HoldRepository | None` for Python 3.9. bootstrap=False skips the
+    # holds DDL (see BookService).
+    def __init__(self, book_repo: BookRepository, loan_repo: LoanRepository, hold_repo=None, bootstrap=True):
         self._book_repo = book_repo
         self._loan_repo = loan_repo
+        self._hold_repo = hold_repo or HoldRepository()
+        if bootstrap:
+            self._hold_repo.create_table()
 
+    @timed_service
+    @profiled
     def borrow_book(self, member_id: int, book_id: int) -> None:
-        active_loans = self._loan_repo.count_active_loans_for_member(member_id)
-        if active_loans >= self.MAX_ACTIVE_LOANS_PER_MEMBER:
-            raise ValueError("Member has reached the maximum number of active loans.")
+        with connection_scope():
+            # Serialize checkouts for this member so the limit check holds.
+            active_loans = self._loan_repo.lock_member(member_id)
+            if active_loans is None:
+                raise ValueError(f"Member {member_id} does not exist.")
+            if active_loans >= self.MAX_ACTIVE_LOANS_PER_MEMBER:
+                raise ValueError("Member has reached the maximum number of active loans.")
 
-        # In a fuller implementation we would also check that quantity > 0 and decrement it.
-        loan_date = datetime.utcnow()
-        due_date = loan_date + timedelta(days=self.LOAN_DAYS)
-        self._loan_repo.create_loan(book_id=book_id, member_id=member_id, loan_date=loan_date, due_date=due_date)
+            available = self._book_repo.lock_available_counts([book_id]).get(book_id)
+            if available is None:
+                raise ValueError("Book not found.")
+            # A copy on the hold shelf for this member counts as available to them.
+            available += len(self._hold_repo.ready_book_ids(member_id, [book_id]))
+            if available <= 0:
+                raise ValueError("No copies of this book are available.")
+
+            # The loans trigger updates both counters when the loan is inserted.
+            loan_date = datetime.utcnow()
+            due_date = loan_date + timedelta(days=self.LOAN_DAYS)
+            self._hold_repo.fulfill(member_id, [book_id])
+            self._loan_repo.create_loan(book_id=book_id, member_id=member_id, loan_date=loan_date, due_date=due_date)
 
+    def _allocate_returned(self, book_ids: Iterable[int]) -> dict:
+        """
+        Hand just-returned copies to the oldest waiting holds, inside the
+        caller's transaction. Returns {book_id: [member_id, ...]} for the
+        copies that went to the hold shelf instead of the open shelf.
+        """
+        allocated = {}
+        for _, book_id, member_id in self._hold_repo.allocate(Counter(book_ids), self.HOLD_PICKUP_DAYS):
+            allocated.setdefault(book_id, []).append(member_id)
+        return allocated
+
+    @timed_service
+    @profiled
     def return_book(self, loan_id: int) -> None:
+        # One loan row: its trigger locks one member, then one book, the
+        # same order as the checkouts, so no up-front locking is needed.
         return_date = datetime.utcnow()
-        self._loan_repo.mark_returned(loan_id=loan_id, return_date=return_date)
+        with connection_scope():
+            book_id = self._loan_repo.mark_returned(loan_id=loan_id, return_date=return_date)
+            if book_id is not None:
+                self._allocate_returned([book_id])
 
+    @timed_service
+    @profiled
     def return_book_for_member_and_book(self, member_id: int, book_id: int) -> None:
         """
         Convenience method for the UI: finds the active loan for this
@@ -45,5 +99,179 @@ class LoanService:
         loan_id = row[0]
         self.return_book(loan_id)
 
+    @timed_service
+    @profiled
+    def borrow_books(self, member_id: int, book_ids: Iterable[int]) -> List[Tuple[int, bool, str]]:
+        """
+        Check out several books for one member in a single transaction.
+
+        The member row and the requested book rows are locked, and the loan
+        limit and available copies are read once; books are accepted in order
+        while the member is under the limit and a copy is on the shelf. Returns one
+        (book_id, ok, message) tuple per requested book.
+        """
+        book_ids = list(book_ids)
+        results = []
+        loan_date = datetime.utcnow()
+        due_date = loan_date + timedelta(days=self.LOAN_DAYS)
+        with connection_scope():
+            active_loans = self._loan_repo.lock_member(member_id)
+            if active_loans is None:
+                raise ValueError(f"Member {member_id} does not exist.")
+            available = self._book_repo.lock_available_counts(book_ids)
+            for book_id in self._hold_repo.ready_book_ids(member_id, available):
+                available[book_id] += 1
+
+            new_loans = []
+            for book_id in book_ids:
+                if book_id not in available:
+                    results.append((book_id, False, "Book not found."))
+                elif active_loans >= self.MAX_ACTIVE_LOANS_PER_MEMBER:
+                    results.append((book_id, False, "Member has reached the maximum number of active loans."))
+                elif available[book_id] <= 0:
+                    results.append((book_id, False, "No copies of this book are available."))
+                else:
+                    new_loans.append((book_id, member_id, loan_date, due_date))
+                    active_loans += 1
+                    available[book_id] -= 1
+                    results.append((book_id, True, f"Due {due_date:%Y-%m-%d}."))
+            self._hold_repo.fulfill(member_id, [loan[0] for loan in new_loans])
+            self._loan_repo.create_loans(new_loans)
+        return results
+
+    @timed_service
+    @profiled
+    def return_books(self, member_id: int, book_ids: Iterable[int]) -> List[Tuple[int, bool, str]]:
+        """
+        Return several books for one member in a single transaction.
+        Returns one (book_id, ok, message) tuple per book.
+        """
+        book_ids = list(book_ids)
+        return_date = datetime.utcnow()
+        with connection_scope():
+            # The loans trigger updates the member and each book row; lock
+            # them first, member then books in id order, as the checkout
+            # paths do, so overlapping batches cannot deadlock.
+            self._loan_repo.lock_member(member_id)
+            active = dict(self._loan_repo.get_active_loans_for_member_and_books(member_id, book_ids))
+            self._book_repo.lock_available_counts(active)
+            returned = self._loan_repo.mark_returned_many(active.values(), return_date)
+            held = self._allocate_returned(returned)
+
+        results = []
+        for book_id in book_ids:
+            if active.pop(book_id, None) is not None:
+                results.append((book_id, True, self._returned_message(held, book_id)))
+            else:
+                results.append((book_id, False, "No active loan found for this book and member."))
+        return results
+
+    @staticmethod
+    def _returned_message(held: dict, book_id: int) -> str:
+        members = held.get(book_id)
+        if members:
+            return f"Returned; put on the hold shelf for member {members.pop(0)}."
+        return "Returned."
+
+    @timed_service
+    @profiled
+    def return_scanned(self, isbns: Iterable[str]) -> List[Tuple[str, bool, str]]:
+        """
+        Return a batch of scanned items, identified by ISBN alone, in one
+        transaction. Each scan closes the oldest still-open loan for that
+        ISBN, so scanning two copies of a title closes two loans. Returns one
+        (isbn, ok, message) tuple per scan, in scan order.
+        """
+        scans = [code.strip() for code in isbns]
+        return_date = datetime.utcnow()
+        with connection_scope():
+            open_loans = {}
+            for isbn, loan_id, member_id, book_id in self._loan_repo.get_active_loans_for_isbns(set(scans)):
+                open_loans.setdefault(isbn, []).append((loan_id, member_id, book_id))
+
+            results, loan_ids, book_ids, member_ids = [], [], [], []
+            for isbn in scans:
+                queue = open_loans.get(isbn)
+                if queue:
+                    loan_id, member_id, book_id = queue.pop(0)
+                    loan_ids.append(loan_id)
+                    book_ids.append(book_id)
+                    member_ids.append(member_id)
+                    results.append([isbn, True, f"Returned (loan {loan_id}, member {member_id})."])
+                else:
+                    book_ids.append(None)
+                    results.append([isbn, False, "No active loan for this ISBN."])
+            # Lock the rows the loans trigger will update in the checkout
+            # order (members, then books, each by id) rather than loan order,
+            # so kiosks returning overlapping titles cannot deadlock.
+            self._loan_repo.lock_members(member_ids)
+            self._book_repo.lock_available_counts(book_id for book_id in book_ids if book_id is not None)
+            held = self._allocate_returned(self._loan_repo.mark_returned_many(loan_ids, return_date))
+
+        for result, book_id in zip(results, book_ids):
+            members = held.get(book_id) if book_id is not None else None
+            if members:
+                result[2] += f" Hold shelf: member {members.pop(0)}."
+        return [tuple(result) for result in results]
+
+    @timed_service
+    @profiled
+    def place_hold(self, member_id: int, book_id: int) -> int:
+        """
+        Join the book's hold queue. Only allowed while no copy is available.
+        Returns the member's 1-based queue position.
+        """
+        with connection_scope():
+            if self._loan_repo.lock_member(member_id) is None:
+                raise ValueError(f"Member {member_id} does not exist.")
+            available = self._book_repo.lock_available_counts([book_id]).get(book_id)
+            if available is None:
+                raise ValueError("Book not found.")
+            if available > 0:
+                raise ValueError("A copy is available; borrow it instead of placing a hold.")
+            if self._loan_repo.get_active_loan_for_member_and_book(member_id, book_id) is not None:
+                raise ValueError("Member already has this book on loan.")
+            if self._hold_repo.create_hold(member_id, book_id) is None:
+                raise ValueError("Member already has a hold on this book.")
+            return self._hold_repo.get_position(member_id, book_id)
+
+    @timed_service
+    @profiled
+    def cancel_hold(self, member_id: int, book_id: int) -> None:
+        """Cancel an open hold; a copy waiting on the hold shelf goes to the next patron."""
+        with connection_scope():
+            status = self._hold_repo.cancel_hold(member_id, book_id)
+            if status is None:
+                raise ValueError("No open hold found for this book and member.")
+            if status == "ready":
+                self._allocate_returned([book_id])
+
+    @timed_service
+    @profiled
+    def hold_position(self, member_id: int, book_id: int) -> Optional[int]:
+        """1-based queue position, 0 if ready for pickup, None without an open hold."""
+        return self._hold_repo.get_position(member_id, book_id)
+
+    @timed_service
+    @profiled
+    def list_holds(self, member_id: int) -> List[Tuple]:
+        return self._hold_repo.list_holds_for_member(member_id)
+
+    @timed_service
+    @profiled
+    def expire_holds(self) -> int:
+        """
+        Expire ready holds not picked up in time and pass each copy to the
+        next waiting hold (or back to the shelf). Returns holds expired.
+        """
+        expired = 0
+        while True:
+            with connection_scope():
+                rows = self._hold_repo.expire_ready(self.EXPIRE_BATCH)
+                self._allocate_returned(book_id for _, book_id, _ in rows)
+            expired += len(rows)
+            if len(rows) < self.EXPIRE_BATCH:
+                return expired
+
 
 
@@ -0,0 +1,46 @@
+from typing import List, Optional, Tuple
+
+from repositories.member_repository import MemberRepository
+from infrastructure.metrics import timed_service
+from infrastructure.profiling import profiled
+
+
+class MemberService:
+    """
+    Service layer for looking up library members (patrons).
+
+    The UI uses this to find a member by name or username instead of
+    asking the librarian to type a numeric member id.
+    """
+
+    SEARCH_LIMIT = 20
+
+    # Avoid `MemberRepository | None` so it's compatible with Python 3.9.
+    def __init__(self, member_repo=None):
+        self._repo = member_repo or MemberRepository()
+        self._repo.create_table()
+
+    @timed_service
+    @profiled
+    def get_member(self, member_id: int) -> Optional[Tuple]:
+        return self._repo.get_member(member_id)
+
+    @timed_service
+    @profiled
+    def list_members(self, after_id: int = 0, limit: int = 50) -> List[Tuple]:
+        return self._repo.list_members(after_id=after_id, limit=limit)
+
+    @timed_service
+    @profiled
+    def search_members(self, query: str) -> List[Tuple]:
+        """
+        Search by username or full name. An all-digit query is treated as a
+        member id so the desk can still type an id directly.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if query.isdigit():
+            row = self._repo.get_member(int(query))
+            return [row] if row else []
+        return self._repo.search_members(query, limit=self.SEARCH_LIMIT)
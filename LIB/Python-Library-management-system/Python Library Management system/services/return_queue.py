@@ -0,0 +1,69 @@
+import time
+from typing import Callable, List, Optional, Tuple
+
+from services.loan_service import LoanService
+
+
+class ReturnQueue:
+    """
+    Buffers scanned returns from a kiosk and processes them in batches.
+
+    Scans are queued by `scan()` and sent to LoanService.return_scanned once
+    BATCH_SIZE items are waiting or the oldest has waited MAX_DELAY seconds
+    (the caller drives the timer via `flush_if_due()`). One transaction per
+    batch instead of one dialog, lookup and commit per book.
+    """
+
+    BATCH_SIZE = 50
+    MAX_DELAY = 2.0
+
+    def __init__(self, loan_service: LoanService, on_results: Optional[Callable] = None):
+        self._loan_service = loan_service
+        self._on_results = on_results
+        self._pending: List[str] = []
+        self._first_scan_at: Optional[float] = None
+        self.returned = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def pending_codes(self) -> List[str]:
+        """Scans not processed yet, oldest first."""
+        return list(self._pending)
+
+    def scan(self, code: str) -> List[Tuple[str, bool, str]]:
+        """Queue one scanned ISBN; flushes and returns results if the batch is full."""
+        code = code.strip()
+        if not code:
+            return []
+        if not self._pending:
+            self._first_scan_at = time.monotonic()
+        self._pending.append(code)
+        if len(self._pending) >= self.BATCH_SIZE:
+            return self.flush()
+        return []
+
+    def flush_if_due(self) -> List[Tuple[str, bool, str]]:
+        first_scan_at = self._first_scan_at
+        if self._pending and first_scan_at is not None and time.monotonic() - first_scan_at >= self.MAX_DELAY:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[Tuple[str, bool, str]]:
+        """Process everything queued so far. On error the batch stays queued."""
+        if not self._pending:
+            return []
+        results = self._loan_service.return_scanned(self._pending)
+        self._pending = []
+        self._first_scan_at = None
+        for _, ok, _ in results:
+            if ok:
+                self.returned += 1
+            else:
+                self.failed += 1
+        if self._on_results is not None:
+            self._on_results(results)
+        return results
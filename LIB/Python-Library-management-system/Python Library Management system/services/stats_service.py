@@ -0,0 +1,69 @@
+from typing import Dict, List, Tuple
+
+from repositories.stats_repository import StatsRepository
+from infrastructure.metrics import timed_service
+from infrastructure.profiling import profiled
+
+
+class StatsService:
+    """
+    Circulation statistics for the dashboard.
+
+    Every report reads the daily rollup tables only, so its cost depends on
+    the reporting window, not on how much loan history exists.
+    """
+
+    TOP_LIMIT = 10
+    # Events folded in before a dashboard load; a backlog beyond this is
+    # left to refresh_stats.py so opening the dashboard stays fast.
+    DASHBOARD_REFRESH_BATCHES = 1
+
+    # Avoid `StatsRepository | None` so it's compatible with Python 3.9.
+    # bootstrap=False skips the schema DDL (see BookService).
+    def __init__(self, stats_repo=None, bootstrap=True):
+        self._repo = stats_repo or StatsRepository()
+        if bootstrap:
+            self._repo.create_table()
+
+    @timed_service
+    @profiled
+    def refresh(self) -> int:
+        """Fold all pending loan events into the rollups. Returns events consumed."""
+        return self._repo.refresh()
+
+    @timed_service
+    @profiled
+    def rebuild(self) -> None:
+        self._repo.rebuild()
+
+    @timed_service
+    @profiled
+    def daily_volume(self, days: int = 30) -> List[Tuple]:
+        return self._repo.daily_volume(days)
+
+    @timed_service
+    @profiled
+    def top_titles(self, days: int = 30, limit: int = TOP_LIMIT) -> List[Tuple]:
+        return self._repo.top_titles(days, limit)
+
+    @timed_service
+    @profiled
+    def loans_per_genre(self, days: int = 30) -> List[Tuple]:
+        return self._repo.loans_per_genre(days)
+
+    @timed_service
+    @profiled
+    def top_members(self, days: int = 30, limit: int = TOP_LIMIT) -> List[Tuple]:
+        return self._repo.top_members(days, limit)
+
+    @timed_service
+    @profiled
+    def dashboard(self, days: int = 30) -> Dict[str, List[Tuple]]:
+        """All dashboard reports for the last `days` days, after a bounded refresh."""
+        self._repo.refresh(max_batches=self.DASHBOARD_REFRESH_BATCHES)
+        return {
+            "daily_volume": self._repo.daily_volume(days),
+            "top_titles": self._repo.top_titles(days, self.TOP_LIMIT),
+            "loans_per_genre": self._repo.loans_per_genre(days),
+            "top_members": self._repo.top_members(days, self.TOP_LIMIT),
+        }